@@ -14,6 +14,7 @@ CREATE TABLE IF NOT EXISTS status (
     mode VARCHAR(20) DEFAULT 'MANUAL' COMMENT 'Betriebsmodus: MANUAL, AUTO',
     last_action VARCHAR(255) DEFAULT NULL COMMENT 'Letzte ausgeführte Aktion',
     is_busy TINYINT(1) DEFAULT 0 COMMENT '1 = Motor läuft gerade',
+    queue_depth TEXT DEFAULT NULL COMMENT 'JSON: laufende + wartende Fahraufträge pro Tor',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -120,6 +121,8 @@ CREATE TABLE IF NOT EXISTS gpio_switches (
     name VARCHAR(50) NOT NULL UNIQUE COMMENT 'Schalter-Name (z.B. "Bewässerung 1")',
     gpio_pin INT NOT NULL COMMENT 'GPIO-Pin-Nummer (BCM)',
     state TINYINT(1) DEFAULT 0 COMMENT 'Schaltzustand (Active-Low): 0 = EIN/aktiv (GPIO LOW), 1 = AUS/inaktiv (GPIO HIGH)',
+    applied_state TINYINT(1) DEFAULT NULL COMMENT 'Vom Pi zuletzt angewendeter Schaltzustand (NULL = noch nicht gemeldet)',
+    applied_at TIMESTAMP NULL DEFAULT NULL COMMENT 'Zeitpunkt der Anwendung auf dem Pi',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     UNIQUE KEY name (name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
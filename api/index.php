@@ -6,7 +6,7 @@
  * - GET  /api/status            -> Aktuellen Status abrufen
  * - POST /api/status            -> Status aktualisieren (vom Pi)
  * - POST /api/command           -> Neuen Befehl senden (vom Web)
- * - GET  /api/command           -> Offene Befehle abrufen (vom Pi)
+ * - GET  /api/command           -> Offene Befehle abrufen (vom Pi, ?wait=N für Long-Polling)
  * - POST /api/command/{id}/complete -> Befehl als erledigt markieren
  * - POST /api/command/{id}/fail     -> Befehl als fehlgeschlagen markieren
  * - POST /api/login             -> Einloggen
@@ -15,6 +15,10 @@
  * - GET  /api/ventilation       -> Ventilation Config abrufen
  * - POST /api/ventilation       -> Ventilation Config aktualisieren
  * - POST /api/ventilation/mark-run -> Ventilation als ausgeführt markieren
+ * - POST /api/sync              -> Gebündelter Abgleich: Status + Rückmeldungen hoch,
+ *                                  offene Befehle + Konfiguration runter (vom Pi)
+ * - POST /api/logs              -> Gesammelte Log-Meldungen des Pi (Bulk-Insert)
+ * - POST /api/gpio-switches     -> Schalter umschalten (Web) bzw. angewendete Zustände melden (Pi)
  */
 
 require_once 'config.php';
@@ -29,7 +33,16 @@ ini_set('error_log', 'php_errors.log');
 header("Access-Control-Allow-Origin: *");
 header("Content-Type: application/json; charset=UTF-8");
 header("Access-Control-Allow-Methods: GET, POST, OPTIONS");
-header("Access-Control-Allow-Headers: Content-Type, Access-Control-Allow-Headers, Authorization, X-Requested-With, X-API-Key");
+header("Access-Control-Allow-Headers: Content-Type, Access-Control-Allow-Headers, Authorization, X-Requested-With, X-API-Key, If-None-Match");
+header("Access-Control-Expose-Headers: ETag");
+
+// Antworten komprimieren (spart Datenvolumen über die LTE-Verbindung des Pi)
+if (!ini_get('zlib.output_compression')) {
+    ob_start('ob_gzhandler');
+}
+
+// Long-Polling: maximale Wartezeit für GET /api/command?wait=N (unter max_execution_time!)
+define('LONG_POLL_MAX_WAIT', 25);
 
 // Handle OPTIONS request
 if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
@@ -76,6 +89,24 @@ try {
             }
             break;
             
+        case 'sync':
+            if ($method === 'POST') {
+                validateApiKey();
+                syncDevice();
+            } else {
+                sendJSON(['error' => 'Method not allowed'], 405);
+            }
+            break;
+            
+        case 'logs':
+            if ($method === 'POST') {
+                validateApiKey();
+                insertLogs();
+            } else {
+                sendJSON(['error' => 'Method not allowed'], 405);
+            }
+            break;
+            
         case 'login':
             if ($method === 'POST') {
                 handleLogin();
@@ -167,7 +198,7 @@ try {
                 getGpioSwitches();
             } elseif ($method === 'POST') {
                 if (!isLoggedIn()) validateApiKey();
-                toggleGpioSwitch();
+                postGpioSwitches();
             } else {
                 sendJSON(['error' => 'Method not allowed'], 405);
             }
@@ -269,6 +300,9 @@ function getStatus() {
         ];
     }
     
+    // Fahraufträge pro Tor (JSON, nur wenn Spalte vorhanden)
+    $status['queue_depth'] = isset($status['queue_depth']) ? (json_decode($status['queue_depth'], true) ?: []) : [];
+    
     // Gate Positions holen
     $stmt = $db->query('SELECT motor_name, position FROM gate_status');
     $gates = $stmt->fetchAll(PDO::FETCH_KEY_PAIR);
@@ -310,6 +344,14 @@ function updateStatus() {
         sendJSON(['error' => 'Invalid JSON'], 400);
     }
     
+    storeStatus($input);
+    sendJSON(['success' => true]);
+}
+
+/**
+ * Speichert einen Status-Report des Pi (gemeinsam für /status und /sync)
+ */
+function storeStatus($input) {
     $db = getDB();
     
     // === LOGGING OPTIMIERUNG ===
@@ -359,6 +401,19 @@ function updateStatus() {
         isset($input['is_busy']) ? (int)$input['is_busy'] : 0
     ]);
     
+    // Fahraufträge pro Tor (Spalte queue_depth, siehe update_schema.sql)
+    if (isset($input['queue_depth']) && is_array($input['queue_depth'])) {
+        try {
+            $stmt = $db->prepare('
+                UPDATE status SET queue_depth = ?
+                WHERE id = (SELECT id FROM (SELECT id FROM status ORDER BY id DESC LIMIT 1) as t)
+            ');
+            $stmt->execute([json_encode($input['queue_depth'])]);
+        } catch (PDOException $e) {
+            // Spalte fehlt (Migration noch nicht ausgeführt) → ignorieren
+        }
+    }
+    
     // Gate Positions speichern
     if (isset($input['gate_positions']) && is_array($input['gate_positions'])) {
         foreach ($input['gate_positions'] as $motor => $position) {
@@ -378,29 +433,75 @@ function updateStatus() {
             $stmt->execute([$motor, $newPos, 'UPDATE', $newPos]);
         }
     }
-    
-    sendJSON(['success' => true]);
 }
 
 /**
  * GET /api/command - Offene Befehle abrufen
+ *
+ * Mit ?wait=N (Sekunden, max. LONG_POLL_MAX_WAIT) blockiert die Anfrage, bis ein
+ * Befehl eintrifft oder die Wartezeit abgelaufen ist (Long-Polling). Ohne
+ * `wait` wird wie bisher sofort geantwortet.
  */
 function getPendingCommands() {
-    $db = getDB();
-    $stmt = $db->query("SELECT * FROM commands WHERE status = 'pending' ORDER BY created_at ASC");
-    $commands = $stmt->fetchAll();
+    $wait = min(max((int)($_GET['wait'] ?? 0), 0), LONG_POLL_MAX_WAIT);
+    $deadline = microtime(true) + $wait;
     
-    // Mark as executing
-    if ($commands) {
-        $ids = array_column($commands, 'id');
-        $inQuery = implode(',', array_fill(0, count($ids), '?'));
-        $stmt = $db->prepare("UPDATE commands SET status = 'executing' WHERE id IN ($inQuery)");
-        $stmt->execute($ids);
+    if ($wait > 0) {
+        set_time_limit($wait + 10);
+        header('X-Long-Poll: ' . $wait);
+    }
+    
+    $commands = claimPendingCommands();
+    while (!$commands && microtime(true) < $deadline) {
+        usleep(500000);
+        if (hasPendingCommands()) {
+            $commands = claimPendingCommands();
+        }
     }
     
     sendJSON($commands);
 }
 
+/**
+ * Günstige Prüfung (Index idx_status) ob offene Befehle vorliegen
+ */
+function hasPendingCommands() {
+    $db = getDB();
+    $stmt = $db->query("SELECT 1 FROM commands WHERE status = 'pending' LIMIT 1");
+    return (bool)$stmt->fetchColumn();
+}
+
+/**
+ * Holt alle offenen Befehle und markiert sie als 'executing'
+ *
+ * Läuft in einer Transaktion mit Zeilensperre, damit eine parallel laufende
+ * Long-Poll-Anfrage und ein Sync denselben Befehl nicht doppelt ausliefern.
+ */
+function claimPendingCommands() {
+    $db = getDB();
+    $db->beginTransaction();
+    
+    try {
+        $stmt = $db->query("SELECT * FROM commands WHERE status = 'pending' ORDER BY created_at ASC FOR UPDATE");
+        $commands = $stmt->fetchAll();
+        
+        // Mark as executing
+        if ($commands) {
+            $ids = array_column($commands, 'id');
+            $inQuery = implode(',', array_fill(0, count($ids), '?'));
+            $stmt = $db->prepare("UPDATE commands SET status = 'executing' WHERE id IN ($inQuery)");
+            $stmt->execute($ids);
+        }
+        
+        $db->commit();
+    } catch (Exception $e) {
+        $db->rollBack();
+        throw $e;
+    }
+    
+    return $commands;
+}
+
 /**
  * POST /api/command - Neuen Befehl hinzufügen
  */
@@ -428,6 +529,11 @@ function addCommand() {
  * POST /api/command/{id}/complete
  */
 function completeCommand($id) {
+    markCommandCompleted($id);
+    sendJSON(['success' => true]);
+}
+
+function markCommandCompleted($id) {
     $db = getDB();
     $stmt = $db->prepare('
         UPDATE commands SET
@@ -438,7 +544,6 @@ function completeCommand($id) {
     $stmt->execute(['completed', $id]);
     
     logMessage('INFO', "Befehl ausgeführt: ID $id");
-    sendJSON(['success' => true]);
 }
 
 /**
@@ -446,8 +551,11 @@ function completeCommand($id) {
  */
 function failCommand($id) {
     $input = json_decode(file_get_contents('php://input'), true);
-    $error = $input['error'] ?? 'Unknown error';
-    
+    markCommandFailed($id, $input['error'] ?? 'Unknown error');
+    sendJSON(['success' => true]);
+}
+
+function markCommandFailed($id, $error) {
     $db = getDB();
     $stmt = $db->prepare('
         UPDATE commands SET
@@ -459,7 +567,6 @@ function failCommand($id) {
     $stmt->execute(['failed', $error, $id]);
     
     logMessage('ERROR', "Befehl fehlgeschlagen: ID $id - $error");
-    sendJSON(['success' => true]);
 }
 
 /**
@@ -486,6 +593,10 @@ function handleLogin() {
  * GET /api/ventilation - Ventilation Config abrufen
  */
 function getVentilationConfig() {
+    sendIfModified('ventilation');
+}
+
+function loadVentilationConfig() {
     $db = getDB();
     $stmt = $db->query('SELECT * FROM ventilation_config LIMIT 1');
     $config = $stmt->fetch();
@@ -511,7 +622,7 @@ function getVentilationConfig() {
     ');
     $config['custom_phases'] = $stmt->fetchAll();
     
-    sendJSON($config);
+    return $config;
 }
 
 /**
@@ -575,6 +686,10 @@ function markVentilationRun() {
  * GET /api/gate-auto-mode - Gate Auto Mode Einstellungen abrufen
  */
 function getGateAutoMode() {
+    sendIfModified('gate-auto-mode');
+}
+
+function loadGateAutoMode() {
     $db = getDB();
     $stmt = $db->query('SELECT motor_name, auto_enabled FROM gate_auto_mode');
     $rows = $stmt->fetchAll(PDO::FETCH_ASSOC);
@@ -599,13 +714,17 @@ function getGateAutoMode() {
         }
     }
     
-    sendJSON($settings);
+    return $settings;
 }
 
 /**
  * GET /api/gate-enabled - Gate Enabled Status abrufen (Wintermodus)
  */
 function getGateEnabled() {
+    sendIfModified('gate-enabled');
+}
+
+function loadGateEnabled() {
     $db = getDB();
     $stmt = $db->query('SELECT motor_name, enabled FROM gate_status ORDER BY motor_name');
     $rows = $stmt->fetchAll(PDO::FETCH_ASSOC);
@@ -624,7 +743,7 @@ function getGateEnabled() {
         ];
     }
     
-    sendJSON($settings);
+    return $settings;
 }
 
 /**
@@ -688,19 +807,252 @@ function updateGateAutoMode() {
  * GET /api/gpio-switches - GPIO Switches Status abrufen
  */
 function getGpioSwitches() {
+    sendIfModified('gpio-switches');
+}
+
+function loadGpioSwitches() {
+    return selectGpioSwitches();
+}
+
+/**
+ * Schalter-Zeilen inkl. angewendetem Zustand (ohne applied_*, solange die Migration fehlt)
+ */
+function selectGpioSwitches($where = '', $params = []) {
+    $db = getDB();
+    try {
+        $stmt = $db->prepare("SELECT name, gpio_pin, state, applied_state, applied_at FROM gpio_switches $where ORDER BY id");
+        $stmt->execute($params);
+    } catch (PDOException $e) {
+        // Spalten fehlen (update_schema.sql noch nicht ausgeführt) → ohne Ist-Zustand
+        $stmt = $db->prepare("SELECT name, gpio_pin, state FROM gpio_switches $where ORDER BY id");
+        $stmt->execute($params);
+    }
+    return $stmt->fetchAll();
+}
+
+/**
+ * Nur Schalter, die seit der dem Pi bekannten Version geändert wurden
+ * (inkrementeller Abgleich im Sync, der Pi ergänzt sie zu seiner vollständigen Liste).
+ *
+ * Die Version enthält den Zeitpunkt der letzten Änderung (`updated_at`) und einen
+ * Stempel über Namen/Pins. Sind Schalter hinzugekommen, entfernt, umbenannt oder
+ * umgepinnt, oder ist die Version nicht lesbar, wird null geliefert – dann geht die
+ * vollständige Liste raus.
+ */
+function loadGpioSwitchChanges($knownVersion, $version) {
+    $known = explode('.', trim((string)$knownVersion, '"'));
+    $current = explode('.', trim($version, '"'));
+    if (count($known) !== 3 || count($current) !== 3 || $known[1] !== $current[1] || !ctype_digit($known[2])) {
+        return null;
+    }
+    // >= statt >: updated_at hat nur Sekunden-Auflösung (doppelte Zeilen schaden nicht)
+    return selectGpioSwitches('WHERE UNIX_TIMESTAMP(updated_at) >= ?', [(int)$known[2]]);
+}
+
+/**
+ * Speichert die vom Pi angewendeten Schalter-Zustände (ein Statement pro Eintrag, eine Transaktion)
+ *
+ * Einträge: [{"name": "Bewässerung 1", "state": true, "applied_at": 1767225600}, ...]
+ * `updated_at` bleibt unverändert (zeigt die letzte Umschaltung durch den Benutzer).
+ */
+function storeSwitchStates($entries) {
+    if (!is_array($entries) || !$entries) {
+        return 0;
+    }
+    
+    $db = getDB();
+    $stmt = $db->prepare('
+        UPDATE gpio_switches
+        SET applied_state = ?, applied_at = COALESCE(FROM_UNIXTIME(?), CURRENT_TIMESTAMP), updated_at = updated_at
+        WHERE name = ?
+    ');
+    $count = 0;
+    $db->beginTransaction();
+    try {
+        foreach (array_slice($entries, 0, 100) as $entry) {
+            if (!is_array($entry) || !isset($entry['name']) || !array_key_exists('state', $entry)) {
+                continue;
+            }
+            $appliedAt = isset($entry['applied_at']) && is_numeric($entry['applied_at']) ? (int)$entry['applied_at'] : null;
+            $stmt->execute([(int)(bool)$entry['state'], $appliedAt, $entry['name']]);
+            $count++;
+        }
+        $db->commit();
+    } catch (PDOException $e) {
+        // Spalten fehlen (Migration noch nicht ausgeführt) → Meldung verwerfen, Sync läuft weiter
+        $db->rollBack();
+        return 0;
+    }
+    return $count;
+}
+
+/**
+ * POST /api/sync - Gebündelter Abgleich mit dem Pi (ein Round-Trip pro Poll-Zyklus)
+ *
+ * Request:
+ *   {
+ *     "status": { ...wie POST /api/status... },
+ *     "acks": [ {"id": 12, "status": "completed"}, {"id": 13, "status": "failed", "error": "..."} ],
+ *     "switches": [ {"name": "Bewässerung 1", "state": true, "applied_at": 1767225600} ],  (optional)
+ *     "versions": { "gate-auto-mode": "\"ab12...\"", ... },  (optional, bekannte ETags)
+ *     "commands": false   (optional, wenn der Pi Befehle per Long-Polling abholt)
+ *   }
+ *
+ * Response:
+ *   {
+ *     "commands": [...], "gate_auto_mode": {...}, "gate_enabled": {...},
+ *     "ventilation": {...}, "gpio_switches": [...], "versions": {...}, "server_time": "..."
+ *   }
+ *
+ * Konfigurations-Abschnitte, deren Version der Pi bereits kennt, werden weggelassen.
+ * Kennt der Pi eine ältere Schalter-Version, kommen statt der ganzen Liste nur die
+ * seitdem geänderten Schalter ("gpio_switches_changed"); bei geänderten Namen/Pins
+ * die ganze Liste (siehe loadGpioSwitchChanges).
+ */
+function syncDevice() {
+    $input = json_decode(file_get_contents('php://input'), true);
+    
+    if (!is_array($input)) {
+        sendJSON(['error' => 'Invalid JSON'], 400);
+    }
+    
+    // 1. Rückmeldungen zu ausgeführten Befehlen
+    foreach ($input['acks'] ?? [] as $ack) {
+        if (!isset($ack['id'])) {
+            continue;
+        }
+        if (($ack['status'] ?? 'completed') === 'failed') {
+            markCommandFailed((int)$ack['id'], $ack['error'] ?? 'Unknown error');
+        } else {
+            markCommandCompleted((int)$ack['id']);
+        }
+    }
+    
+    // 2. Status und angewendete Schalter-Zustände speichern
+    if (!empty($input['status']) && is_array($input['status'])) {
+        storeStatus($input['status']);
+    }
+    storeSwitchStates($input['switches'] ?? []);
+    
+    // 3. Offene Befehle + geänderte Konfiguration zurückgeben
+    $response = ['commands' => ($input['commands'] ?? true) ? claimPendingCommands() : []];
+    $known = is_array($input['versions'] ?? null) ? $input['versions'] : [];
+    $versions = [];
+    
+    foreach (configResources() as $resource => [$key, $loader]) {
+        if ($resource === 'settings') {
+            continue; // Settings werden nur beim Start/RESTART geladen
+        }
+        $version = configVersion($resource);
+        $versions[$resource] = $version;
+        if (($known[$resource] ?? null) === $version) {
+            continue;
+        }
+        $changes = $resource === 'gpio-switches' && isset($known[$resource])
+            ? loadGpioSwitchChanges($known[$resource], $version)
+            : null;
+        if ($changes !== null) {
+            $response['gpio_switches_changed'] = $changes;
+        } else {
+            $response[$key] = $loader();
+        }
+    }
+    
+    $response['versions'] = $versions;
+    $response['server_time'] = date('Y-m-d H:i:s');
+    sendJSON($response);
+}
+
+// ===== KONFIGURATIONS-VERSIONEN (ETag) =====
+
+/**
+ * Konfigurations-Ressourcen: Endpoint => [Schlüssel im Sync-Response, Loader]
+ */
+function configResources() {
+    return [
+        'gate-auto-mode' => ['gate_auto_mode', 'loadGateAutoMode'],
+        'gate-enabled'   => ['gate_enabled', 'loadGateEnabled'],
+        'ventilation'    => ['ventilation', 'loadVentilationConfig'],
+        'gpio-switches'  => ['gpio_switches', 'loadGpioSwitches'],
+        'settings'       => [null, 'loadSystemSettings']
+    ];
+}
+
+/**
+ * Liefert einen günstigen Versions-Stempel (ETag) für eine Konfigurations-Ressource.
+ *
+ * Es wird nur eine einzelne Aggregat-Abfrage über die relevanten Spalten ausgeführt
+ * (kein Aufbereiten der Antwort). Bewusst inhaltsbasiert statt über updated_at,
+ * da TIMESTAMP nur Sekunden-Auflösung hat und schnelle Umschaltungen sonst
+ * dieselbe Version bekämen.
+ */
+function configVersion($resource) {
+    $queries = [
+        'gate-auto-mode' => "SELECT GROUP_CONCAT(motor_name, '=', auto_enabled ORDER BY motor_name) FROM gate_auto_mode",
+        'gate-enabled'   => "SELECT GROUP_CONCAT(motor_name, '=', enabled ORDER BY motor_name) FROM gate_status",
+        'ventilation'    => "SELECT CONCAT_WS('|',
+                                (SELECT CONCAT_WS(',', enabled, midday_enabled, evening_enabled, offset_minutes, duration_minutes, last_run, latitude, longitude)
+                                 FROM ventilation_config LIMIT 1),
+                                (SELECT GROUP_CONCAT(id, ',', IFNULL(name, ''), ',', start_time, ',', end_time, ',', enabled ORDER BY id)
+                                 FROM custom_ventilation_phases))",
+        'gpio-switches'  => "SELECT GROUP_CONCAT(name, '=', gpio_pin, '=', state ORDER BY id) FROM gpio_switches",
+        'settings'       => "SELECT GROUP_CONCAT(setting_key, '=', setting_value ORDER BY setting_key) FROM system_settings"
+    ];
+    
     $db = getDB();
-    $stmt = $db->query('SELECT name, gpio_pin, state FROM gpio_switches ORDER BY id');
-    $switches = $stmt->fetchAll();
+    $stamp = $db->query($queries[$resource])->fetchColumn();
+    $version = substr(md5($resource . '|' . $stamp), 0, 16);
+    
+    if ($resource === 'gpio-switches') {
+        // Stempel über Namen/Pins + letzte Änderung für den inkrementellen Abgleich
+        $row = $db->query("
+            SELECT GROUP_CONCAT(id, '=', name, '=', gpio_pin ORDER BY id), UNIX_TIMESTAMP(MAX(updated_at))
+            FROM gpio_switches
+        ")->fetch(PDO::FETCH_NUM);
+        $version .= '.' . substr(md5((string)$row[0]), 0, 8) . '.' . (int)$row[1];
+    }
+    return '"' . $version . '"';
+}
+
+/**
+ * GET-Handler mit bedingter Auslieferung: 304 Not Modified, wenn der Client
+ * die aktuelle Version bereits kennt (If-None-Match oder ?version=, falls
+ * der Hoster Header entfernt), sonst die vollständige JSON-Antwort mit ETag.
+ */
+function sendIfModified($resource) {
+    $version = configVersion($resource);
+    header('ETag: ' . $version);
+    header('Cache-Control: no-cache');
+    
+    $clientVersion = $_SERVER['HTTP_IF_NONE_MATCH'] ?? ($_GET['version'] ?? '');
+    if ($clientVersion === $version) {
+        http_response_code(304);
+        exit;
+    }
     
-    sendJSON($switches);
+    $loader = configResources()[$resource][1];
+    sendJSON($loader());
 }
 
 /**
- * POST /api/gpio-switches - GPIO Switch umschalten
+ * POST /api/gpio-switches - GPIO Switch umschalten (Web) bzw. angewendete Zustände melden (Pi)
+ *
+ * Rückmeldung des Pi (ohne Sync): {"applied": [{"name": "...", "state": true, "applied_at": 1767225600}]}
  */
-function toggleGpioSwitch() {
+function postGpioSwitches() {
     $input = json_decode(file_get_contents('php://input'), true);
     
+    if (isset($input['applied'])) {
+        sendJSON(['success' => true, 'stored' => storeSwitchStates($input['applied'])]);
+    }
+    
+    toggleGpioSwitch($input);
+}
+
+/**
+ * GPIO Switch umschalten
+ */
+function toggleGpioSwitch($input) {
     if (!isset($input['name']) || !isset($input['state'])) {
         sendJSON(['error' => 'name and state required'], 400);
     }
@@ -893,10 +1245,17 @@ function getGateStatus() {
 
 /**
  * POST /api/gate-status - Tor-Position aktualisieren
+ *
+ * Einzeln: {"motor_name": "GH1_VORNE", "position": 40}
+ * Gebündelt (Write-Behind vom Pi): {"positions": {"GH1_VORNE": 40, ...}}
  */
 function updateGateStatus() {
     $input = json_decode(file_get_contents('php://input'), true);
     
+    if (isset($input['positions']) && is_array($input['positions'])) {
+        updateGatePositions($input['positions']);
+    }
+    
     if (!isset($input['motor_name']) || !isset($input['position'])) {
         sendJSON(['error' => 'Missing motor_name or position'], 400);
     }
@@ -921,10 +1280,42 @@ function updateGateStatus() {
     sendJSON(['success' => true]);
 }
 
+/**
+ * Speichert mehrere Tor-Positionen in einer Transaktion (unbekannte Tore werden übersprungen)
+ */
+function updateGatePositions($positions) {
+    $db = getDB();
+    $stmt = $db->prepare('
+        UPDATE gate_status 
+        SET position = ?, updated_at = CURRENT_TIMESTAMP 
+        WHERE motor_name = ?
+    ');
+    
+    $updated = [];
+    $db->beginTransaction();
+    foreach ($positions as $motor => $position) {
+        $stmt->execute([(int)$position, $motor]);
+        if ($stmt->rowCount() > 0) {
+            $updated[] = "$motor=" . (int)$position . "%";
+        }
+    }
+    $db->commit();
+    
+    if ($updated) {
+        logMessage('INFO', 'Gate positions updated: ' . implode(', ', $updated));
+    }
+    
+    sendJSON(['success' => true, 'updated' => count($updated)]);
+}
+
 /**
  * GET /api/settings - System Settings abrufen
  */
 function getSystemSettings() {
+    sendIfModified('settings');
+}
+
+function loadSystemSettings() {
     $db = getDB();
     $stmt = $db->query('SELECT setting_key, setting_value, setting_type, description, category FROM system_settings ORDER BY category, setting_key');
     $settings = $stmt->fetchAll();
@@ -954,7 +1345,7 @@ function getSystemSettings() {
         ];
     }
     
-    sendJSON($grouped);
+    return $grouped;
 }
 
 /**
@@ -996,6 +1387,42 @@ function updateSystemSettings() {
     sendJSON(['success' => true, 'updated' => $updated]);
 }
 
+/**
+ * POST /api/logs - Gesammelte Log-Meldungen des Pi in einem Insert speichern
+ *
+ * Body: {"entries": [{"level": "WARNING", "message": "...", "ts": 1767225600}, ...]}
+ * `ts` (Unix-Zeit) ist der Zeitpunkt auf dem Pi; fehlt er, gilt die Serverzeit.
+ */
+function insertLogs() {
+    $input = json_decode(file_get_contents('php://input'), true);
+    
+    if (!isset($input['entries']) || !is_array($input['entries'])) {
+        sendJSON(['error' => 'Missing entries'], 400);
+    }
+    
+    $levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'];
+    $rows = [];
+    $params = [];
+    foreach (array_slice($input['entries'], 0, 500) as $entry) {
+        if (!is_array($entry) || !isset($entry['message'])) {
+            continue;
+        }
+        $level = strtoupper($entry['level'] ?? 'INFO');
+        $rows[] = '(?, ?, COALESCE(FROM_UNIXTIME(?), CURRENT_TIMESTAMP))';
+        $params[] = in_array($level, $levels, true) ? $level : 'INFO';
+        $params[] = '[Pi] ' . mb_substr((string)$entry['message'], 0, 2000);
+        $params[] = isset($entry['ts']) && is_numeric($entry['ts']) ? (int)$entry['ts'] : null;
+    }
+    
+    if ($rows) {
+        $db = getDB();
+        $stmt = $db->prepare('INSERT INTO logs (level, message, created_at) VALUES ' . implode(', ', $rows));
+        $stmt->execute($params);
+    }
+    
+    sendJSON(['success' => true, 'inserted' => count($rows)]);
+}
+
 /**
  * POST /api/restart-service - Fugt einen RESTART-Befehl für den Pi hinzu
  */
@@ -1055,6 +1482,37 @@ function validateSettingValue($key, $value) {
         return is_numeric($value) && $value >= 5 && $value <= 120;
     }
     
+    // Regler-Validierung
+    if ($key === 'AUTO_CONTROLLER') {
+        return in_array($value, ['step', 'pi', 'predictive'], true);
+    }
+    if ($key === 'CONTROL_KP') {
+        return is_numeric($value) && $value >= 0.5 && $value <= 100;
+    }
+    if ($key === 'CONTROL_TI') {
+        return is_numeric($value) && $value >= 0 && $value <= 7200;
+    }
+    if ($key === 'CONTROL_MIN_MOVE') {
+        return is_numeric($value) && $value >= 1 && $value <= 50;
+    }
+    if ($key === 'CONTROL_MIN_INTERVAL') {
+        return is_numeric($value) && $value >= 0 && $value <= 3600;
+    }
+    if ($key === 'CONTROL_HORIZON') {
+        return is_numeric($value) && $value >= 60 && $value <= 3600;
+    }
+    
+    // Bewässerungs-Validierung
+    if ($key === 'IRRIGATION_MAX_ON') {
+        return is_numeric($value) && $value >= 60 && $value <= 7200;
+    }
+    if ($key === 'IRRIGATION_PAUSE') {
+        return is_numeric($value) && $value >= 0 && $value <= 300;
+    }
+    if ($key === 'IRRIGATION_PROGRAMS') {
+        return is_string($value) && is_array(json_decode($value, true));
+    }
+    
     // Unbekannter Key
     return false;
 }
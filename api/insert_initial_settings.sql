@@ -24,7 +24,20 @@ INSERT INTO system_settings (setting_key, setting_value, setting_type, descripti
 
 -- Netzwerk/Retry
 ('MAX_RETRIES', '3', 'int', 'Maximale Anzahl Wiederholungen bei API-Fehlern', 'network'),
-('RETRY_DELAY', '30', 'int', 'Wartezeit zwischen Wiederholungen (Sekunden)', 'network')
+('RETRY_DELAY', '30', 'int', 'Wartezeit zwischen Wiederholungen (Sekunden)', 'network'),
+
+-- Regler der Automatik
+('AUTO_CONTROLLER', 'step', 'string', 'Regler: step (feste Schritte), pi, predictive', 'control'),
+('CONTROL_KP', '10.0', 'float', 'Verstärkung (% Öffnung je °C Abweichung)', 'control'),
+('CONTROL_TI', '900', 'int', 'Nachstellzeit des I-Anteils (Sekunden, 0 = aus)', 'control'),
+('CONTROL_MIN_MOVE', '5', 'int', 'Minimale Positionsänderung für eine Fahrt (%, nur pi/predictive)', 'control'),
+('CONTROL_MIN_INTERVAL', '300', 'int', 'Mindestabstand zwischen zwei Fahrten einer Zone (Sekunden, nur pi/predictive)', 'control'),
+('CONTROL_HORIZON', '600', 'int', 'Prognosehorizont für predictive (Sekunden)', 'control'),
+
+-- Bewässerung (läuft lokal auf dem Pi)
+('IRRIGATION_MAX_ON', '1800', 'int', 'Maximale Öffnungsdauer eines Ventils (Sekunden), danach schließt der Pi selbst', 'irrigation'),
+('IRRIGATION_PAUSE', '5', 'int', 'Pause zwischen zwei Zonen (Sekunden)', 'irrigation'),
+('IRRIGATION_PROGRAMS', '[]', 'string', 'Programme (JSON): [{"name", "start": "06:00", "days": [0-6], "zones": [...], "duration": s}]', 'irrigation')
 
 ON DUPLICATE KEY UPDATE 
     setting_value = VALUES(setting_value),
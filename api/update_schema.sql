@@ -0,0 +1,15 @@
+-- =====================================================
+-- Gewächshaus-Steuerung - Schema-Updates
+-- =====================================================
+-- Für bestehende Installationen einmalig ausführen.
+-- Neuinstallationen nutzen complete_schema.sql (enthält alle Änderungen).
+-- =====================================================
+
+-- Fahraufträge pro Tor (Status-Report des Pi)
+ALTER TABLE status
+    ADD COLUMN queue_depth TEXT DEFAULT NULL COMMENT 'JSON: laufende + wartende Fahraufträge pro Tor' AFTER is_busy;
+
+-- Vom Pi angewendeter Schaltzustand (inkrementeller Schalter-Abgleich)
+ALTER TABLE gpio_switches
+    ADD COLUMN applied_state TINYINT(1) DEFAULT NULL COMMENT 'Vom Pi zuletzt angewendeter Schaltzustand (NULL = noch nicht gemeldet)' AFTER state,
+    ADD COLUMN applied_at TIMESTAMP NULL DEFAULT NULL COMMENT 'Zeitpunkt der Anwendung auf dem Pi' AFTER applied_state;
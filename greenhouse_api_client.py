@@ -10,24 +10,39 @@ Smart Polling Intervals:
 - 3s nach Befehl (Development Mode)
 - 10s normal
 - 30s wenn Temperatur >10° vom Sollwert
+
+Laufzeit (`CLIENT_RUNTIME`):
+- `async` (Standard): Befehle, Status, Automatik, Lüftung und GPIO-Schalter laufen
+  als unabhängige asyncio-Tasks; Motorläufe sind awaitbare Jobs in Worker-Threads,
+  sodass Status und Temperaturen auch während langer Torfahrten gemeldet werden.
+- `sync`: klassische, serielle Hauptschleife.
 """
 
+import asyncio
 import time
+import queue
+import threading
 import requests
 import json
-import subprocess
 import sys
 import signal
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from astral import LocationInfo
-from astral.sun import sun
-import pytz
 
 # Lade Umgebungsvariablen aus .env Datei
 load_dotenv()
 
+import greenhouse_http
+import greenhouse_irrigation
+import greenhouse_log
+import greenhouse_metrics
+import greenhouse_network
+import greenhouse_state
+import greenhouse_switches
+import greenhouse_ventilation
+
 # Importiere greenhouse_web.py Komponenten
 try:
     from greenhouse_web import init_global_system, SENSORS_AVAILABLE, GPIO, GPIO_SWITCHES
@@ -57,7 +72,35 @@ TEMP_THRESHOLD = 10.0   # Grad Celsius
 
 # Retry-Konfiguration
 MAX_RETRIES = 3
-RETRY_DELAY = 30  # Sekunden
+RETRY_DELAY = 30  # Sekunden (Obergrenze für das Backoff)
+RETRY_BASE_DELAY = 1  # Sekunden (erster Retry, verdoppelt sich mit Jitter)
+
+# Zeitbudget für alle Requests eines Zyklus bzw. Tasks; reicht es nicht, gilt der lokale Stand
+REQUEST_BUDGET = 20  # Sekunden
+MIN_REQUEST_TIME = 2  # Sekunden – darunter wird kein Request mehr begonnen
+
+# Gebündelter Sync: Status, Befehls-Rückmeldungen, offene Befehle und Konfiguration
+# in EINEM Request pro Zyklus (POST /sync). Bei Fehlern wird auf die einzelnen
+# Endpoints zurückgefallen, nach SYNC_MAX_FAILURES Ablehnungen in Folge (alte API
+# ohne /sync, siehe SYNC_UNSUPPORTED_STATUS) bis zum nächsten RESTART-Befehl nur
+# noch die einzelnen Endpoints genutzt.
+SYNC_MODE = os.getenv("SYNC_MODE", "1") != "0"
+SYNC_MAX_FAILURES = 3
+SYNC_UNSUPPORTED_STATUS = (400, 404, 405)
+
+# Long-Polling: ein Hintergrund-Thread hält dauerhaft eine `GET /command?wait=N`
+# Anfrage offen. Neue Befehle werden sofort ausgeführt statt erst nach Ablauf
+# des Poll-Intervalls.
+LONG_POLL = os.getenv("LONG_POLL", "1") != "0"
+LONG_POLL_WAIT = 25  # Sekunden (Server-Maximum: LONG_POLL_MAX_WAIT in api/index.php)
+
+# Laufzeit: 'async' = unabhängige asyncio-Tasks, 'sync' = serielle Hauptschleife
+CLIENT_RUNTIME = os.getenv("CLIENT_RUNTIME", "async")
+
+# Wie lange der Async-Executor auf einen Befehl wartet, bevor er den nächsten
+# startet. Fahrbefehle laufen danach im Hintergrund weiter und werden von
+# späteren Befehlen (z.B. STOP oder CLOSE während OPEN) sofort umgelenkt.
+COMMAND_DISPATCH_WAIT = 0.5  # Sekunden
 
 # Koordinaten für Sunrise-Berechnung (aus .env)
 LAT_ENV = os.getenv("LATITUDE")
@@ -73,13 +116,70 @@ LAT = float(LAT_ENV)
 LON = float(LON_ENV)
 LOCATION = LocationInfo("Luzernenhof", "Germany", "Europe/Berlin", LAT, LON)
 
+# Lüftung: Plan wird nur bei neuem Tag/geänderter Konfiguration berechnet; geprüft
+# wird genau zur nächsten Phasengrenze (+ Reserve), spätestens alle VENTILATION_MAX_WAIT
+VENTILATION_MAX_WAIT = 60  # Sekunden
+TRANSITION_MARGIN = 0.5    # Sekunden nach der Phasengrenze
+
 # ===== GLOBALE VARIABLEN =====
 
 gh_system = None
 last_command_time = None
 running = True
 ventilation_active = False
-last_hotspot_state = None
+ventilation_schedule = greenhouse_ventilation.VentilationSchedule(LOCATION)
+sync_enabled = SYNC_MODE
+sync_failures = 0
+pending_acks = []  # Befehls-Rückmeldungen für den nächsten Sync
+acks_lock = threading.Lock()  # Ausführungs-Threads, Long-Poll und Sync greifen auf pending_acks zu
+
+# HTTP-Status des zuletzt abgelehnten Requests (4xx) pro Thread, siehe last_rejection()
+request_state = threading.local()
+
+# Befehle aus dem Long-Poll-Thread → Hauptschleife
+command_queue = queue.Queue()
+command_listener_thread = None
+
+# ETag-Cache für Konfigurations-Endpoints (gate-auto-mode, gate-enabled, ventilation, gpio-switches),
+# lokal gespeichert → nach einem Neustart ohne API sofort verfügbar
+config_cache = greenhouse_http.ConfigCache(greenhouse_state.get_store())
+
+# Konfigurations-Endpoints und ihr Schlüssel im Sync-Response
+SYNC_CONFIG_KEYS = {
+    'gate-auto-mode': 'gate_auto_mode',
+    'gate-enabled': 'gate_enabled',
+    'ventilation': 'ventilation',
+    'gpio-switches': 'gpio_switches'
+}
+
+# ===== METRIKEN =====
+# (Export über METRICS_PORT / METRICS_TEXTFILE, siehe greenhouse_metrics.py)
+
+CYCLE_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_cycle_duration_seconds", "Dauer eines Durchlaufs (serielle Schleife bzw. Async-Task)")
+PHASE_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_cycle_phase_duration_seconds", "Dauer der Phasen eines seriellen Zyklus")
+RETRIES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_retries_total", "Wiederholte API-Requests")
+SKIPPED_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_skipped_total", "Nicht gesendete Requests (Circuit offen, Budget erschöpft)")
+FALLBACKS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_offline_fallbacks_total", "Antworten aus dem lokalen Stand statt von der API")
+CACHE_LOOKUPS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_cache_lookups_total", "Zugriffe auf Konfigurations-Caches (hit/miss)")
+COMMAND_QUEUE_DEPTH = greenhouse_metrics.gauge(
+    "greenhouse_command_queue_depth", "Befehle, die auf Ausführung warten")
+PENDING_ACKS = greenhouse_metrics.gauge(
+    "greenhouse_pending_acks", "Befehls-Rückmeldungen für den nächsten Sync")
+
+def collect_metrics():
+    """Collector für Zustände, die der Client ohnehin führt"""
+    CACHE_LOOKUPS_TOTAL.set(config_cache.hits, cache="config", result="hit")
+    CACHE_LOOKUPS_TOTAL.set(config_cache.misses, cache="config", result="miss")
+    COMMAND_QUEUE_DEPTH.set(command_queue.qsize())
+    PENDING_ACKS.set(len(pending_acks))
+
+greenhouse_metrics.add_collector(collect_metrics)
 
 # ===== SIGNAL HANDLER =====
 
@@ -93,220 +193,251 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 # ===== HELPER FUNCTIONS =====
 
-def log(level, message):
-    """Formatiertes Logging"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"[{timestamp}] [{level}] {message}", flush=True)
+greenhouse_log.setup()
+logger = greenhouse_log.get_logger("client")
+
+def log(level, message, *args, ship=None, **fields):
+    """Formatiertes Logging über `greenhouse_log` (gepuffert, Rate-Limit, optional JSON).
+
+    `args` werden erst eingesetzt, wenn das Level tatsächlich ausgegeben wird;
+    `ship=True` schickt die Meldung zusätzlich an die `logs`-Tabelle der API.
+    """
+    greenhouse_log.log(logger, level, message, *args, ship=ship, **fields)
+
+def make_request(method, endpoint, data=None, conditional=False, query=None, timeout=10):
+    """HTTP-Request mit Backoff, Circuit Breaker und Zeitbudget.
+
+    Mit `conditional=True` wird die bekannte Version (ETag) mitgeschickt; bei
+    `304 Not Modified` liefert der `config_cache` die bisherigen Daten. Ist die
+    API nicht erreichbar, liefert er den zuletzt bekannten (lokal gespeicherten) Stand.
+    `query` ergänzt zusätzliche Query-Parameter (z.B. `wait` für Long-Polling).
 
-def make_request(method, endpoint, data=None, retry_count=0):
-    """HTTP-Request mit Retry-Logik"""
+    Fehlgeschlagene Requests werden bis zu `MAX_RETRIES`-mal mit
+    exponentiellem Backoff (Jitter, max. `RETRY_DELAY`) wiederholt – aber nur,
+    solange das Zeitbudget des Zyklus reicht (`greenhouse_http.budget`). Ist
+    der Circuit Breaker der Ressource offen, wird gar nicht erst gesendet.
+    """
+    request_state.rejected = None
+    
     # Query Parameter Ergänzung für bessere Kompatibilität (Hostsharing Header-Stripping)
     url = f"{API_URL}/{endpoint}"
     
     # Wir senden den Key im Header UND (für Hostsharing) als Parameter
     params = {'api_key': API_KEY}
+    if query:
+        params.update(query)
     headers = {
         'X-API-Key': API_KEY,
         'Content-Type': 'application/json'
     }
+    if conditional:
+        headers.update(config_cache.conditional_headers(endpoint))
     
-    try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-        elif method == 'POST':
-            response = requests.post(url, headers=headers, params=params, json=data, timeout=10)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-        
-        response.raise_for_status()
-        return response.json()
+    breaker = greenhouse_http.breaker(endpoint)
+    if not breaker.allow():
+        SKIPPED_TOTAL.inc(resource=breaker.name, reason="circuit")
+        log('DEBUG', "Circuit '%s' offen (noch %.0fs) → %s %s übersprungen", breaker.name, breaker.retry_in(), method, endpoint)
+        return offline_fallback(endpoint, conditional)
     
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            log('WARNING', f"Request failed, retry {retry_count + 1}/{MAX_RETRIES}: {e}")
-            time.sleep(RETRY_DELAY)
-            return make_request(method, endpoint, data, retry_count + 1)
-        else:
-            log('ERROR', f"Request failed after {MAX_RETRIES} retries: {e}")
-            return None
+    # Netzwerkwechsel (WLAN ↔ Hotspot) läuft → nicht senden, lokaler Stand
+    reason = greenhouse_http.paused()
+    if reason:
+        SKIPPED_TOTAL.inc(resource=breaker.name, reason="paused")
+        log('DEBUG', "API pausiert (%s) → %s %s übersprungen", reason, method, endpoint)
+        return offline_fallback(endpoint, conditional)
+    
+    attempt = 0
+    while True:
+        remaining = greenhouse_http.remaining_budget()
+        if remaining is not None and remaining < MIN_REQUEST_TIME:
+            SKIPPED_TOTAL.inc(resource=breaker.name, reason="budget")
+            log('WARNING', "Zeitbudget erschöpft → %s %s übersprungen", method, endpoint)
+            return offline_fallback(endpoint, conditional)
+        request_timeout = timeout if remaining is None else min(timeout, remaining)
+        
+        try:
+            # Gepoolte Keep-Alive Session (ein Handshake pro Poll-Zyklus statt pro Request)
+            if method == 'GET':
+                response = greenhouse_http.request('GET', url, headers=headers, params=params, timeout=request_timeout)
+            elif method == 'POST':
+                response = greenhouse_http.request('POST', url, headers=headers, params=params, json=data, timeout=request_timeout)
+            else:
+                raise ValueError(f"Unsupported method: {method}")
+            
+            response.raise_for_status()
+            if breaker.record_success():
+                log('INFO', "✅ Circuit '%s' wieder geschlossen", breaker.name)
+            if conditional:
+                return config_cache.update(endpoint, response)
+            return response.json()
+        
+        except requests.exceptions.HTTPError as e:
+            # Client-Fehler (4xx) sind nicht transient → kein Retry, Server erreichbar
+            if e.response is not None and 400 <= e.response.status_code < 500:
+                breaker.record_success()
+                request_state.rejected = e.response.status_code
+                log('ERROR', "Request %s %s abgelehnt: %s", method, endpoint, e)
+                return None
+            error = e
+        
+        except requests.exceptions.RequestException as e:
+            error = e
+        
+        if greenhouse_http.paused():
+            # Netzwerkwechsel während des Requests: kein Fehler der API, kein Retry
+            SKIPPED_TOTAL.inc(resource=breaker.name, reason="paused")
+            return offline_fallback(endpoint, conditional)
+        
+        if breaker.record_failure():
+            log('WARNING', "⚡ Circuit '%s' geöffnet (Pause %.0fs): %s", breaker.name, breaker.retry_in(), error)
+        
+        if attempt >= MAX_RETRIES or not breaker.allow():
+            log('ERROR', "Request %s %s fehlgeschlagen (%s Versuche): %s", method, endpoint, attempt + 1, error)
+            return offline_fallback(endpoint, conditional)
+        
+        delay = greenhouse_http.backoff_delay(attempt, RETRY_BASE_DELAY, RETRY_DELAY)
+        remaining = greenhouse_http.remaining_budget()
+        if remaining is not None and delay + MIN_REQUEST_TIME > remaining:
+            log('WARNING', "Request %s %s fehlgeschlagen, kein Budget für Retry: %s", method, endpoint, error)
+            return offline_fallback(endpoint, conditional)
+        
+        attempt += 1
+        RETRIES_TOTAL.inc(resource=breaker.name)
+        log('WARNING', "Request failed, retry %s/%s in %.1fs: %s", attempt, MAX_RETRIES, delay, error)
+        time.sleep(delay)
+
+def last_rejection():
+    """HTTP-Status (4xx), mit dem der Server den letzten `make_request` dieses Threads abgelehnt hat.
+
+    None, wenn er nicht abgelehnt wurde – auch wenn er wegen Netzwerkausfall,
+    Circuit Breaker, Zeitbudget oder Netzwerkwechsel `None` geliefert hat.
+    """
+    return getattr(request_state, 'rejected', None)
+
+def offline_fallback(endpoint, conditional):
+    """Letzter bekannter Stand eines Konfigurations-Endpoints, wenn die API nicht antwortet"""
+    if not conditional:
+        return None
+    data = config_cache.get(endpoint)
+    if data is not None:
+        FALLBACKS_TOTAL.inc(endpoint=endpoint)
+        log('WARNING', "API nicht erreichbar → verwende lokalen Stand für %s", endpoint)
+    return data
 
 # ===== GPIO SWITCHES =====
 
-def sync_gpio_switches():
-    """Synchronisiert GPIO-Schalter und steuert den Hotspot"""
-    global last_hotspot_state
+# Haus-WLAN ↔ Hotspot im eigenen Thread (nmcli blockiert die Regelschleife nicht)
+network = greenhouse_network.NetworkModeManager(log=log)
+
+def set_network_mode(state):
+    """Handler für den Schalter 'Zusatz': Hotspot an bzw. zurück ins Haus-WLAN.
+
+    Blockiert nicht: Der Wechsel läuft im `network`-Thread, bis dahin liefert
+    der Handler False und der Schalter bleibt ausstehend. Pin 25 schaltet der
+    `switch_manager` selbst.
+    """
+    return network.request(greenhouse_network.MODE_HOTSPOT if state else greenhouse_network.MODE_HOME)
+
+# Soll-/Ist-Tabelle der Schalter (nur Änderungen werden geschaltet und gemeldet)
+switch_manager = greenhouse_switches.SwitchManager(GPIO, GPIO_SWITCHES, handlers={'Zusatz': set_network_mode}, log=log)
+# Nach dem Netzwerkwechsel den Schalter sofort als angewendet übernehmen
+network.listeners.append(lambda mode: switch_manager.apply())
+
+# Lokale Bewässerung (Läufe, Programme, Max-Laufzeit) – wird in main() gestartet
+irrigation = None
+
+def sync_gpio_switches(switches=None):
+    """Gleicht die GPIO-Schalter mit der API ab (nur geänderte Schalter werden geschaltet).
     
+    `switches` kann bereits aus dem gebündelten Sync stammen; sonst wird
+    `gpio-switches` einzeln abgefragt. Ohne Sync werden angewendete
+    Änderungen direkt in einem Request zurückgemeldet, sonst mit dem
+    nächsten `POST /sync`.
+    """
     try:
-        # Status von API holen
-        switches = make_request('GET', 'gpio-switches')
-        
-        if not switches:
-            return
-
-        for sw in switches:
-            name = sw.get('name')   # z.B. "Bewässerung 1" oder "Zusatz"
-            state = sw.get('state') # True (AN) oder False (AUS)
-            
-          # --- SPEZIALFALL: HOTSPOT STEUERUNG ("Zusatz") ---
-            if name == "Zusatz":
-                # Wir prüfen, ob sich der Status geändert hat
-                if state != last_hotspot_state:
-                    
-                    if state == True:
-                        log('INFO', "📡 Schalter 'Zusatz' AN -> Starte HOTSPOT")
-                        
-                        # Pin 25 schalten
-                        if GPIO_SWITCHES.get(name):
-                            GPIO.output(GPIO_SWITCHES[name], GPIO.HIGH)
-                            
-                        # 1. Haus-WLAN sicherheitshalber trennen (falls noch an)
-                        HOME_WLAN = os.getenv("WIFI_SSID_HOME")
-                        if HOME_WLAN:
-                            subprocess.run(['sudo', 'nmcli', 'connection', 'down', HOME_WLAN])
-                        time.sleep(1)
-                        
-                        # 2. Hotspot starten
-                        HOTSPOT_SSID = os.getenv("WIFI_SSID_HOTSPOT")
-                        if HOTSPOT_SSID:
-                            subprocess.run(['sudo', 'nmcli', 'connection', 'up', HOTSPOT_SSID])
-                        
-                    else:
-                        log('INFO', "🏠 Schalter 'Zusatz' AUS -> Verbinde mit HAUS-WLAN")
-                        
-                        # Pin 25 aus
-                        if GPIO_SWITCHES.get(name):
-                            GPIO.output(GPIO_SWITCHES[name], GPIO.LOW)
-                        
-                        # 3. Zurück zum Haus-WLAN über die UUID
-                        WIFI_UUID = os.getenv("WIFI_UUID")
-                        if WIFI_UUID:
-                            cmd = ['sudo', 'nmcli', 'connection', 'up', 'uuid', WIFI_UUID]
-                        else:
-                            log('ERROR', "❌ WIFI_UUID nicht in .env gefunden!")
-                            continue
-                        
-                        result = subprocess.run(cmd, capture_output=True, text=True)
-                        
-                        # Prüfen ob es geklappt hat und Fehler ins Log schreiben
-                        if result.returncode == 0:
-                            log('INFO', "✅ Erfolgreich mit FritzBox verbunden")
-                        else:
-                            log('ERROR', f"❌ Fehler beim Verbinden: {result.stderr}")
-
-                    # Status merken
-                    last_hotspot_state = state
-                
-                # Wir sind fertig mit "Zusatz", weiter zum nächsten Schalter
-                continue
-
-            # --- NORMALE GPIO LOGIK (für Bewässerung etc.) ---
-            pin = GPIO_SWITCHES.get(name)
-            
-            if pin:
-                target_state = GPIO.HIGH if state else GPIO.LOW 
-                
-                # Aktuellen Status lesen um unnötiges Schalten zu vermeiden
-                current_state = GPIO.input(pin)
-                
-                if current_state != target_state:
-                    GPIO.output(pin, target_state)
-                    log('INFO', f"🔌 Schalter '{name}' (Pin {pin}) -> {'EIN' if state else 'AUS'}")
-                    
+        if switches is None:
+            switches = make_request('GET', 'gpio-switches', conditional=True)
+    
+        switch_manager.sync(switches)
+    
+        if not sync_enabled:
+            report_switch_states()
+    
     except Exception as e:
-        log('ERROR', f"Fehler bei GPIO-Sync: {e}")
+        log('ERROR', "Fehler bei GPIO-Sync: %s", e)
+
+def report_switch_states():
+    """Meldet angewendete Schalter-Zustände über `POST gpio-switches` (Fallback ohne Sync)"""
+    report = switch_manager.report()
+    if report and make_request('POST', 'gpio-switches', {'applied': report}) is not None:
+        switch_manager.reported(report)
 
 # ===== VENTILATION =====
 
 def get_ventilation_phases(config):
-    """Berechnet alle aktiven Lüftungsphasen für heute"""
-    phases = []
-    
+    """Alle aktiven Lüftungsphasen für heute (aus dem vorberechneten Plan)"""
     try:
-        tz = pytz.timezone('Europe/Zurich')
-        now = datetime.now(tz)
-        today = now.date()
-        
-        # Sonnenauf-/untergang berechnen
-        s = sun(LOCATION.observer, date=today, tzinfo=tz)
-        sunrise = s['sunrise']
-        sunset = s['sunset']
-        
-        # 1. Morgens: 1h nach Sonnenaufgang, 20 Min
-        if config.get('enabled'):
-            start = sunrise + timedelta(hours=1)
-            end = start + timedelta(minutes=20)
-            phases.append({'name': 'Morgens', 'start': start, 'end': end})
-            
-        # 2. Mittags: 12:00, 20 Min
-        if config.get('midday_enabled'):
-            start = datetime.combine(today, datetime.strptime("12:00", "%H:%M").time()).replace(tzinfo=tz)
-            end = start + timedelta(minutes=20)
-            phases.append({'name': 'Mittags', 'start': start, 'end': end})
-            
-        # 3. Abends: 1h vor Sonnenuntergang, 20 Min
-        if config.get('evening_enabled'):
-            start = sunset - timedelta(hours=1)
-            end = start + timedelta(minutes=20)
-            phases.append({'name': 'Abends', 'start': start, 'end': end})
-            
-        # 4. Individuelle Phasen
-        for custom in config.get('custom_phases', []):
-            if custom.get('enabled'):
-                try:
-                    start_time = datetime.strptime(custom['start_time'], "%H:%M:%S").time()
-                    end_time = datetime.strptime(custom['end_time'], "%H:%M:%S").time()
-                    
-                    start = datetime.combine(today, start_time).replace(tzinfo=tz)
-                    end = datetime.combine(today, end_time).replace(tzinfo=tz)
-                    
-                    if end < start:
-                        end += timedelta(days=1)
-                        
-                    phases.append({'name': custom.get('name', 'Custom'), 'start': start, 'end': end})
-                except Exception as e:
-                    log('WARNING', f"Fehler bei Custom Phase: {e}")
-                    
-        return phases
-        
+        now = datetime.now(ventilation_schedule.tz)
+        ventilation_schedule.update(config, now)
+        return [phase._asdict() for phase in ventilation_schedule.phases_on(now.date())]
     except Exception as e:
-        log('ERROR', f"Fehler bei Phasen-Berechnung: {e}")
+        log('ERROR', "Fehler bei Phasen-Berechnung: %s", e)
         return []
 
-def check_ventilation():
-    """Prüft ob Lüftung gestartet/beendet werden soll (Erweitert)"""
+def check_ventilation(config=None):
+    """Prüft ob Lüftung gestartet/beendet werden soll (Erweitert).
+
+    `config` kann bereits aus dem gebündelten Sync stammen; sonst wird
+    `ventilation` einzeln abgefragt.
+    """
     global ventilation_active
     
     # Ventilation Config von API holen
-    config = make_request('GET', 'ventilation')
+    if config is None:
+        config = make_request('GET', 'ventilation', conditional=True)
     if not config:
         return
 
-    phases = get_ventilation_phases(config)
-    now = datetime.now(pytz.timezone('Europe/Zurich'))
+    # Plan nur bei neuem Tag oder geänderter Konfiguration neu berechnen
+    now = datetime.now(ventilation_schedule.tz)
+    try:
+        ventilation_schedule.update(config, now)
+    except Exception as e:
+        log('ERROR', "Fehler bei Phasen-Berechnung: %s", e)
+        return
     
-    # Prüfen ob wir in IRGENDEINER Phase sind
-    active_phase = None
-    for phase in phases:
-        if phase['start'] <= now < phase['end']:
-            active_phase = phase['name']
-            break
+    # Prüfen ob wir in IRGENDEINER Phase sind (binäre Suche im Plan)
+    active_phase = ventilation_schedule.active(now)
     
     # LOGIK:
     
     # A) Starten (In Phase, aber noch nicht aktiv)
     if active_phase and not ventilation_active:
-        log('INFO', f"🌬️ Starte Lüftung: {active_phase}")
+        log('INFO', "🌬️ Starte Lüftung: %s", active_phase, ship=True)
         make_request('POST', 'command', {'command': 'OPEN_ALL'})
         make_request('POST', 'ventilation/mark-run')
         ventilation_active = True
         
     # B) Beenden (Nicht mehr in Phase, aber noch aktiv)
     elif not active_phase and ventilation_active:
-        log('INFO', "🛑 Beende Lüftung (Zeit abgelaufen)")
+        log('INFO', "🛑 Beende Lüftung (Zeit abgelaufen)", ship=True)
         make_request('POST', 'command', {'command': 'CLOSE_ALL'})
         make_request('POST', 'command', {'command': 'SET_MODE', 'parameters': {'mode': 'AUTO'}})
         ventilation_active = False
 
+def ventilation_wait():
+    """Sekunden bis zum nächsten Phasenbeginn/-ende (None ohne Plan)"""
+    if not ventilation_schedule.compilations:
+        return None
+    now = datetime.now(ventilation_schedule.tz)
+    transition = ventilation_schedule.next_transition(now)
+    return max(0.0, (transition - now).total_seconds()) + TRANSITION_MARGIN
+
+def ventilation_interval():
+    """Wartezeit des Lüftungs-Tasks: bis zur nächsten Phasengrenze, spätestens VENTILATION_MAX_WAIT"""
+    wait = ventilation_wait()
+    return VENTILATION_MAX_WAIT if wait is None else min(wait, VENTILATION_MAX_WAIT)
+
 # ===== GATE AUTO MODE =====
 
 # Cache für Gate Auto Settings (alle 10 Sekunden aktualisieren)
@@ -329,18 +460,21 @@ def get_gate_auto_settings():
     # Prüfe ob Cache noch gültig ist
     now = datetime.now()
     if gate_auto_cache_time and (now - gate_auto_cache_time).total_seconds() < GATE_AUTO_CACHE_DURATION:
+        CACHE_LOOKUPS_TOTAL.inc(cache="gate-auto-mode", result="hit")
         return gate_auto_cache
+    CACHE_LOOKUPS_TOTAL.inc(cache="gate-auto-mode", result="miss")
     
     # Hole neue Einstellungen von API
     try:
-        settings = make_request('GET', 'gate-auto-mode')
+        settings = make_request('GET', 'gate-auto-mode', conditional=True)
         if settings:
+            if settings != gate_auto_cache:
+                log('DEBUG', "Gate Auto Settings aktualisiert: %s", settings)
             gate_auto_cache = settings
             gate_auto_cache_time = now
-            log('DEBUG', f"Gate Auto Settings aktualisiert: {settings}")
             return settings
     except Exception as e:
-        log('WARNING', f"Konnte Gate Auto Settings nicht abrufen: {e}")
+        log('WARNING', "Konnte Gate Auto Settings nicht abrufen: %s", e)
     
     # Fallback: Alle Tore auf AUTO
     if not gate_auto_cache:
@@ -365,17 +499,20 @@ def get_gate_enabled_settings():
     
     now = datetime.now()
     if gate_enabled_cache_time and (now - gate_enabled_cache_time).total_seconds() < GATE_AUTO_CACHE_DURATION:
+        CACHE_LOOKUPS_TOTAL.inc(cache="gate-enabled", result="hit")
         return gate_enabled_cache
+    CACHE_LOOKUPS_TOTAL.inc(cache="gate-enabled", result="miss")
     
     try:
-        settings = make_request('GET', 'gate-enabled')
+        settings = make_request('GET', 'gate-enabled', conditional=True)
         if settings:
+            if settings != gate_enabled_cache:
+                log('DEBUG', "Gate Enabled Status aktualisiert: %s", settings)
             gate_enabled_cache = settings
             gate_enabled_cache_time = now
-            log('DEBUG', f"Gate Enabled Status aktualisiert: {settings}")
             return settings
     except Exception as e:
-        log('WARNING', f"Konnte Gate Enabled Status nicht abrufen: {e}")
+        log('WARNING', "Konnte Gate Enabled Status nicht abrufen: %s", e)
     
     # Fallback: Alle Tore aktiv
     if not gate_enabled_cache:
@@ -409,55 +546,78 @@ def calculate_poll_interval():
     # Normal
     return INTERVAL_NORMAL
 
-def sync_settings():
-    """Lädt Settings von API beim Start (einmalig)"""
+def apply_settings(settings):
+    """Übernimmt System-Settings (Format wie `GET /api/settings`) in Client und `gh_system`"""
     global INTERVAL_FAST, INTERVAL_NORMAL, INTERVAL_SLOW, TEMP_THRESHOLD
     global MAX_RETRIES, RETRY_DELAY, LOCATION
     
+    if not settings:
+        return
+    
+    # Polling-Intervalle
+    if 'polling' in settings:
+        INTERVAL_FAST = settings['polling']['INTERVAL_FAST']['value']
+        INTERVAL_NORMAL = settings['polling']['INTERVAL_NORMAL']['value']
+        INTERVAL_SLOW = settings['polling']['INTERVAL_SLOW']['value']
+        log('INFO', "Polling-Intervalle: Fast=%ss, Normal=%ss, Slow=%ss", INTERVAL_FAST, INTERVAL_NORMAL, INTERVAL_SLOW)
+    
+    # Temperatur
+    if 'temperature' in settings:
+        TEMP_THRESHOLD = settings['temperature']['TEMP_THRESHOLD']['value']
+        
+        # Aktualisiere gh_system Settings
+        if gh_system:
+            gh_system.target_temp = settings['temperature']['DEFAULT_TARGET_TEMP']['value']
+            gh_system.temp_hysteresis = settings['temperature']['TEMP_HYSTERESIS']['value']
+            log('INFO', "Temperatur-Settings: Target=%s°C, Hysterese=±%s°C", gh_system.target_temp, gh_system.temp_hysteresis)
+    
+    # Motor
+    if 'motor' in settings and gh_system:
+        gh_system.motor_runtime_open = settings['motor']['MOTOR_RUNTIME_OPEN']['value']
+        gh_system.motor_runtime_close = settings['motor']['MOTOR_RUNTIME_CLOSE']['value']
+        log('INFO', "Motor-Zeiten: Öffnen=%ss, Schließen=%ss", gh_system.motor_runtime_open, gh_system.motor_runtime_close)
+    
+    # Regler der Automatik
+    if 'control' in settings and gh_system:
+        gh_system.configure_controller(settings['control'])
+    
+    # Netzwerk
+    if 'network' in settings:
+        MAX_RETRIES = settings['network']['MAX_RETRIES']['value']
+        RETRY_DELAY = settings['network']['RETRY_DELAY']['value']
+    
+    # Bewässerung (Programme, Max-Laufzeit, Pause zwischen Zonen)
+    if 'irrigation' in settings and irrigation:
+        try:
+            irrigation.configure(settings['irrigation'])
+        except (ValueError, KeyError, TypeError) as e:
+            log('ERROR', "Ungültige Bewässerungs-Settings: %s", e)
+    
+    # Standort
+    if 'location' in settings:
+        lat = settings['location']['LOCATION_LAT']['value']
+        lon = settings['location']['LOCATION_LON']['value']
+        LOCATION = LocationInfo("Luzernenhof", "Germany", "Europe/Berlin", lat, lon)
+        ventilation_schedule.set_location(LOCATION)
+
+def sync_settings():
+    """Lädt Settings von der API (beim Start im Hintergrund und nach RESTART) und speichert sie lokal"""
+    global sync_enabled, sync_failures
+    
+    # Sync-Modus nach RESTART erneut versuchen
+    sync_enabled = SYNC_MODE
+    sync_failures = 0
+    
     try:
-        response = make_request('GET', 'settings')
-        if response:
-            settings = response
-            
-            # Polling-Intervalle
-            if 'polling' in settings:
-                INTERVAL_FAST = settings['polling']['INTERVAL_FAST']['value']
-                INTERVAL_NORMAL = settings['polling']['INTERVAL_NORMAL']['value']
-                INTERVAL_SLOW = settings['polling']['INTERVAL_SLOW']['value']
-                log('INFO', f"Polling-Intervalle: Fast={INTERVAL_FAST}s, Normal={INTERVAL_NORMAL}s, Slow={INTERVAL_SLOW}s")
-            
-            # Temperatur
-            if 'temperature' in settings:
-                TEMP_THRESHOLD = settings['temperature']['TEMP_THRESHOLD']['value']
-                
-                # Aktualisiere gh_system Settings
-                if gh_system:
-                    gh_system.target_temp = settings['temperature']['DEFAULT_TARGET_TEMP']['value']
-                    gh_system.temp_hysteresis = settings['temperature']['TEMP_HYSTERESIS']['value']
-                    log('INFO', f"Temperatur-Settings: Target={gh_system.target_temp}°C, Hysterese=±{gh_system.temp_hysteresis}°C")
-            
-            # Motor
-            if 'motor' in settings and gh_system:
-                gh_system.motor_runtime_open = settings['motor']['MOTOR_RUNTIME_OPEN']['value']
-                gh_system.motor_runtime_close = settings['motor']['MOTOR_RUNTIME_CLOSE']['value']
-                log('INFO', f"Motor-Zeiten: Öffnen={gh_system.motor_runtime_open}s, Schließen={gh_system.motor_runtime_close}s")
-            
-            # Netzwerk
-            if 'network' in settings:
-                MAX_RETRIES = settings['network']['MAX_RETRIES']['value']
-                RETRY_DELAY = settings['network']['RETRY_DELAY']['value']
-            
-            # Standort
-            if 'location' in settings:
-                lat = settings['location']['LOCATION_LAT']['value']
-                lon = settings['location']['LOCATION_LON']['value']
-                LOCATION = LocationInfo("Luzernenhof", "Germany", "Europe/Berlin", lat, lon)
-            
-            log('SUCCESS', "✅ Settings beim Start geladen")
+        settings = make_request('GET', 'settings')
+        if settings:
+            gh_system.state.set('settings', settings)
+            apply_settings(settings)
+            log('SUCCESS', "✅ Settings von der API geladen")
             return True
             
     except Exception as e:
-        log('WARNING', f"Settings-Sync fehlgeschlagen: {e}")
+        log('WARNING', "Settings-Sync fehlgeschlagen: %s", e)
         return False
 
 
@@ -476,13 +636,23 @@ def execute_command(cmd):
         try:
             parameters = json.loads(parameters)
         except json.JSONDecodeError:
-            log('WARNING', f"Parameter für Befehl {command} (ID: {cmd_id}) sind kein valides JSON: {parameters}")
+            log('WARNING', "Parameter für Befehl %s (ID: %s) sind kein valides JSON: %s", command, cmd_id, parameters)
     
-    log('INFO', f"Führe Befehl aus: {command} (ID: {cmd_id})")
+    log('INFO', "Führe Befehl aus: %s (ID: %s)", command, cmd_id)
     
     try:
+        # Sofort-Stopp (bricht laufende Fahrten ab, Position wird aus der Fahrzeit berechnet)
+        if command in ('STOP', 'STOP_ALL'):
+            gh_system.stop_all()
+            log('INFO', "⏹ Alle Motoren gestoppt")
+        
+        elif command.startswith('STOP_GH') and command.count('_') == 2:
+            motor_name = '_'.join(command.split('_')[1:])  # z.B. GH1_VORNE
+            gh_system.stop_motor(motor_name)
+            log('INFO', "⏹ Motor %s gestoppt", motor_name)
+        
         # Globale Befehle
-        if command == 'OPEN_ALL':
+        elif command == 'OPEN_ALL':
             gh_system.run_sequence('OPEN', get_gate_enabled_settings())
         
         elif command == 'CLOSE_ALL':
@@ -490,14 +660,14 @@ def execute_command(cmd):
         
         elif command == 'SET_MODE':
             if parameters and 'mode' in parameters:
-                gh_system.mode = parameters['mode']
-                log('INFO', f"Modus geändert auf: {parameters['mode']}")
+                gh_system.set_mode(parameters['mode'])
+                log('INFO', "Modus geändert auf: %s", parameters['mode'])
 
                 # NEU: Prüfe, ob auch eine Temperatur mitgesendet wurde
                 if 'temp' in parameters and parameters['temp'] is not None:
                     new_temp = float(parameters['temp'])
                     gh_system.target_temp = new_temp
-                    log('INFO', f"Ziel-Temperatur gesetzt auf: {new_temp}°C")
+                    log('INFO', "Ziel-Temperatur gesetzt auf: %s°C", new_temp)
             else:
                 raise ValueError("SET_MODE requires 'mode' parameter")
         
@@ -506,7 +676,7 @@ def execute_command(cmd):
             percentage = int(command.split('_')[1])
             enabled_settings = get_gate_enabled_settings()
             gh_system.run_sequence_partial('OPEN', percentage, enabled_settings)
-            log('INFO', f"Alle aktiven Tore {percentage}% geöffnet")
+            log('INFO', "Alle aktiven Tore %s%% geöffnet", percentage)
         
         # Einzelmotor-Steuerung: OPEN_GH1_VORNE, CLOSE_GH2_HINTEN, etc.
         elif command.startswith('OPEN_GH') and command.count('_') == 2:
@@ -515,7 +685,7 @@ def execute_command(cmd):
             if not enabled:
                 raise ValueError(f"Tor {motor_name} ist deaktiviert (Wintermodus)")
             gh_system.move_motor(motor_name, 'OPEN')
-            log('INFO', f"Motor {motor_name} geöffnet")
+            log('INFO', "Motor %s geöffnet", motor_name)
         
         elif command.startswith('CLOSE_GH') and command.count('_') == 2:
             motor_name = '_'.join(command.split('_')[1:])
@@ -523,7 +693,7 @@ def execute_command(cmd):
             if not enabled:
                 raise ValueError(f"Tor {motor_name} ist deaktiviert (Wintermodus)")
             gh_system.move_motor(motor_name, 'CLOSE')
-            log('INFO', f"Motor {motor_name} geschlossen")
+            log('INFO', "Motor %s geschlossen", motor_name)
         
         # Einzelmotor Teilöffnung: PARTIAL_GH1_VORNE_40
         # Bedeutet: Gehe zu Position 40% (Zielposition)
@@ -539,8 +709,8 @@ def execute_command(cmd):
             current_position = gh_system.gate_positions.get(motor_name, 0)
             
             if target_position == current_position:
-                log('INFO', f"Motor {motor_name} bereits bei {target_position}%")
-                make_request('POST', f"command/{cmd_id}/complete")
+                log('INFO', "Motor %s bereits bei %s%%", motor_name, target_position)
+                ack_command(cmd_id)
                 return
             
             # Die Richtung wird an move_motor_partial übergeben, dort aber für 
@@ -548,15 +718,29 @@ def execute_command(cmd):
             # 'OPEN'/'CLOSE' hier nur als Platzhalter für das Argument.
             placeholder_direction = 'OPEN' if target_position > current_position else 'CLOSE'
             
-            log('INFO', f"Motor {motor_name}: {current_position}% → {target_position}%")
+            log('INFO', "Motor %s: %s%% → %s%%", motor_name, current_position, target_position)
+            # Die Position wird vom MotorController aktualisiert (auch bei Abbruch/Umlenkung)
             gh_system.move_motor_partial(motor_name, placeholder_direction, target_position)
-            
-            # WICHTIG: interne Position wird in move_motor_partial bereits aktualisiert.
-            # Wir stellen nur sicher, dass der Client den neuen Wert kennt.
-            gh_system.gate_positions[motor_name] = target_position
+        
+        # Bewässerung: IRRIGATE {"zone": "Bewässerung 1", "duration": 600}
+        # bzw. {"zones": [...], "duration": 600} (nacheinander)
+        elif command == 'IRRIGATE':
+            if irrigation is None:
+                raise ValueError("Bewässerung nicht aktiv")
+            if not parameters or 'duration' not in parameters:
+                raise ValueError("IRRIGATE requires 'zone'/'zones' and 'duration' parameters")
+            zones = parameters.get('zones') or [parameters.get('zone')]
+            for zone in zones:
+                irrigation.run(zone, parameters['duration'])
+        
+        elif command == 'IRRIGATION_STOP':
+            if irrigation is None:
+                raise ValueError("Bewässerung nicht aktiv")
+            irrigation.stop((parameters or {}).get('zone'))
+            log('INFO', "⏹ Bewässerung gestoppt")
         
         elif command == 'RESTART':
-            log('INFO', "🔄 Neustart-Befehl empfangen. Lade Einstellungen neu...")
+            log('INFO', "🔄 Neustart-Befehl empfangen. Lade Einstellungen neu...", ship=True)
             sync_settings()
             log('SUCCESS', "✅ Einstellungen neu geladen und aktiv.")
         
@@ -564,48 +748,215 @@ def execute_command(cmd):
             raise ValueError(f"Unknown command: {command}")
         
         # Befehl als completed markieren
-        make_request('POST', f"command/{cmd_id}/complete")
-        log('INFO', f"Befehl abgeschlossen: {command} (ID: {cmd_id})")
+        ack_command(cmd_id)
+        log('INFO', "Befehl abgeschlossen: %s (ID: %s)", command, cmd_id)
         
         last_command_time = datetime.now()
         
     except Exception as e:
-        log('ERROR', f"Befehl fehlgeschlagen: {command} - {e}")
-        make_request('POST', f"command/{cmd_id}/fail", {'error': str(e)})
+        log('ERROR', "Befehl fehlgeschlagen: %s - %s", command, e)
+        ack_command(cmd_id, error=str(e))
 
-# ===== STATUS UPDATE =====
+def ack_command(cmd_id, error=None):
+    """Meldet einen ausgeführten Befehl als erledigt/fehlgeschlagen.
 
-def send_status():
-    """Sendet aktuellen Status an API"""
-    if not gh_system:
+    Im Sync-Modus wird die Rückmeldung gesammelt und mit dem nächsten
+    `POST /sync` übertragen, sonst sofort über `command/{id}/complete|fail`.
+    """
+    if sync_enabled:
+        ack = {'id': cmd_id, 'status': 'failed' if error else 'completed'}
+        if error:
+            ack['error'] = error
+        with acks_lock:
+            pending_acks.append(ack)
         return
     
-    status_data = {
+    if error:
+        make_request('POST', f"command/{cmd_id}/fail", {'error': error})
+    else:
+        make_request('POST', f"command/{cmd_id}/complete")
+
+def flush_acks_legacy():
+    """Überträgt gesammelte Rückmeldungen einzeln (Fallback ohne Sync)"""
+    while True:
+        with acks_lock:
+            if not pending_acks:
+                return
+            ack = pending_acks[0]
+        if ack['status'] == 'failed':
+            result = make_request('POST', f"command/{ack['id']}/fail", {'error': ack.get('error')})
+        else:
+            result = make_request('POST', f"command/{ack['id']}/complete")
+        if result is None:
+            return
+        with acks_lock:
+            pending_acks.pop(0)
+
+# ===== STATUS UPDATE =====
+
+def build_status():
+    """Stellt den Status-Report für `POST /status` bzw. `POST /sync` zusammen"""
+    return {
         'temp_indoor': gh_system.get_temp_in(),
         'temp_outdoor': gh_system.get_temp_out(),
         'mode': gh_system.mode,
         'last_action': gh_system.last_action,
         'is_busy': gh_system.is_busy,
-        'gate_positions': gh_system.gate_positions  # Tor-Positionen
+        'gate_positions': gh_system.gate_positions,  # Tor-Positionen
+        'queue_depth': gh_system.queue_depths(),     # Fahraufträge pro Tor
+        'sensors': gh_system.sensors.describe(),      # Alter/veraltet/Fehler pro Sensor
+        'irrigation': irrigation.describe() if irrigation else None,  # laufender Lauf + Warteschlange
+        'network': network.describe()  # Haus-WLAN/Hotspot, laufender Wechsel, letzter Fehler
     }
+
+def send_status():
+    """Sendet aktuellen Status an API"""
+    if not gh_system:
+        return
+    
+    status_data = build_status()
     
     result = make_request('POST', 'status', status_data)
     
     if result:
-        log('DEBUG', f"Status gesendet: {status_data['mode']}, Busy: {status_data['is_busy']}")
+        log('DEBUG', "Status gesendet: %s, Busy: %s", status_data['mode'], status_data['is_busy'])
 
-def fetch_remote_status():
-    """Holt den letzten bekannten Status von der API"""
-    try:
-        data = make_request('GET', 'status')
-        if data and 'gate_positions' in data:
-            # Update internal state
-            for motor, pos in data['gate_positions'].items():
-                if motor in gh_system.gate_positions:
-                    gh_system.gate_positions[motor] = int(pos)
-            log('INFO', f"Status wiederhergestellt: {gh_system.gate_positions}")
-    except Exception as e:
-        log('WARNING', f"Konnte Status nicht wiederherstellen: {e}")
+def reconcile_with_server():
+    """Abgleich nach dem Start (läuft im Hintergrund, der Betrieb startet mit dem lokalen Stand)"""
+    sync_settings()
+    send_status()
+
+# ===== SYNC =====
+
+def sync_cycle():
+    """Gebündelter Abgleich mit der API (ein Round-Trip pro Zyklus).
+
+    Sendet Status, gesammelte Befehls-Rückmeldungen und die bekannten
+    Konfigurations-Versionen. Der Server liefert nur geänderte Abschnitte;
+    fehlende werden aus dem `config_cache` ergänzt, sodass das Ergebnis immer
+    die komplette Konfiguration plus offene Befehle enthält. Gibt `None`
+    zurück, wenn der Sync fehlgeschlagen ist – der Aufrufer fällt dann auf
+    die einzelnen Endpoints zurück.
+    """
+    global sync_enabled, sync_failures
+    global gate_auto_cache, gate_auto_cache_time, gate_enabled_cache, gate_enabled_cache_time
+    
+    with acks_lock:
+        acks = list(pending_acks)
+    switch_report = switch_manager.report()
+    data = make_request('POST', 'sync', {
+        'status': build_status(),
+        'acks': acks,
+        'switches': switch_report,  # angewendete Schalter-Zustände seit dem letzten Sync
+        'versions': config_cache.versions(),
+        'commands': not long_poll_active()  # Befehle kommen sonst per Long-Poll
+    })
+    
+    if data is None:
+        # Netzwerkausfall, Zeitbudget oder Netzwerkwechsel sind kein Grund, /sync aufzugeben –
+        # nur ein Server, der /sync ablehnt (alte API), schaltet auf einzelne Endpoints um
+        if last_rejection() not in SYNC_UNSUPPORTED_STATUS:
+            return None
+        sync_failures += 1
+        if sync_failures >= SYNC_MAX_FAILURES:
+            sync_enabled = False
+            log('WARNING', "Sync %sx abgelehnt (HTTP %s) → nutze einzelne Endpoints", sync_failures, last_rejection())
+        return None
+    
+    sync_failures = 0
+    # Übertragene Rückmeldungen entfernen (neue können inzwischen dazugekommen sein)
+    with acks_lock:
+        del pending_acks[:len(acks)]
+    switch_manager.reported(switch_report)
+    
+    # Geänderte Abschnitte übernehmen, unveränderte aus dem Cache ergänzen
+    versions = data.get('versions', {})
+    if 'gpio_switches_changed' in data:
+        # Nur abweichende Schalter übertragen → zur vollständigen Liste ergänzen
+        data['gpio_switches'] = greenhouse_switches.merge(
+            config_cache.get('gpio-switches'), data.pop('gpio_switches_changed'))
+    for endpoint, key in SYNC_CONFIG_KEYS.items():
+        if key in data:
+            config_cache.store(endpoint, versions.get(endpoint), data[key])
+        else:
+            data[key] = config_cache.hit(endpoint)
+    
+    now = datetime.now()
+    if data.get('gate_auto_mode'):
+        gate_auto_cache = data['gate_auto_mode']
+        gate_auto_cache_time = now
+    if data.get('gate_enabled'):
+        gate_enabled_cache = data['gate_enabled']
+        gate_enabled_cache_time = now
+    
+    return data
+
+# ===== LONG-POLLING =====
+
+def command_listener():
+    """Hintergrund-Thread: hält genau eine Long-Poll-Anfrage auf `GET /command` offen.
+
+    Eintreffende Befehle werden in die `command_queue` gelegt und von der
+    Hauptschleife sofort ausgeführt. Antwortet der Server ohne zu warten
+    (alte API ohne `wait`-Unterstützung), wird im normalen Intervall gepollt,
+    damit keine Request-Schleife entsteht.
+    """
+    log('INFO', "📡 Long-Polling für Befehle aktiv (wait=%ss)", LONG_POLL_WAIT)
+    
+    while running:
+        start = time.monotonic()
+        commands = make_request('GET', 'command', query={'wait': LONG_POLL_WAIT},
+                                timeout=LONG_POLL_WAIT + 15)
+        elapsed = time.monotonic() - start
+        
+        if commands:
+            for cmd in commands:
+                command_queue.put(cmd)
+            continue
+        
+        # Fehler oder Server wartet nicht → kurze Pause statt Dauerschleife
+        if commands is None or elapsed < 1:
+            for _ in range(INTERVAL_NORMAL):
+                if not running:
+                    break
+                time.sleep(1)
+
+def start_command_listener():
+    """Startet den Long-Poll-Thread (falls aktiviert und noch nicht gestartet)"""
+    global command_listener_thread
+    
+    if not LONG_POLL or long_poll_active():
+        return
+    
+    command_listener_thread = threading.Thread(target=command_listener, name="CommandListener", daemon=True)
+    command_listener_thread.start()
+
+def long_poll_active():
+    return command_listener_thread is not None and command_listener_thread.is_alive()
+
+def wait_for_commands(interval):
+    """Wartet bis zu `interval` Sekunden; per Long-Poll eintreffende Befehle werden sofort ausgeführt.
+
+    Kehrt nach der Ausführung direkt zurück, damit der nächste Zyklus den
+    neuen Status ohne Verzögerung meldet.
+    """
+    deadline = time.monotonic() + interval
+    
+    while running:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        
+        try:
+            cmd = command_queue.get(timeout=min(1, remaining))
+        except queue.Empty:
+            continue
+        
+        execute_command(cmd)
+        # Weitere bereits eingetroffene Befehle direkt mit abarbeiten
+        while not command_queue.empty():
+            execute_command(command_queue.get_nowait())
+        return
 
 # ===== MAIN LOOP =====
 
@@ -616,70 +967,230 @@ def poll_commands():
     if commands is None:
         return
     
+    process_commands(commands)
+
+def process_commands(commands):
+    """Führt eine Liste abgeholter Befehle nacheinander aus"""
     if len(commands) == 0:
         log('DEBUG', "Keine neuen Befehle")
         return
     
-    log('INFO', f"{len(commands)} neue(r) Befehl(e)")
+    log('INFO', "%s neue(r) Befehl(e)", len(commands))
     
     for cmd in commands:
         execute_command(cmd)
 
-def main():
-    global gh_system, running
-    
-    log('INFO', "🌱 Gewächshaus API Client startet...")
-    log('INFO', f"API: {API_URL}")
-    log('INFO', f"Koordinaten: {LOCATION.latitude}°N, {LOCATION.longitude}°E")
-    
-    # Greenhouse System initialisieren
-    gh_system = init_global_system()
-    
-    # Settings von API laden
-    sync_settings()
-    
-    # Status wiederherstellen
-    fetch_remote_status()
-    
-    # Initial Status senden
-    send_status()
-    
-    # Main Loop
-    while running:
-        try:
-            # Befehle abrufen
-            poll_commands()
+def run_cycle():
+    """Ein Durchlauf der seriellen Hauptschleife (Sync/Befehle, Automatik, Lüftung, Schalter)"""
+    # Alle Requests des Zyklus teilen sich ein Zeitbudget (danach lokaler Stand)
+    with greenhouse_http.budget(REQUEST_BUDGET), CYCLE_SECONDS.time(task="cycle"):
+        with PHASE_SECONDS.time(phase="sync"):
+            # Status + Befehle + Konfiguration in einem Request (Sync-Modus)
+            synced = sync_cycle() if sync_enabled else None
+            
+            if synced is not None:
+                process_commands(synced.get('commands', []))
+            else:
+                # Fallback: einzelne Endpoints
+                flush_acks_legacy()
             
-            # Status senden
-            send_status()
+                # Befehle abrufen (entfällt, solange der Long-Poll-Thread läuft)
+                if not long_poll_active():
+                    poll_commands()
             
+                # Status senden
+                send_status()
+        
+        with PHASE_SECONDS.time(phase="auto"):
             # Automatik-Logik (falls aktiviert)
             # Hole Gate Auto Settings und Gate Enabled Status
             gate_settings = get_gate_auto_settings()
             gate_enabled = get_gate_enabled_settings()
             gh_system.check_auto_logic(gate_settings, gate_enabled)
-            
+        
+        with PHASE_SECONDS.time(phase="ventilation"):
             # Ventilation prüfen und ausführen
-            check_ventilation()
-            
+            check_ventilation(synced.get('ventilation') if synced else None)
+        
+        with PHASE_SECONDS.time(phase="switches"):
             # GPIO-Schalter synchronisieren
-            sync_gpio_switches()
+            sync_gpio_switches(synced.get('gpio_switches') if synced else None)
+
+def run_loop():
+    """Klassische serielle Hauptschleife (CLIENT_RUNTIME=sync)"""
+    while running:
+        try:
+            run_cycle()
             
-            # Nächstes Intervall berechnen
+            # Nächstes Intervall berechnen (Lüftungsphasen beginnen/enden pünktlich)
             interval = calculate_poll_interval()
-            log('DEBUG', f"Warte {interval}s bis zum nächsten Poll...")
+            wait = ventilation_wait()
+            if wait is not None and wait < interval:
+                interval = wait
+            log('DEBUG', "Warte %ss bis zum nächsten Poll...", interval)
             
-            # Sleep mit Interrupt-Check
-            for _ in range(interval):
-                if not running:
-                    break
-                time.sleep(1)
+            # Warten mit Interrupt-Check; Long-Poll-Befehle beenden das Warten sofort
+            wait_for_commands(interval)
         
         except Exception as e:
-            log('ERROR', f"Unerwarteter Fehler: {e}")
+            log('ERROR', "Unerwarteter Fehler: %s", e)
             time.sleep(60)  # Bei Fehler 60s warten
+
+# ===== ASYNC RUNTIME =====
+
+async def _sleep(seconds, wake=None):
+    """Schläft bis zu `seconds` Sekunden; bricht bei Shutdown oder gesetztem `wake`-Event ab"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    
+    while running:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        if wake is None:
+            await asyncio.sleep(min(1, remaining))
+            continue
+        try:
+            await asyncio.wait_for(wake.wait(), timeout=min(1, remaining))
+        except asyncio.TimeoutError:
+            continue
+        wake.clear()
+        return
+
+async def _guarded(name, step, interval_fn, wake=None):
+    """Führt `step` zyklisch aus; Fehler werden geloggt, ohne den Task zu beenden.
+
+    Jeder Durchlauf bekommt ein eigenes Zeitbudget für seine Requests.
+    """
+    while running:
+        try:
+            with greenhouse_http.budget(REQUEST_BUDGET), CYCLE_SECONDS.time(task=name):
+                await step()
+        except Exception as e:
+            log('ERROR', "Fehler in Task '%s': %s", name, e)
+            await _sleep(60)
+            continue
+        await _sleep(interval_fn(), wake)
+
+async def _command_executor_task(wake):
+    """Arbeitet die `command_queue` ab; jeder Befehl ist ein awaitbarer Job im Worker-Thread.
+
+    Befehle werden in Eingangsreihenfolge gestartet. Läuft ein Befehl länger
+    als `COMMAND_DISPATCH_WAIT` (Torfahrt), wird der nächste trotzdem
+    gestartet – so kann z.B. ein STOP eine laufende Fahrt sofort abbrechen.
+    """
+    jobs = set()
+    
+    def job_done(job):
+        jobs.discard(job)
+        if not job.cancelled() and job.exception():
+            log('ERROR', "Fehler bei Befehlsausführung: %s", job.exception())
+        # Status sofort melden
+        wake.set()
+    
+    while running:
+        try:
+            cmd = await asyncio.to_thread(command_queue.get, True, 1)
+        except queue.Empty:
+            continue
+        
+        job = asyncio.create_task(asyncio.to_thread(execute_command, cmd))
+        jobs.add(job)
+        job.add_done_callback(job_done)
+        await asyncio.wait({job}, timeout=COMMAND_DISPATCH_WAIT)
+    
+    if jobs:
+        await asyncio.wait(jobs)
+
+async def run_async():
+    """asyncio-Laufzeit (CLIENT_RUNTIME=async): unabhängige Tasks statt serieller Schleife"""
+    wake = asyncio.Event()
+    
+    async def sync_step():
+        # Status + Befehle + Konfiguration (Sync-Modus) bzw. einzelne Endpoints
+        synced = await asyncio.to_thread(sync_cycle) if sync_enabled else None
+        
+        if synced is not None:
+            for cmd in synced.get('commands', []):
+                command_queue.put(cmd)
+            return
+        
+        await asyncio.to_thread(flush_acks_legacy)
+        if not long_poll_active():
+            commands = await asyncio.to_thread(make_request, 'GET', 'command')
+            for cmd in commands or []:
+                command_queue.put(cmd)
+        await asyncio.to_thread(send_status)
+    
+    async def auto_step():
+        # Tore mit laufendem manuellem Auftrag überspringt check_auto_logic selbst
+        gate_settings = await asyncio.to_thread(get_gate_auto_settings)
+        gate_enabled = await asyncio.to_thread(get_gate_enabled_settings)
+        await asyncio.to_thread(gh_system.check_auto_logic, gate_settings, gate_enabled)
+    
+    async def ventilation_step():
+        config = config_cache.get('ventilation') if sync_enabled else None
+        await asyncio.to_thread(check_ventilation, config)
+    
+    async def switch_step():
+        switches = config_cache.get('gpio-switches') if sync_enabled else None
+        await asyncio.to_thread(sync_gpio_switches, switches)
+    
+    tasks = [
+        asyncio.create_task(_command_executor_task(wake), name="commands"),
+        asyncio.create_task(_guarded('sync', sync_step, calculate_poll_interval, wake), name="sync"),
+        asyncio.create_task(_guarded('auto', auto_step, calculate_poll_interval), name="auto"),
+        asyncio.create_task(_guarded('ventilation', ventilation_step, ventilation_interval), name="ventilation"),
+        asyncio.create_task(_guarded('gpio', switch_step, calculate_poll_interval), name="gpio")
+    ]
+    log('INFO', "⚙️  Async-Laufzeit gestartet (%s Tasks)", len(tasks))
+    
+    await asyncio.gather(*tasks)
+
+def main():
+    global gh_system, irrigation
+    
+    log('INFO', "🌱 Gewächshaus API Client startet...", ship=True)
+    log('INFO', "API: %s", API_URL)
+    log('INFO', "Koordinaten: %s°N, %s°E", LOCATION.latitude, LOCATION.longitude)
+    
+    # Greenhouse System initialisieren (liest lokalen Zustand, keine blockierenden API-Aufrufe)
+    gh_system = init_global_system()
+    
+    # Bewässerung läuft mit eigenem Timer, unabhängig von API und Poll-Intervall
+    irrigation = greenhouse_irrigation.IrrigationScheduler(switch_manager, store=gh_system.state, log=log)
+    
+    # Lokal gespeicherte Settings sofort übernehmen; Settings/Status-Abgleich im Hintergrund
+    apply_settings(gh_system.state.get('settings'))
+    threading.Thread(target=reconcile_with_server, name="StartupSync", daemon=True).start()
+    
+    # Long-Poll-Thread für sofortige Befehlszustellung
+    start_command_listener()
+    
+    # Sonnentabelle für ein Jahr im Hintergrund vorberechnen
+    ventilation_schedule.preload(datetime.now(ventilation_schedule.tz).date())
+    
+    # Metriken (HTTP-Endpoint und/oder Textfile, falls konfiguriert)
+    greenhouse_metrics.start()
+    
+    # Warnungen/Fehler und markierte Ereignisse gesammelt an die API (logs-Tabelle)
+    greenhouse_log.start_shipping(API_URL, API_KEY)
+    
+    if CLIENT_RUNTIME == 'async':
+        asyncio.run(run_async())
+    else:
+        run_loop()
     
-    log('INFO', "🛑 Client beendet")
+    irrigation.shutdown()
+    network.shutdown()
+    if not gh_system.position_writer.flush():
+        log('WARNING', "Tor-Positionen bleiben lokal gespeichert und werden nachgesendet: %s", gh_system.position_writer.pending())
+    log('INFO', "📊 HTTP: %s", greenhouse_http.format_stats())
+    greenhouse_metrics.stop()
+    log('INFO', "🛑 Client beendet", ship=True)
+    greenhouse_log.shutdown()
+    greenhouse_http.close_all()
+    gh_system.state.close()
 
 if __name__ == '__main__':
     main()
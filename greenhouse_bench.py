@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmarks für Poll-Zyklus und Torfahrten (ohne Pi, gegen Attrappen).
+
+Misst mit den Attrappen aus `greenhouse_sim.py` (Stand-in-API, Fake-GPIO,
+simulierte Sensoren):
+
+- `startup`: Import der Module und `init_global_system()`
+- `cycle` / `cycle_legacy`: Dauer eines Zyklus der Hauptschleife sowie
+  Requests und Bytes pro Zyklus (gebündelter Sync bzw. einzelne Endpoints)
+- `command`: Befehl → Motorstart (Rechenzeit im Zyklus und Wartezeit bis zur
+  Abholung in virtueller Zeit)
+- `actuation`: echte `MotorController`/`GateScheduler`/`ActuationExecutor`
+  mit kurzen Laufzeiten in Echtzeit – Gesamtdauer eines Fahrplans gegenüber
+  der reinen Motorlaufzeit (Overhead: Relais-Pause, Threads, Warteschlangen)
+- `scaling`: Zyklusdauer, Requests und Bytes bei mehr Toren bzw. Schaltern
+
+Jeder Benchmark läuft in einem eigenen Prozess (die Simulation ersetzt
+Module und Uhr prozessweit). Das Ergebnis ist ein JSON-Dokument; mit
+`--compare` werden zwei Läufe verglichen und Verschlechterungen über der
+Schwelle gemeldet (Exit-Code 1).
+
+Verwendung:
+    python greenhouse_bench.py --json bench.json
+    python greenhouse_bench.py --only cycle,command --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_START = "2026-05-01"
+CYCLES = 300
+COMMANDS = 30
+ACTUATION_RUNTIME = 1.0     # Sekunden für 0 → 100% (statt 135s)
+ACTUATION_PLANS = 4
+SCALING_GATES = (6, 12, 24)
+SCALING_SWITCHES = (3, 12, 24)
+REGRESSION_THRESHOLD = 0.2  # 20% langsamer/mehr = Verschlechterung
+
+
+def summarize(values, scale=1000.0):
+    """Kennzahlen einer Messreihe (Standard: Sekunden → Millisekunden)"""
+    if not values:
+        return {'n': 0}
+    values = sorted(v * scale for v in values)
+    return {
+        'n': len(values),
+        'mean': round(statistics.fmean(values), 3),
+        'p50': round(values[len(values) // 2], 3),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        'max': round(values[-1], 3),
+    }
+
+
+def _simulation(**kwargs):
+    from greenhouse_sim import Simulation
+    start = datetime.strptime(BENCH_START, "%Y-%m-%d").timestamp()
+    return Simulation(start, **kwargs)
+
+
+# --- Benchmarks (laufen im Kind-Prozess) ---
+
+def bench_startup(options):
+    sim = _simulation()
+    return {
+        'import_ms': round(sim.import_time * 1000, 3),
+        'init_global_system_ms': round(sim.startup_time * 1000, 3),
+    }
+
+
+def _cycle_metrics(sim, cycles):
+    durations = []
+    calls = sum(sim.api.calls.values())
+    sent, received = sim.api.bytes_sent, sim.api.bytes_received
+    for _ in range(cycles):
+        durations.append(sim.cycle())
+        sim.wait()
+    calls = sum(sim.api.calls.values()) - calls
+    return {
+        'cycle_ms': summarize(durations),
+        'requests_per_cycle': round(calls / cycles, 3),
+        'bytes_sent_per_cycle': round((sim.api.bytes_sent - sent) / cycles, 1),
+        'bytes_received_per_cycle': round((sim.api.bytes_received - received) / cycles, 1),
+    }
+
+
+def bench_cycle(options):
+    sim = _simulation(gates=options.get('gates', 6), switches=options.get('switches', 3),
+                      env=options.get('env'))
+    return _cycle_metrics(sim, options.get('cycles', CYCLES))
+
+
+def bench_cycle_legacy(options):
+    return bench_cycle(dict(options, env={'SYNC_MODE': "0"}))
+
+
+def bench_command(options):
+    # MANUAL und Tor-Automatik aus: nur Befehle bewegen die Tore
+    sim = _simulation(mode="MANUAL")
+    sim.api.config['gate-auto-mode'] = {name: False for name in sim.api.config['gate-auto-mode']}
+    sim.cycle()
+    sim.wait()
+
+    commands = ["OPEN_ALL", "PARTIAL_GH1_VORNE_40", "CLOSE_ALL", "OPEN_GH2_HINTEN", "PARTIAL_40", "CLOSE_GH2_HINTEN"]
+    compute, pickup = [], []
+    motors = list(sim.gh.motors.values())
+    for i in range(options.get('commands', COMMANDS)):
+        before = {id(m): m.last_start for m in motors}
+        sim.cycle()
+        sim.api.add_command(commands[i % len(commands)])
+        queued_at = sim.clock.time()
+        sim.wait()
+
+        started = time.perf_counter()
+        sim.cycle()
+        moved = [m.last_start for m in motors if m.last_start != before[id(m)]]
+        if moved:
+            compute.append(min(perf for perf, _ in moved) - started)
+            pickup.append(min(virtual for _, virtual in moved) - queued_at)
+        sim.wait()
+
+    return {
+        'command_to_motor_ms': summarize(compute),
+        'pickup_latency_s': summarize(pickup, scale=1.0),
+        'commands_without_move': options.get('commands', COMMANDS) - len(compute),
+    }
+
+
+def bench_actuation(options):
+    import greenhouse_motion
+    from greenhouse_sim import FakeGPIO, gate_names
+
+    runtime = options.get('runtime', ACTUATION_RUNTIME)
+    gpio = FakeGPIO()
+    positions = {name: 0 for name in gate_names(options.get('gates', 6))}
+    schedulers = {}
+    for i, name in enumerate(positions):
+        motor = greenhouse_motion.MotorController(
+            name, (100 + 2 * i, 101 + 2 * i), gpio,
+            runtimes=lambda: (runtime, runtime),
+            get_position=lambda name=name: positions[name],
+            set_position=lambda position, name=name: positions.__setitem__(name, position)
+        )
+        schedulers[name] = greenhouse_motion.GateScheduler(motor)
+    executor = greenhouse_motion.ActuationExecutor(schedulers, positions.get)
+
+    walls, overheads, queued = [], [], []
+    for i in range(options.get('plans', ACTUATION_PLANS)):
+        target = 100 if i % 2 == 0 else 0
+        expected = runtime * max(abs(target - p) for p in positions.values()) / 100
+        started = time.perf_counter()
+        results = executor.submit({name: target for name in positions}, greenhouse_motion.SOURCE_MANUAL).result()
+        wall = time.perf_counter() - started
+        walls.append(wall)
+        overheads.append(wall - expected)
+        queued.extend(entry['queued'] for entry in results.values() if entry.get('queued') is not None)
+
+    return {
+        'motor_runtime_s': runtime,
+        'plan_ms': summarize(walls),
+        'overhead_ms': summarize(overheads),
+        'queued_ms': summarize(queued),
+        'relay_switches': gpio.switches,
+    }
+
+
+def bench_scaling(options):
+    results = {}
+    for gates in SCALING_GATES:
+        results[f"gates_{gates}"] = _run_child('cycle', dict(options, gates=gates, switches=3))
+    for switches in SCALING_SWITCHES:
+        results[f"switches_{switches}"] = _run_child('cycle', dict(options, gates=6, switches=switches))
+    return results
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'cycle': bench_cycle,
+    'cycle_legacy': bench_cycle_legacy,
+    'command': bench_command,
+    'actuation': bench_actuation,
+    'scaling': bench_scaling,
+}
+
+
+# --- Steuerung ---
+
+def _run_child(name, options):
+    """Startet einen Benchmark in einem eigenen Prozess und liest sein Ergebnis"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out = f.name
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name,
+             "--options", json.dumps(options), "--out", out],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            cwd=tempfile.gettempdir()
+        )
+        with open(out) as f:
+            return json.load(f)
+    except subprocess.CalledProcessError as e:
+        return {'error': e.stderr.decode(errors='replace').strip().splitlines()[-1:]}
+    finally:
+        os.remove(out)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _leaves(data, prefix=""):
+    """Alle Zahlenwerte als {'pfad.zum.wert': zahl}"""
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            result.update(_leaves(value, f"{prefix}{key}."))
+        return result
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return {prefix.rstrip('.'): data}
+    return {}
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Vergleicht zwei Ergebnisse (kleiner = besser); liefert die Verschlechterungen"""
+    old = _leaves(baseline.get('benchmarks', {}))
+    new = _leaves(current.get('benchmarks', {}))
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith('.n') or old[key] == new[key]:
+            continue
+        change = (new[key] - old[key]) / abs(old[key]) if old[key] else float('inf')
+        marker = ""
+        # Maxima sind Einzelwerte (GC, Scheduler) – nur anzeigen, nicht bewerten
+        if change > threshold and not key.endswith('.max'):
+            regressions.append(key)
+            marker = "  ⚠️"
+        print(f"{key:60s} {old[key]:>12g} → {new[key]:<12g} {change:+.0%}{marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks für Poll-Zyklus und Torfahrten")
+    parser.add_argument("--only", help=f"Kommagetrennte Auswahl aus: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--cycles", type=int, default=CYCLES, help="Zyklen pro Zyklus-Messung")
+    parser.add_argument("--json", help="Ergebnis als JSON-Datei schreiben")
+    parser.add_argument("--compare", help="mit früherem Ergebnis (JSON) vergleichen")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative Verschlechterung, ab der gewarnt wird (Standard: 0.2)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--options", default="{}", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        result = BENCHMARKS[args.child](json.loads(args.options))
+        with open(args.out, 'w') as f:
+            json.dump(result, f)
+        os._exit(0)  # Hintergrund-Threads der Simulation nicht abwarten
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unbekannte Benchmarks: {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cycles': args.cycles,
+        },
+        'benchmarks': {}
+    }
+    for name in names:
+        started = time.perf_counter()
+        results['benchmarks'][name] = _run_child(name, {'cycles': args.cycles})
+        print(f"⏱ {name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"⚠️  {len(regressions)} Verschlechterung(en) über {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Regler für die Tor-Automatik (austauschbar).
+
+Ein Regler bekommt pro Zyklus und Gewächshaus (Zone) die Innen- und
+Außentemperatur sowie die aktuelle mittlere Torposition und liefert die neue
+Zielposition (0–100%) – oder None, wenn die Tore stehen bleiben sollen.
+
+Verfügbare Regler (`AUTO_CONTROLLER` bzw. Setting `control.AUTO_CONTROLLER`):
+
+- `step`: bisheriges Verhalten – feste 5/10/15%-Schritte außerhalb der
+  Hysterese, Schrittgröße nach Innen/Außen-Differenz.
+- `pi`: PI(D)-Regler, der direkt eine Öffnung berechnet. Die Verstärkung wird
+  mit der Innen/Außen-Differenz skaliert (kalte Außenluft kühlt stärker),
+  der I-Anteil hat Anti-Windup und wird beim ersten Lauf bzw. nach manuellen
+  Fahrten stoßfrei auf die Ist-Position gesetzt.
+- `predictive`: PI-Regler auf die für `horizon` Sekunden vorausgesagte
+  Temperatur (linearer Trend der letzten Messwerte). Solange Ist- und
+  Prognosewert im Toleranzbereich liegen, wird gar nicht gefahren.
+
+Für alle Regler gilt: Änderungen unter `min_move` Prozent und erneute Fahrten
+derselben Zone innerhalb von `min_interval` Sekunden werden unterdrückt
+(Ausnahme: Fahrt in eine Endlage). Das spart Relais-Schaltungen und verhindert
+Pendeln um den Sollwert.
+"""
+
+import abc
+import os
+import time
+from collections import deque
+
+import greenhouse_log
+
+logger = greenhouse_log.get_logger("control")
+
+# Standard-Regler (ohne Setting), siehe CONTROLLERS
+AUTO_CONTROLLER = os.getenv("AUTO_CONTROLLER", "step")
+
+# Standard-Parameter (per Setting-Kategorie `control` überschreibbar)
+CONTROL_KP = 10.0             # % Öffnung je °C Abweichung
+CONTROL_TI = 900.0            # Nachstellzeit in Sekunden (0 = kein I-Anteil)
+CONTROL_TD = 0.0              # Vorhaltzeit in Sekunden (D-Anteil auf den Messwert-Trend)
+CONTROL_DEADBAND = 0.3        # °C – innerhalb ruht der I-Anteil
+CONTROL_MIN_MOVE = 5          # % – kleinere Änderungen werden nicht gefahren
+CONTROL_MIN_INTERVAL = 300    # Sekunden Mindestabstand zwischen zwei Fahrten einer Zone
+CONTROL_HORIZON = 600         # Sekunden Prognosehorizont (predictive)
+TREND_WINDOW = 900            # Sekunden Messwert-Historie für den Trend
+REFERENCE_DELTA = 10.0        # °C Innen/Außen-Differenz, bei der die Verstärkung 1 ist
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class VentController(abc.ABC):
+    """Basis: gemeinsame Zonen-Historie, Mindest-Fahrweg und Mindest-Abstand"""
+
+    name = "base"
+    fixed_params = ()  # Parameter, die Settings nicht überschreiben
+
+    def __init__(self, min_move=CONTROL_MIN_MOVE, min_interval=CONTROL_MIN_INTERVAL, **params):
+        self.min_move = min_move
+        self.min_interval = min_interval
+        self._history = {}     # zone → deque[(monotonic, temp_in)]
+        self._last_move = {}   # zone → monotonic der letzten Fahrt
+        self.configure(**params)
+
+    def configure(self, min_move=None, min_interval=None, **params):
+        """Übernimmt geänderte Parameter (unbekannte werden ignoriert)"""
+        if min_move is not None:
+            self.min_move = min_move
+        if min_interval is not None:
+            self.min_interval = min_interval
+
+    def reset(self, zone=None):
+        """Vergisst den Reglerzustand (z.B. nach Moduswechsel)"""
+        for store in (self._history, self._last_move):
+            if zone is None:
+                store.clear()
+            else:
+                store.pop(zone, None)
+
+    def trend(self, zone):
+        """Temperaturänderung in °C/s (lineare Regression über TREND_WINDOW) oder 0"""
+        samples = self._history.get(zone)
+        if not samples or len(samples) < 3 or samples[-1][0] - samples[0][0] < 60:
+            return 0.0
+        t0 = samples[0][0]
+        n = len(samples)
+        mean_t = sum(t - t0 for t, _ in samples) / n
+        mean_v = sum(v for _, v in samples) / n
+        var = sum((t - t0 - mean_t) ** 2 for t, _ in samples)
+        if var == 0:
+            return 0.0
+        return sum((t - t0 - mean_t) * (v - mean_v) for t, v in samples) / var
+
+    def update(self, zone, temp_in, temp_out, position, target_temp, hysteresis, now=None):
+        """Neue Zielposition (int) für die Zone oder None"""
+        now = time.monotonic() if now is None else now
+        history = self._history.setdefault(zone, deque())
+        history.append((now, temp_in))
+        while history and now - history[0][0] > TREND_WINDOW:
+            history.popleft()
+
+        target = self.compute(zone, temp_in, temp_out, position, target_temp, hysteresis, now)
+        if target is None:
+            return None
+        target = int(round(_clamp(target, 0, 100)))
+
+        # Endlagen immer anfahren, sonst nur nennenswerte Änderungen
+        to_end_stop = target in (0, 100) and abs(target - position) >= 1
+        if abs(target - position) < self.min_move and not to_end_stop:
+            return None
+        last_move = self._last_move.get(zone)
+        if last_move is not None and now - last_move < self.min_interval and not to_end_stop:
+            logger.info("🌡 AUTO %s: Ziel %s%%, letzte Fahrt vor %.0fs – warte", zone, target, now - last_move)
+            return None
+
+        self._last_move[zone] = now
+        return target
+
+    @abc.abstractmethod
+    def compute(self, zone, temp_in, temp_out, position, target_temp, hysteresis, now):
+        """Neue Zielposition der Zone (0–100%) oder None"""
+
+
+class StepController(VentController):
+    """Feste Schritte (5/10/15%) außerhalb der Hysterese – bisheriges Verhalten"""
+
+    name = "step"
+    # Schritte sind ohnehin ≥5% und kommen höchstens einmal pro Zyklus –
+    # CONTROL_MIN_MOVE/CONTROL_MIN_INTERVAL gelten nur für pi/predictive
+    fixed_params = ('min_move', 'min_interval')
+
+    def __init__(self, **params):
+        params.setdefault('min_move', 1)
+        params.setdefault('min_interval', 0)
+        super().__init__(**params)
+
+    def compute(self, zone, temp_in, temp_out, position, target_temp, hysteresis, now):
+        # Berechne Temperatur-Abweichung vom Ziel
+        temp_diff = temp_in - target_temp
+
+        if temp_diff > hysteresis:
+            # Zu warm → ÖFFNEN
+            sign = 1
+        elif temp_diff < -hysteresis:
+            # Zu kalt → SCHLIESSEN
+            sign = -1
+        else:
+            # Im Toleranzbereich → Nichts tun
+            logger.info("🌡 AUTO %s: %s°C im Toleranzbereich (%s°C - %s°C)",
+                        zone, temp_in, target_temp - hysteresis, target_temp + hysteresis)
+            return None
+
+        # Multiplikator nach Außentemperatur-Differenz (5%, 10% oder 15% Schritte)
+        multiplier = 1
+        if temp_out is not None:
+            temp_delta = abs(temp_in - temp_out)
+            if temp_delta >= 15:
+                multiplier = 3
+            elif temp_delta >= 10:
+                multiplier = 2
+            logger.info("🌡 AUTO %s: Innen %s°C, Außen %s°C, Differenz %.1f°C → Multiplikator %sx",
+                        zone, temp_in, temp_out, temp_delta, multiplier)
+
+        target = _clamp(position + sign * 5 * multiplier, 0, 100)
+        if int(position) == int(target):
+            logger.info("🌡 AUTO %s: Tore bereits bei %.0f%%, keine Änderung nötig", zone, position)
+            return None
+        return target
+
+
+class PIController(VentController):
+    """PI(D)-Regler: Öffnung = I + Kp·g·(e + Td·dT/dt), g nach Innen/Außen-Differenz"""
+
+    name = "pi"
+
+    def __init__(self, kp=CONTROL_KP, ti=CONTROL_TI, td=CONTROL_TD, deadband=CONTROL_DEADBAND, **params):
+        self.kp = kp
+        self.ti = ti
+        self.td = td
+        self.deadband = deadband
+        self._integral = {}     # zone → I-Anteil in %
+        self._last_update = {}  # zone → monotonic
+        self._last_output = {}  # zone → zuletzt berechnete Öffnung
+        super().__init__(**params)
+
+    def configure(self, kp=None, ti=None, td=None, deadband=None, **params):
+        super().configure(**params)
+        if kp is not None:
+            self.kp = kp
+        if ti is not None:
+            self.ti = ti
+        if td is not None:
+            self.td = td
+        if deadband is not None:
+            self.deadband = deadband
+
+    def reset(self, zone=None):
+        super().reset(zone)
+        for store in (self._integral, self._last_update, self._last_output):
+            if zone is None:
+                store.clear()
+            else:
+                store.pop(zone, None)
+
+    def gain(self, temp_in, temp_out):
+        """Verstärkungsfaktor: große Differenz → kleine Öffnung reicht (0,5…2)"""
+        if temp_out is None:
+            return 1.0
+        return _clamp(REFERENCE_DELTA / max(temp_in - temp_out, 1.0), 0.5, 2.0)
+
+    def error(self, zone, temp_in, target_temp, hysteresis, now):
+        """Regelabweichung in °C (positiv = zu warm)"""
+        return temp_in - target_temp
+
+    def compute(self, zone, temp_in, temp_out, position, target_temp, hysteresis, now):
+        error = self.error(zone, temp_in, target_temp, hysteresis, now)
+        if error is None:
+            return None
+        kp = self.kp * self.gain(temp_in, temp_out)
+        proportional = kp * (error + self.td * self.trend(zone))
+
+        # Stoßfrei starten bzw. nach manueller Fahrt (Ist weicht vom letzten Ausgang ab)
+        last_output = self._last_output.get(zone)
+        if zone not in self._integral or last_output is None or abs(last_output - position) >= self.min_move:
+            self._integral[zone] = _clamp(position - proportional, 0, 100)
+            self._last_update[zone] = now
+
+        dt = min(now - self._last_update[zone], TREND_WINDOW)  # lange Pausen nicht aufintegrieren
+        self._last_update[zone] = now
+        integral = self._integral[zone]
+        output = integral + proportional
+
+        # Anti-Windup: nur integrieren, wenn der Ausgang nicht in der Begrenzung klemmt
+        saturated = (output >= 100 and error > 0) or (output <= 0 and error < 0)
+        if self.ti > 0 and abs(error) > self.deadband and not saturated:
+            integral = _clamp(integral + kp * error * dt / self.ti, 0, 100)
+            self._integral[zone] = integral
+            output = integral + proportional
+
+        output = _clamp(output, 0, 100)
+        self._last_output[zone] = output
+        logger.info("🌡 AUTO %s: %s°C (Abw. %+.1f°C, Außen %s°C) → Öffnung %.0f%% [P %+.0f, I %.0f] [%s]",
+                    zone, temp_in, error, temp_out, output, proportional, integral, self.name)
+        return output
+
+    def update(self, zone, temp_in, temp_out, position, target_temp, hysteresis, now=None):
+        target = super().update(zone, temp_in, temp_out, position, target_temp, hysteresis, now)
+        if target is None and zone in self._last_output:
+            if abs(self._last_output[zone] - position) >= self.min_move:
+                # Fahrt unterdrückt: I-Anteil behalten, aber nicht als manuelle Fahrt werten
+                self._last_output[zone] = position
+        return target
+
+
+class PredictiveController(PIController):
+    """PI-Regler auf die prognostizierte Temperatur; ruht, solange Ist und Prognose im Toleranzbereich sind"""
+
+    name = "predictive"
+
+    def __init__(self, horizon=CONTROL_HORIZON, **params):
+        self.horizon = horizon
+        super().__init__(**params)
+
+    def configure(self, horizon=None, **params):
+        super().configure(**params)
+        if horizon is not None:
+            self.horizon = horizon
+
+    def error(self, zone, temp_in, target_temp, hysteresis, now):
+        predicted = temp_in + self.trend(zone) * self.horizon
+        if abs(temp_in - target_temp) <= hysteresis and abs(predicted - target_temp) <= hysteresis:
+            logger.info("🌡 AUTO %s: %s°C, Prognose %.1f°C in %.0f min – im Toleranzbereich",
+                        zone, temp_in, predicted, self.horizon / 60)
+            # Neu einsteigen, sobald die Zone den Bereich verlässt
+            self._last_output.pop(zone, None)
+            return None
+        return predicted - target_temp
+
+
+CONTROLLERS = {
+    StepController.name: StepController,
+    PIController.name: PIController,
+    PredictiveController.name: PredictiveController,
+}
+
+# Setting-Schlüssel (Kategorie `control`) → Parameter
+SETTING_PARAMS = {
+    'CONTROL_KP': 'kp',
+    'CONTROL_TI': 'ti',
+    'CONTROL_TD': 'td',
+    'CONTROL_DEADBAND': 'deadband',
+    'CONTROL_MIN_MOVE': 'min_move',
+    'CONTROL_MIN_INTERVAL': 'min_interval',
+    'CONTROL_HORIZON': 'horizon',
+}
+
+
+def create_controller(name=AUTO_CONTROLLER, **params):
+    """Regler nach Name; unbekannte Namen fallen auf `step` zurück"""
+    cls = CONTROLLERS.get(name)
+    if cls is None:
+        logger.warning("⚠️  Unbekannter Regler '%s', verwende 'step'", name)
+        cls = StepController
+    return cls(**params)
+
+
+def params_from_settings(control_settings, current=AUTO_CONTROLLER):
+    """`settings['control']` (Format wie `GET /api/settings`) → (Name oder None, Parameter).
+
+    Parameter, die der gewählte Regler (ohne Setting: `current`) fest
+    vorgibt, werden nicht übernommen.
+    """
+    control_settings = control_settings or {}
+    name = control_settings.get('AUTO_CONTROLLER', {}).get('value')
+    fixed = CONTROLLERS.get(name or current, StepController).fixed_params
+    params = {
+        param: control_settings[key]['value']
+        for key, param in SETTING_PARAMS.items()
+        if key in control_settings and param not in fixed
+    }
+    return name, params
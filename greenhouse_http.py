@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+HTTP-Transportschicht für die Kommunikation mit der PHP-API.
+
+Hält pro API-Host genau eine `requests.Session` mit Connection-Pool und
+Keep-Alive, damit ein Poll-Zyklus über die LTE-Verbindung (SIM7600) nur einen
+TCP/TLS-Handshake kostet statt einen pro Request. Wird gemeinsam von
+`greenhouse_api_client.py` und `greenhouse_web.py` genutzt.
+
+Zusätzlich werden pro Endpoint einfache Zähler geführt (Anzahl Requests,
+Fehler, neue vs. wiederverwendete Verbindungen, Latenz), abrufbar über
+`get_stats()` bzw. `format_stats()`.
+
+`ConfigCache` merkt sich pro Konfigurations-Endpoint ETag und letzte Antwort,
+damit unveränderte Konfiguration nur noch als `304 Not Modified` übertragen wird.
+Mit einem `StateStore` (siehe `greenhouse_state.py`) überlebt der Cache Neustarts.
+
+Latenzen landen zusätzlich als Histogramm pro Endpoint und Methode in den
+Metriken (`greenhouse_metrics.py`); Zähler und Circuit-Zustände werden dort
+beim Abruf aus `get_stats()`/`breaker_stats()` übernommen.
+
+Für die Ausfallsicherheit gibt es pro Endpoint einen `CircuitBreaker` (nach
+mehreren Fehlern in Folge werden Requests für eine wachsende, zufällig
+gestreute Pause gar nicht erst versucht), `backoff_delay()` für Wiederholungen
+mit Jitter und ein Zeitbudget pro Zyklus (`budget()` / `remaining_budget()`),
+damit ein hängender Link die Regelschleife nicht minutenlang blockiert.
+
+Während eines Netzwerkwechsels (WLAN ↔ Hotspot, `greenhouse_network.py`)
+wird die API-I/O mit `pause()` angehalten: `request()` wirft dann sofort
+`NetworkPaused`, ohne zu senden. `resume()` verwirft die Keep-Alive-
+Verbindungen, die über die alte Route aufgebaut wurden.
+"""
+
+import contextlib
+import contextvars
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests  # pyright: ignore[reportMissingModuleSource]
+from requests.adapters import HTTPAdapter  # pyright: ignore[reportMissingModuleSource]
+
+import greenhouse_metrics
+
+# --- KONFIGURATION ---
+# Maximale Anzahl paralleler Verbindungen pro API-Host (Motor-Threads + Polling)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "4"))
+
+# Standard-Header für alle Sessions (Keep-Alive + komprimierte Antworten)
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+# Eine Session pro Host (scheme://netloc)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Zähler pro Endpoint
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Circuit Breaker: Fehler in Folge bis zum Öffnen, Pause (Basis/Maximum, verdoppelt sich)
+BREAKER_THRESHOLD = 3
+BREAKER_BASE_DELAY = 10
+BREAKER_MAX_DELAY = 300
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# Deadline (time.monotonic) des aktuellen Zyklus; None = kein Budget
+_deadline = contextvars.ContextVar('greenhouse_http_deadline', default=None)
+
+# Pause der API-I/O während eines Netzwerkwechsels: (Ende als time.monotonic, Grund) oder None
+_pause = None
+_pause_lock = threading.Lock()
+
+# Metriken
+REQUEST_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_http_request_duration_seconds", "Dauer der API-Requests (inkl. Verbindungsaufbau)")
+REQUESTS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_requests_total", "API-Requests pro Endpoint")
+REQUEST_ERRORS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_request_errors_total", "Fehlgeschlagene API-Requests (Netzwerk oder Status >= 400)")
+NEW_CONNECTIONS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_new_connections_total", "Neu aufgebaute Verbindungen (TCP/TLS-Handshake)")
+CIRCUIT_OPEN = greenhouse_metrics.gauge(
+    "greenhouse_http_circuit_open", "1 wenn der Circuit Breaker der Ressource offen/halb offen ist")
+CIRCUIT_TRIPS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_http_circuit_trips_total", "Öffnungen des Circuit Breakers")
+
+
+def _host_key(url):
+    """Liefert `scheme://netloc` als Schlüssel für die Session-Tabelle"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _endpoint_key(url):
+    """Liefert den letzten Pfadteil nach `/api/` als Endpoint-Namen für die Statistik"""
+    path = urlsplit(url).path
+    if '/api/' in path:
+        path = path.split('/api/', 1)[1]
+    return path.strip('/') or '/'
+
+
+def _metric_endpoint(endpoint):
+    """Endpoint ohne IDs (`command/12/complete` → `command/:id/complete`) gegen zu viele Label-Werte"""
+    return '/'.join(':id' if part.isdigit() else part for part in endpoint.split('/'))
+
+
+def get_session(url):
+    """Liefert die (thread-sichere, geteilte) Session für den Host von `url`."""
+    key = _host_key(url)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _sessions[key] = session
+        return session
+
+
+def _connection_pool(session, url):
+    """Holt den urllib3-Pool für `url` (für die Zählung neuer Verbindungen)"""
+    try:
+        adapter = session.get_adapter(url)
+        return adapter.poolmanager.connection_from_url(url)
+    except Exception:
+        return None
+
+
+def _record(method, endpoint, elapsed, new_connection, error):
+    # IDs zusammenfassen, sonst wächst die Tabelle mit jedem Befehl
+    endpoint = _metric_endpoint(endpoint)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=method)
+    with _stats_lock:
+        entry = _stats.setdefault(endpoint, {
+            'requests': 0,
+            'errors': 0,
+            'new_connections': 0,
+            'reused_connections': 0,
+            'total_time': 0.0,
+            'max_time': 0.0
+        })
+        entry['requests'] += 1
+        if error:
+            entry['errors'] += 1
+        if new_connection:
+            entry['new_connections'] += 1
+        else:
+            entry['reused_connections'] += 1
+        entry['total_time'] += elapsed
+        entry['max_time'] = max(entry['max_time'], elapsed)
+
+
+class NetworkPaused(requests.exceptions.ConnectionError):
+    """Request nicht gesendet: API-I/O ist wegen eines Netzwerkwechsels pausiert"""
+
+
+def request(method, url, **kwargs):
+    """
+    Führt einen HTTP-Request über die gepoolte Session des Hosts aus.
+
+    Parameter entsprechen `requests.Session.request`. Exceptions von `requests`
+    werden nach dem Zählen unverändert weitergereicht. Während einer Pause
+    (`pause()`) wird nicht gesendet, sondern `NetworkPaused` geworfen.
+    """
+    reason = paused()
+    if reason:
+        raise NetworkPaused(f"API-I/O pausiert ({reason})")
+
+    session = get_session(url)
+    pool = _connection_pool(session, url)
+    connections_before = pool.num_connections if pool else 0
+
+    endpoint = _endpoint_key(url)
+    start = time.monotonic()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        new_connection = pool is not None and pool.num_connections > connections_before
+        _record(method, endpoint, time.monotonic() - start, new_connection, error=True)
+        raise
+
+    new_connection = pool is not None and pool.num_connections > connections_before
+    _record(method, endpoint, time.monotonic() - start, new_connection, error=response.status_code >= 400)
+    return response
+
+
+def get_stats():
+    """Liefert eine Kopie der Zähler pro Endpoint (IDs als `:id`) inkl. Durchschnittslatenz"""
+    with _stats_lock:
+        stats = {}
+        for endpoint, entry in _stats.items():
+            stats[endpoint] = dict(entry)
+            stats[endpoint]['avg_time'] = entry['total_time'] / entry['requests'] if entry['requests'] else 0.0
+        return stats
+
+
+def reset_stats():
+    """Setzt alle Zähler zurück"""
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_stats():
+    """Kurze, einzeilige Zusammenfassung der Zähler für das Log"""
+    stats = get_stats()
+    total = sum(s['requests'] for s in stats.values())
+    if not total:
+        return "Keine HTTP-Requests"
+
+    new = sum(s['new_connections'] for s in stats.values())
+    errors = sum(s['errors'] for s in stats.values())
+    avg = sum(s['total_time'] for s in stats.values()) / total
+    trips = sum(b['open_count'] for b in breaker_stats().values())
+    return (f"{total} Requests, {new} neue Verbindungen, {total - new} wiederverwendet, "
+            f"{errors} Fehler, Ø {avg * 1000:.0f}ms, {trips}x Circuit offen")
+
+
+class ConfigCache:
+    """ETag-Cache für Konfigurations-Endpoints (thread-sicher).
+
+    Pro Endpoint werden Version (ETag) und die zuletzt übertragenen Daten
+    gespeichert. `conditional_headers()` liefert den passenden
+    `If-None-Match`-Header, `update()` wertet die Antwort aus und gibt bei
+    `304 Not Modified` die zwischengespeicherten Daten zurück.
+
+    Ist `store` gesetzt, werden die Einträge dort als `config:<endpoint>`
+    abgelegt und beim Erzeugen wieder geladen.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0    # 304 bzw. im Sync ausgelassene Abschnitte
+        self.misses = 0  # vollständig übertragene Antworten
+
+        if store is not None:
+            for key, entry in store.items('config:').items():
+                self._entries[key[len('config:'):]] = entry
+
+    def conditional_headers(self, endpoint):
+        with self._lock:
+            entry = self._entries.get(endpoint)
+        if entry and entry['version']:
+            return {'If-None-Match': entry['version']}
+        return {}
+
+    def update(self, endpoint, response):
+        """Übernimmt eine HTTP-Antwort; liefert die (ggf. gecachten) Daten"""
+        if response.status_code == 304:
+            with self._lock:
+                self.hits += 1
+                entry = self._entries.get(endpoint)
+                return entry['data'] if entry else None
+
+        data = response.json()
+        self.store(endpoint, response.headers.get('ETag'), data)
+        return data
+
+    def store(self, endpoint, version, data):
+        entry = {'version': version, 'data': data}
+        with self._lock:
+            self.misses += 1
+            changed = self._entries.get(endpoint) != entry
+            self._entries[endpoint] = entry
+        if self._store is not None and changed:
+            self._store.set(f'config:{endpoint}', entry)
+
+    def hit(self, endpoint):
+        """Liefert die gecachten Daten, wenn der Server 'unverändert' gemeldet hat"""
+        with self._lock:
+            self.hits += 1
+            entry = self._entries.get(endpoint)
+            return entry['data'] if entry else None
+
+    def get(self, endpoint):
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            return entry['data'] if entry else None
+
+    def versions(self):
+        """Alle bekannten Versionen (für den `versions`-Block im Sync)"""
+        with self._lock:
+            return {endpoint: entry['version'] for endpoint, entry in self._entries.items()
+                    if entry['version']}
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponentielles Backoff mit vollem Jitter: zufällig in [base/2, min(cap, base * 2^attempt)]"""
+    upper = min(cap, base * (2 ** attempt))
+    return random.uniform(min(base / 2, upper), upper)
+
+
+@contextlib.contextmanager
+def budget(seconds):
+    """Setzt ein Zeitbudget für alle Requests im Block (gilt auch in `asyncio.to_thread`)"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """Verbleibende Sekunden des aktuellen Budgets (None = unbegrenzt)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def pause(reason, seconds):
+    """Hält alle Requests an – höchstens `seconds` lang, falls `resume()` ausbleibt"""
+    global _pause
+    with _pause_lock:
+        _pause = (time.monotonic() + seconds, reason)
+
+
+def resume():
+    """Gibt die API-I/O wieder frei; Verbindungen über die alte Route werden neu aufgebaut"""
+    global _pause
+    with _pause_lock:
+        if _pause is None:
+            return
+        _pause = None
+    close_all()
+
+
+def paused():
+    """Grund der laufenden Pause oder None (eine abgelaufene Pause endet wie mit `resume()`)"""
+    global _pause
+    with _pause_lock:
+        if _pause is None:
+            return None
+        if time.monotonic() < _pause[0]:
+            return _pause[1]
+        _pause = None
+    close_all()
+    return None
+
+
+class CircuitBreaker:
+    """Schutzschalter für einen Endpoint (geschlossen → offen → halb offen).
+
+    Nach `BREAKER_THRESHOLD` Fehlern in Folge öffnet er für eine Pause, die
+    sich bei jedem erneuten Öffnen verdoppelt (mit Jitter, max.
+    `BREAKER_MAX_DELAY`). Danach wird genau ein Probe-Request durchgelassen;
+    Erfolg schließt ihn wieder.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0        # Fehler in Folge
+        self.trips = 0           # Öffnungen in Folge (für das Backoff)
+        self.open_count = 0      # Öffnungen insgesamt (Statistik)
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True, wenn ein Request versucht werden darf"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.open_until:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Liefert True, wenn der Schalter dadurch wieder geschlossen wurde"""
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            return recovered
+
+    def record_failure(self):
+        """Liefert True, wenn der Schalter dadurch geöffnet wurde"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= BREAKER_THRESHOLD:
+                delay = backoff_delay(self.trips, BREAKER_BASE_DELAY, BREAKER_MAX_DELAY)
+                self.open_until = time.monotonic() + delay
+                self.trips += 1
+                self.open_count += 1
+                tripped = self.state != self.OPEN
+                self.state = self.OPEN
+                return tripped
+            return False
+
+    def retry_in(self):
+        """Sekunden bis zum nächsten Probe-Request (0 wenn nicht offen)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.open_until - time.monotonic())
+
+
+def breaker(endpoint):
+    """Circuit Breaker für eine Ressource (erster Pfadteil, z.B. `command` für `command/12/complete`)"""
+    key = endpoint.split('/', 1)[0]
+    with _breakers_lock:
+        entry = _breakers.get(key)
+        if entry is None:
+            entry = _breakers[key] = CircuitBreaker(key)
+        return entry
+
+
+def open_circuits():
+    """Namen aller aktuell offenen Schalter"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.name for b in breakers if b.state != CircuitBreaker.CLOSED]
+
+
+def breaker_stats():
+    """Zustand aller Schalter pro Ressource"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        b.name: {
+            'state': b.state,
+            'failures': b.failures,
+            'open_count': b.open_count,
+            'retry_in': round(b.retry_in(), 1)
+        }
+        for b in breakers
+    }
+
+
+def _collect_metrics():
+    totals = {}
+    for endpoint, entry in get_stats().items():
+        total = totals.setdefault(_metric_endpoint(endpoint), [0, 0, 0])
+        total[0] += entry['requests']
+        total[1] += entry['errors']
+        total[2] += entry['new_connections']
+    for endpoint, (count, errors, new) in totals.items():
+        REQUESTS_TOTAL.set(count, endpoint=endpoint)
+        REQUEST_ERRORS_TOTAL.set(errors, endpoint=endpoint)
+        NEW_CONNECTIONS_TOTAL.set(new, endpoint=endpoint)
+    for name, entry in breaker_stats().items():
+        CIRCUIT_OPEN.set(int(entry['state'] != CircuitBreaker.CLOSED), resource=name)
+        CIRCUIT_TRIPS_TOTAL.set(entry['open_count'], resource=name)
+
+
+greenhouse_metrics.add_collector(_collect_metrics)
+
+
+def close_all():
+    """Schließt alle Sessions (beim Beenden des Clients)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Lokale Bewässerungssteuerung auf dem Pi.
+
+Die Ventile (`Bewässerung 1–3` in `GPIO_SWITCHES`) werden nicht mehr nur über
+den Soll-Zustand der API geschaltet, dessen Abschaltzeit vom Poll-Intervall
+abhängt. Der `IrrigationScheduler` führt Läufe mit fester Dauer selbst aus:
+
+- Ein eigener Thread wartet mit `time.monotonic()` genau bis zum nächsten
+  Ereignis (Laufende, Pause vorbei, Programmstart, Max-Laufzeit) und schaltet
+  über `SwitchManager.hold()`/`apply()` direkt die GPIO-Pins – ohne
+  HTTP-Round-Trip und sekundengenau.
+- Läufe werden nacheinander abgearbeitet (Zonen-Rotation): es ist immer
+  höchstens ein Ventil durch die Bewässerung offen, zwischen zwei Zonen liegt
+  eine kurze Pause (`pause`), damit die Pumpe nicht überlastet wird.
+- Programme laufen wiederkehrend zu einer Uhrzeit an bestimmten Wochentagen
+  und reihen ihre Zonen nacheinander ein. Der letzte Start wird im lokalen
+  Zustand gespeichert, ein Neustart startet ein Programm nicht doppelt; ein
+  verpasster Start wird innerhalb von `PROGRAM_GRACE` nachgeholt.
+- Nach einem Lauf bleibt das Ventil zu, bis die API einen neuen Soll-Zustand
+  schickt – auch wenn dort noch EIN steht (Standard `state=0`).
+- Harte Maximal-Laufzeit (`max_on`): Ein Ventil, das – egal ob durch die
+  Bewässerung oder manuell über die API – länger offen ist, wird lokal
+  geschlossen und bleibt zu, bis die API einen neuen Soll-Zustand schickt.
+  Gemessen wird mit `time.monotonic()`, ein Zeitsprung (NTP) verschiebt sie
+  nicht. Ein Verbindungsausfall lässt damit kein Ventil offen.
+
+Schaltzustände folgen `gpio_switches.state` (Active-Low): `False` = offen
+(GPIO LOW, Relais zieht an), `True` = geschlossen.
+
+Konfiguration über die Setting-Kategorie `irrigation`:
+
+- `IRRIGATION_MAX_ON`: maximale Öffnungsdauer eines Ventils (Sekunden)
+- `IRRIGATION_PAUSE`: Pause zwischen zwei Zonen (Sekunden)
+- `IRRIGATION_PROGRAMS`: JSON-Liste, z.B.
+  `[{"name": "Morgens", "start": "06:00", "days": [0, 2, 4],
+     "zones": ["Bewässerung 1", "Bewässerung 2"], "duration": 600, "enabled": true}]`
+  (`days`: 0 = Montag … 6 = Sonntag, ohne `days` täglich)
+"""
+
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+import greenhouse_log
+import greenhouse_metrics
+
+OPEN = False    # Active-Low: state 0 = Ventil offen
+CLOSED = True
+
+IRRIGATION_ZONES = ("Bewässerung 1", "Bewässerung 2", "Bewässerung 3")
+MAX_ON_TIME = 1800      # Sekunden, harte Obergrenze pro Öffnung
+ZONE_PAUSE = 5          # Sekunden zwischen zwei Zonen (Pumpe)
+PROGRAM_GRACE = timedelta(minutes=15)  # verpasste Programmstarts nachholen
+MAX_WAIT = 60           # Sekunden; Wanduhr (Programme) regelmäßig neu prüfen
+
+SOURCE_MANUAL = "manual"
+SOURCE_PROGRAM = "program"
+
+# Ein Bewässerungslauf: Zone, Dauer (s), Auslöser, Programmname
+Run = namedtuple('Run', ['zone', 'duration', 'source', 'program'])
+
+IRRIGATION_RUNS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_irrigation_runs_total", "Bewässerungsläufe (completed/stopped)")
+IRRIGATION_SECONDS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_irrigation_seconds_total", "Bewässerungsdauer pro Zone")
+IRRIGATION_MAX_ON_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_irrigation_max_on_total", "Ventile, die nach maximaler Laufzeit lokal geschlossen wurden")
+IRRIGATION_QUEUE = greenhouse_metrics.gauge(
+    "greenhouse_irrigation_queue_depth", "Wartende Bewässerungsläufe")
+
+
+_log = greenhouse_log.log_to("irrigation")
+
+
+def parse_programs(value):
+    """`IRRIGATION_PROGRAMS` (JSON-String oder Liste) → Liste gültiger Programme"""
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else []
+    programs = []
+    for program in value or []:
+        start = datetime.strptime(program['start'], "%H:%M").time()
+        programs.append({
+            'name': program.get('name') or program['start'],
+            'start': start,
+            'days': set(program.get('days', range(7))),
+            'zones': list(program['zones']),
+            'duration': int(program['duration']),
+            'enabled': program.get('enabled', True),
+        })
+    return programs
+
+
+class IrrigationScheduler:
+    """Bewässerungsläufe nacheinander, Programme und Max-Laufzeit mit lokalem Timer"""
+
+    def __init__(self, switches, zones=IRRIGATION_ZONES, store=None, log=_log):
+        self.switches = switches
+        self.zones = tuple(zones)
+        self.store = store
+        self.log = log
+        self.max_on = MAX_ON_TIME
+        self.pause = ZONE_PAUSE
+        self.programs = []
+        self._last_program_run = dict(store.get('irrigation:last_run', {})) if store is not None else {}
+        self._queue = deque()
+        self._current = None     # laufender Run
+        self._ends_at = None     # monotonic
+        self._started_at = None  # monotonic
+        self._next_start = 0.0   # monotonic, frühester Start des nächsten Laufs (Pause)
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="Irrigation", daemon=True)
+        self._thread.start()
+        # Von der API geöffnete Ventile sofort in die Max-Laufzeit einplanen
+        switches.listeners.append(self._wake)
+
+    def _wake(self, names=None):
+        with self._cond:
+            self._cond.notify_all()
+
+    # --- Konfiguration ---
+
+    def configure(self, settings):
+        """Übernimmt die Setting-Kategorie `irrigation` (Format wie `GET /api/settings`)"""
+        settings = settings or {}
+        with self._cond:
+            if 'IRRIGATION_MAX_ON' in settings:
+                self.max_on = int(settings['IRRIGATION_MAX_ON']['value'])
+            if 'IRRIGATION_PAUSE' in settings:
+                self.pause = int(settings['IRRIGATION_PAUSE']['value'])
+            if 'IRRIGATION_PROGRAMS' in settings:
+                self.programs = parse_programs(settings['IRRIGATION_PROGRAMS']['value'])
+            self._cond.notify_all()
+        self.log('INFO', "💧 Bewässerung: max. %ss pro Ventil, Pause %ss, %s Programm(e)",
+                 self.max_on, self.pause, sum(1 for p in self.programs if p['enabled']))
+
+    # --- Aufträge ---
+
+    def run(self, zone, duration, source=SOURCE_MANUAL, program=None):
+        """Reiht einen Lauf ein (läuft nach allen vorherigen); liefert False, wenn die Zone schon ansteht"""
+        if zone not in self.zones:
+            raise ValueError(f"Unbekannte Bewässerungszone: {zone}")
+        duration = int(duration)
+        if duration <= 0:
+            raise ValueError("Bewässerungsdauer muss positiv sein")
+        with self._cond:
+            limited = duration > self.max_on
+            duration = min(duration, self.max_on)
+            queued = not ((self._current and self._current.zone == zone) or any(r.zone == zone for r in self._queue))
+            if queued:
+                self._queue.append(Run(zone, duration, source, program))
+                IRRIGATION_QUEUE.set(len(self._queue))
+                self._cond.notify_all()
+        if limited:
+            self.log('WARNING', "💧 %s: Dauer auf Maximal-Laufzeit %ss begrenzt", zone, duration)
+        if not queued:
+            self.log('INFO', "💧 %s läuft bereits bzw. ist eingereiht", zone)
+        return queued
+
+    def stop(self, zone=None):
+        """Bricht den laufenden Lauf ab und leert die Warteschlange (optional nur für eine Zone)"""
+        with self._cond:
+            self._queue = deque(r for r in self._queue if zone is not None and r.zone != zone)
+            IRRIGATION_QUEUE.set(len(self._queue))
+            if self._current and (zone is None or self._current.zone == zone):
+                self._ends_at = time.monotonic()
+            self._cond.notify_all()
+
+    def shutdown(self):
+        """Beendet den Thread und schließt ein laufendes Ventil"""
+        self.stop()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    def describe(self):
+        """Laufender Lauf (mit Restzeit) und Warteschlange"""
+        with self._cond:
+            current = None
+            if self._current:
+                current = dict(self._current._asdict(),
+                               remaining=round(max(0.0, self._ends_at - time.monotonic()), 1))
+            return {'current': current, 'queue': [r._asdict() for r in self._queue]}
+
+    # --- Timer-Thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    break
+                actions = self._step(time.monotonic(), datetime.now())
+                timeout = self._timeout(time.monotonic(), datetime.now())
+            for action in actions:
+                action()
+            if actions:
+                self.switches.apply()
+                continue
+            with self._cond:
+                if self._running:
+                    self._cond.wait(timeout)
+        # Beim Beenden kein Ventil offen lassen
+        if self._current:
+            self._finish(self._current, time.monotonic() - self._started_at, "stopped")
+            self.switches.apply()
+
+    def _step(self, now, wall):
+        """Fällige Ereignisse (Lock gehalten); liefert Schalt-Aktionen für außerhalb des Locks"""
+        actions = []
+
+        # 1. Laufender Lauf zu Ende (Zeit abgelaufen oder gestoppt)
+        busy = {self._current.zone} if self._current else set()
+        if self._current and now >= self._ends_at:
+            run = self._current
+            elapsed = min(now - self._started_at, run.duration)
+            result = "completed" if elapsed >= run.duration else "stopped"
+            self._current = None
+            self._next_start = now + self.pause
+            actions.append(lambda run=run, elapsed=elapsed, result=result: self._finish(run, elapsed, result))
+
+        # 2. Fällige Programme einreihen
+        for program in self.programs:
+            if self._program_due(program, wall):
+                self._last_program_run[program['name']] = wall.date().isoformat()
+                if self.store is not None:
+                    self.store.set('irrigation:last_run', self._last_program_run)
+                message = f"💧 Programm '{program['name']}' startet: {', '.join(program['zones'])}"
+                actions.append(lambda message=message: self.log('INFO', message, ship=True))
+                for zone in program['zones']:
+                    if zone in self.zones and not any(r.zone == zone for r in self._queue):
+                        self._queue.append(Run(zone, min(program['duration'], self.max_on),
+                                               SOURCE_PROGRAM, program['name']))
+                IRRIGATION_QUEUE.set(len(self._queue))
+
+        # 3. Nächsten Lauf starten (nach der Pause, immer nur ein Ventil)
+        if self._current is None and self._queue and now >= self._next_start:
+            run = self._queue.popleft()
+            IRRIGATION_QUEUE.set(len(self._queue))
+            self._current = run
+            self._started_at = now
+            self._ends_at = now + run.duration
+            actions.append(lambda run=run: self._start(run))
+
+        # 4. Maximal-Laufzeit für alle offenen Ventile (auch manuell geöffnete)
+        if self._current:
+            busy.add(self._current.zone)
+        for zone, since in self._open_since(now).items():
+            if zone not in busy and now - since >= self.max_on:
+                actions.append(lambda zone=zone: self._close_after_max_on(zone))
+
+        return actions
+
+    def _timeout(self, now, wall):
+        """Sekunden bis zum nächsten Ereignis (Lock gehalten)"""
+        deadlines = [MAX_WAIT]
+        if self._current:
+            deadlines.append(self._ends_at - now)
+        elif self._queue:
+            deadlines.append(self._next_start - now)
+        for program in self.programs:
+            start = self._next_program_start(program, wall)
+            if start is not None:
+                deadlines.append((start - wall).total_seconds())
+        current = self._current.zone if self._current else None
+        for zone, since in self._open_since(now).items():
+            if zone != current:
+                deadlines.append(self.max_on - (now - since))
+        return max(0.0, min(deadlines))
+
+    def _open_since(self, now):
+        """Offene Bewässerungsventile, die offen bleiben sollen → Zeitpunkt der Öffnung (time.monotonic())"""
+        states = self.switches.states()
+        return {zone: entry['switched_at'] or now
+                for zone, entry in states.items()
+                if zone in self.zones and entry['state'] == OPEN and self.switches.target(zone) != CLOSED}
+
+    def _program_due(self, program, wall):
+        if not program['enabled'] or wall.weekday() not in program['days']:
+            return False
+        if self._last_program_run.get(program['name']) == wall.date().isoformat():
+            return False
+        start = datetime.combine(wall.date(), program['start'])
+        return start <= wall < start + PROGRAM_GRACE
+
+    def _next_program_start(self, program, wall):
+        """Nächster Start eines Programms (heute oder an einem der folgenden Tage)"""
+        if not program['enabled']:
+            return None
+        for offset in range(8):
+            day = wall.date() + timedelta(days=offset)
+            start = datetime.combine(day, program['start'])
+            if start > wall and day.weekday() in program['days']:
+                return start
+        return None
+
+    # --- Schalten (außerhalb des Locks) ---
+
+    def _start(self, run):
+        self.switches.hold(run.zone, OPEN)
+        origin = f"Programm '{run.program}'" if run.program else run.source
+        self.log('INFO', "💧 %s AUF für %ss (%s)", run.zone, run.duration, origin, ship=True)
+
+    def _finish(self, run, elapsed, result):
+        # Zu lassen, bis die API einen neuen Soll-Zustand schickt (dort steht oft noch EIN)
+        self.switches.hold(run.zone, CLOSED, until_change=True)
+        IRRIGATION_RUNS_TOTAL.inc(zone=run.zone, result=result)
+        IRRIGATION_SECONDS_TOTAL.inc(elapsed, zone=run.zone)
+        self.log('INFO', "💧 %s ZU nach %.0fs (%s)", run.zone, elapsed, result, ship=True)
+
+    def _close_after_max_on(self, zone):
+        self.switches.hold(zone, CLOSED, until_change=True)
+        IRRIGATION_MAX_ON_TOTAL.inc(zone=zone)
+        self.log('WARNING', "⏱ %s länger als %ss offen → lokal geschlossen", zone, self.max_on, ship=True)
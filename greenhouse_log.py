@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Strukturiertes, gepuffertes Logging für den Pi-Client (auf Basis von `logging`).
+
+- **Level-Filter vor dem Formatieren**: `log('DEBUG', "Settings: %s", settings)`
+  setzt die Argumente erst ein, wenn die Meldung tatsächlich ausgegeben wird
+  (`LOG_LEVEL`, Standard INFO).
+- **Ringpuffer**: Zeilen werden gesammelt und alle `LOG_FLUSH_INTERVAL`
+  Sekunden in EINEM Schreibvorgang an stdout/journald gegeben (Fehler sofort).
+  Läuft der Puffer voll, fallen die ältesten Zeilen heraus und werden gezählt.
+  `LOG_FLUSH_INTERVAL=0` schreibt jede Zeile sofort.
+- **Rate-Limit**: pro Meldungsvorlage höchstens `RATE_LIMIT_COUNT` Zeilen je
+  `RATE_LIMIT_WINDOW` Sekunden; die Anzahl unterdrückter Zeilen wird an der
+  nächsten durchgelassenen vermerkt. Vorlage ist der Text vor dem Einsetzen
+  der Argumente – Meldungen daher als `log('INFO', "Tor %s offen", gate)`
+  schreiben, nicht als f-String. Fehler (ab ERROR) und `ship=True`-Ereignisse
+  werden nie unterdrückt.
+- **Format** (`LOG_FORMAT`): `text` wie bisher (`[Zeit] [LEVEL] Meldung`) oder
+  `json` (eine JSON-Zeile pro Meldung inkl. strukturierter Felder).
+- **Versand an die API**: Meldungen ab `LOG_SHIP_LEVEL` (Standard WARNING)
+  sowie einzeln mit `ship=True` markierte Ereignisse gehen gesammelt per
+  `POST /api/logs` in die `logs`-Tabelle – ein Request pro Minute statt einem
+  pro Meldung. Mit `ship=False` wird eine Meldung nie versendet.
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import greenhouse_http
+
+# --- KONFIGURATION ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")                     # text | json
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))  # Sekunden, 0 = sofort
+LOG_SHIP_LEVEL = os.getenv("LOG_SHIP_LEVEL", "WARNING").upper()   # OFF = nichts versenden
+LOG_BUFFER_SIZE = 1000    # Zeilen im Ringpuffer
+RATE_LIMIT_COUNT = 5      # gleiche Meldungen pro Fenster
+RATE_LIMIT_WINDOW = 60    # Sekunden
+LOG_SHIP_INTERVAL = 60    # Sekunden zwischen zwei Sendungen
+LOG_SHIP_BATCH = 100      # Meldungen pro Request
+LOG_SHIP_MAX = 500        # Meldungen, die bei API-Ausfall vorgehalten werden
+
+LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL
+}
+
+ROOT_LOGGER = "greenhouse"
+
+_buffer_handler = None
+_ship_handler = None
+_rate_limit = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name=None):
+    """Logger unterhalb von `greenhouse` (z.B. `greenhouse.client`)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}" if name else ROOT_LOGGER)
+
+
+def log(logger, level, message, *args, ship=None, **fields):
+    """Meldung mit Level als Text (`'INFO'`); `args` werden erst bei Ausgabe eingesetzt"""
+    levelno = LEVELS.get(level, logging.INFO)
+    if not logger.isEnabledFor(levelno):
+        return
+    logger.log(levelno, message, *args, extra={'fields': fields, 'ship': ship})
+
+
+def log_to(name):
+    """`log(level, message, *args, ship=None, **fields)` auf den Logger `greenhouse.<name>`
+
+    Standard für Klassen, denen der Aufrufer keine eigene Log-Funktion übergibt.
+    """
+    return functools.partial(log, get_logger(name))
+
+
+# --- FORMATE ---
+
+class TextFormatter(logging.Formatter):
+    """`[2026-05-01 12:00:00] [INFO] Meldung key=value`"""
+
+    def format(self, record):
+        timestamp = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
+        line = f"[{timestamp}] [{record.levelname}] {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            line += f" (+{suppressed} gleiche Meldung(en) unterdrückt)"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Meldung (für `journalctl -o cat | jq`)"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# --- FILTER UND HANDLER ---
+
+class RateLimitFilter(logging.Filter):
+    """Lässt pro Meldungsvorlage höchstens `count` Zeilen je `window` Sekunden durch"""
+
+    def __init__(self, count=RATE_LIMIT_COUNT, window=RATE_LIMIT_WINDOW):
+        super().__init__()
+        self.count = count
+        self.window = window
+        self._entries = {}  # (logger, level, vorlage) → [fensterbeginn, anzahl, unterdrückt]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        # Fehler und gezielt versendete Ereignisse werden nie unterdrückt
+        if record.levelno >= logging.ERROR or getattr(record, 'ship', None) is True:
+            return True
+        # Ein Filter für mehrere Handler: pro Meldung nur einmal zählen
+        if hasattr(record, 'rate_limited'):
+            return not record.rate_limited
+        record.rate_limited = not self._check(record)
+        return not record.rate_limited
+
+    def _check(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                self._entries[key] = [now, 1, 0]
+                if len(self._entries) > LOG_BUFFER_SIZE:
+                    self._expire(now)
+            elif entry[1] < self.count:
+                entry[1] += 1
+                suppressed = 0
+            else:
+                entry[2] += 1
+                return False
+        record.suppressed = suppressed
+        return True
+
+    def _expire(self, now):
+        for key in [key for key, entry in self._entries.items() if now - entry[0] >= self.window]:
+            del self._entries[key]
+
+
+class BufferedHandler(logging.Handler):
+    """Sammelt formatierte Zeilen im Ringpuffer und schreibt sie gebündelt.
+
+    Geschrieben wird alle `interval` Sekunden (Hintergrund-Thread), sofort
+    ab `flush_level` und beim Beenden. `interval=0` schreibt jede Zeile sofort.
+    """
+
+    def __init__(self, interval=LOG_FLUSH_INTERVAL, capacity=LOG_BUFFER_SIZE, flush_level=logging.ERROR):
+        super().__init__()
+        self.interval = interval
+        self.flush_level = flush_level
+        self.dropped = 0
+        self._lines = deque(maxlen=capacity)
+        if interval > 0:
+            threading.Thread(target=self._run, name="LogFlush", daemon=True).start()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+        if self.interval <= 0 or record.levelno >= self.flush_level:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self._lines and not self.dropped:
+                return
+            lines = list(self._lines)
+            self._lines.clear()
+            if self.dropped:
+                lines.insert(0, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [WARNING] "
+                                f"Log-Puffer voll: {self.dropped} Zeile(n) verworfen")
+                self.dropped = 0
+        # sys.stdout erst hier auflösen (kann umgeleitet sein)
+        stream = sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+            # auch print()-Ausgaben der Module (stdout ist unter systemd blockgepuffert)
+            try:
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class ShipHandler(logging.Handler):
+    """Sammelt ausgewählte Meldungen und sendet sie gebündelt an `POST /api/logs`"""
+
+    def __init__(self, api_url, api_key, level=logging.WARNING, interval=LOG_SHIP_INTERVAL):
+        super().__init__()
+        self.api_url = api_url
+        self.api_key = api_key
+        self.ship_level = level
+        self.interval = interval
+        self.sent = 0
+        self.dropped = 0
+        self.enabled = True
+        self._entries = deque(maxlen=LOG_SHIP_MAX)   # (Nummer, Meldung)
+        self._seq = 0
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="LogShip", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        ship = getattr(record, 'ship', None)
+        if not self.enabled or ship is False or (ship is None and record.levelno < self.ship_level):
+            return
+        message = record.getMessage()
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        with self.lock:
+            if len(self._entries) == self._entries.maxlen:
+                self.dropped += 1
+            self._seq += 1
+            self._entries.append((self._seq, {'level': record.levelname, 'message': message, 'ts': round(record.created)}))
+            full = len(self._entries) >= LOG_SHIP_BATCH
+        if full:
+            self._wake.set()
+
+    def _send(self, batch):
+        response = greenhouse_http.request(
+            'POST',
+            f"{self.api_url}/logs",
+            params={'api_key': self.api_key},
+            headers={'X-API-Key': self.api_key},
+            json={'entries': batch},
+            timeout=10
+        )
+        return response.status_code
+
+    def ship(self):
+        """Sendet alle gesammelten Meldungen; True wenn nichts mehr wartet"""
+        while self.enabled:
+            with self.lock:
+                snapshot = list(self._entries)[:LOG_SHIP_BATCH]
+            if not snapshot:
+                return True
+            last_seq = snapshot[-1][0]
+            batch = [entry for _, entry in snapshot]
+            try:
+                status = self._send(batch)
+            except Exception as e:
+                _local(logging.DEBUG, "Log-Versand fehlgeschlagen: %s", e)
+                return False
+            if status == 404:
+                # Ältere API ohne /logs: Versand abschalten
+                self.enabled = False
+                _local(logging.WARNING, "API ohne /logs → Log-Versand deaktiviert")
+                return False
+            if status != 200:
+                _local(logging.DEBUG, "Log-Versand abgelehnt (HTTP %s)", status)
+                return False
+            with self.lock:
+                # Nur die gesendeten Meldungen entfernen: Lief der Puffer während
+                # des Sendens über, sind ältere davon bereits herausgefallen
+                removed = 0
+                while self._entries and self._entries[0][0] <= last_seq:
+                    self._entries.popleft()
+                    removed += 1
+                # … und wurden dabei fälschlich als verworfen gezählt
+                self.dropped -= len(batch) - removed
+                self.sent += len(batch)
+        return False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.ship()
+
+    def close(self):
+        self.ship()
+        super().close()
+
+
+def _local(levelno, message, *args):
+    """Meldung nur lokal ausgeben (nie versenden – verhindert Schleifen beim Versand)"""
+    get_logger("log").log(levelno, message, *args, extra={'fields': {}, 'ship': False})
+
+
+# --- EINRICHTUNG ---
+
+def setup(level=LOG_LEVEL, fmt=LOG_FORMAT, interval=LOG_FLUSH_INTERVAL):
+    """Richtet Puffer, Format und Rate-Limit für den `greenhouse`-Logger ein (idempotent)"""
+    global _buffer_handler, _rate_limit
+    with _setup_lock:
+        root = get_logger()
+        root.setLevel(LEVELS.get(level, logging.INFO))
+        root.propagate = False
+        if _buffer_handler is None:
+            _rate_limit = RateLimitFilter()
+            _buffer_handler = BufferedHandler(interval)
+            _buffer_handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+            _buffer_handler.addFilter(_rate_limit)
+            root.addHandler(_buffer_handler)
+    return root
+
+
+def start_shipping(api_url, api_key, level=LOG_SHIP_LEVEL):
+    """Startet den gebündelten Versand an die API (`LOG_SHIP_LEVEL=OFF` = aus)"""
+    global _ship_handler
+    if level == 'OFF' or not api_url:
+        return None
+    with _setup_lock:
+        if _ship_handler is None:
+            _ship_handler = ShipHandler(api_url, api_key, LEVELS.get(level, logging.WARNING))
+            if _rate_limit is not None:
+                _ship_handler.addFilter(_rate_limit)
+            get_logger().addHandler(_ship_handler)
+    return _ship_handler
+
+
+def shutdown():
+    """Versendet Restmeldungen und leert den Puffer (beim Beenden)"""
+    if _ship_handler is not None:
+        _ship_handler.ship()
+    if _buffer_handler is not None:
+        _buffer_handler.flush()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Laufzeit-Metriken im Prometheus-Textformat (ohne externe Abhängigkeiten).
+
+Die Module melden Messwerte direkt am Ort des Geschehens:
+
+- `Counter`: nur steigende Zähler (z.B. Retries, Relais-Schaltungen)
+- `Gauge`: Momentanwerte (z.B. Warteschlangenlänge)
+- `Histogram`: Verteilungen mit festen Buckets (z.B. Request-Latenz, Zyklusdauer)
+
+Zähler, die ohnehin schon woanders geführt werden (HTTP-Statistik, Cache,
+Circuit Breaker, Sensor-Abtastung, Write-Behind), werden nicht doppelt
+gezählt, sondern erst beim Abruf über registrierte Collector-Funktionen
+übernommen (`add_collector()`).
+
+Ausgabe (beides optional, über `.env`):
+
+- `METRICS_PORT`: kleiner HTTP-Server, `GET /metrics` (Standard nur auf
+  `127.0.0.1`, siehe `METRICS_HOST`)
+- `METRICS_TEXTFILE`: Datei für den Textfile-Collector des node-exporter,
+  wird alle `METRICS_INTERVAL` Sekunden atomar ersetzt
+
+Alle Metriken sind thread-sicher; ein Aufruf kostet einen Lock und ein
+Dict-Zugriff und kann daher auch in der Regelschleife verwendet werden.
+"""
+
+import contextlib
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- KONFIGURATION ---
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))          # 0 = kein HTTP-Endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")        # leer = keine Datei
+METRICS_INTERVAL = 15  # Sekunden zwischen zwei Textfile-Updates
+
+# Buckets (Sekunden) für Latenzen über LTE bzw. Zyklusdauern
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25)
+# Buckets (Sekunden) für eine Sensor-Messrunde (Wandlungszeit 94–750ms)
+SENSOR_BUCKETS = (0.1, 0.2, 0.4, 0.8, 1, 2, 5)
+
+# Logger unterhalb von `greenhouse` (Puffer, Rate-Limit, Versand aus greenhouse_log);
+# greenhouse_log selbst wird nicht importiert, weil es über greenhouse_http hierher führt
+logger = logging.getLogger("greenhouse.metrics")
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_collectors = []
+
+_server = None
+_textfile_thread = None
+_textfile_path = None
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """`[(suffix, labels, wert)]` für die Ausgabe"""
+        with self._lock:
+            return [("", key, value) for key, value in sorted(self._values.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """Übernimmt einen anderswo geführten Zählerstand (nur für Collectors)"""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Misst die Dauer des `with`-Blocks (auch bei Exceptions)"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._values.items())
+        result = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                result.append(("_bucket", key + (("le", _format_value(float(bound))),), cumulative))
+            result.append(("_sum", key, total))
+            result.append(("_count", key, count))
+        return result
+
+
+def _register(cls, name, documentation, **kwargs):
+    """Legt eine Metrik an oder liefert die bereits registrierte gleichen Namens"""
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, documentation, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metrik {name} ist bereits als {metric.kind} registriert")
+        return metric
+
+
+def counter(name, documentation):
+    return _register(Counter, name, documentation)
+
+
+def gauge(name, documentation):
+    return _register(Gauge, name, documentation)
+
+
+def histogram(name, documentation, buckets=LATENCY_BUCKETS):
+    return _register(Histogram, name, documentation, buckets=buckets)
+
+
+def add_collector(collector):
+    """Registriert eine Funktion, die vor jeder Ausgabe Zähler/Gauges aktualisiert"""
+    with _metrics_lock:
+        _collectors.append(collector)
+
+
+def remove_collector(collector):
+    with _metrics_lock:
+        if collector in _collectors:
+            _collectors.remove(collector)
+
+
+def render():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)"""
+    with _metrics_lock:
+        collectors = list(_collectors)
+    for collector in collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.warning("⚠️  Metrik-Collector %s fehlgeschlagen: %s", getattr(collector, '__name__', collector), e)
+
+    with _metrics_lock:
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+
+    lines = []
+    for metric in metrics:
+        samples = metric.samples()
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, key, value in samples:
+            lines.append(f"{metric.name}{suffix}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- AUSGABE ---
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes nicht ins Journal schreiben
+
+
+def write_textfile(path=None):
+    """Schreibt alle Metriken atomar (tmp + rename) für den node-exporter"""
+    path = path or METRICS_TEXTFILE
+    if not path:
+        return False
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            f.write(render())
+        os.replace(tmp, path)
+        return True
+    except OSError as e:
+        logger.warning("⚠️  Metriken nicht geschrieben (%s): %s", path, e)
+        return False
+
+
+def _textfile_loop(path, interval):
+    while True:
+        write_textfile(path)
+        time.sleep(interval)
+
+
+def start(port=None, textfile=None, interval=METRICS_INTERVAL):
+    """Startet HTTP-Endpoint und/oder Textfile-Export (je nach Konfiguration)"""
+    global _server, _textfile_thread, _textfile_path
+    port = METRICS_PORT if port is None else port
+    textfile = METRICS_TEXTFILE if textfile is None else textfile
+
+    if port and _server is None:
+        try:
+            _server = ThreadingHTTPServer((METRICS_HOST, port), _Handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="Metrics", daemon=True).start()
+            logger.info("📈 Metriken: http://%s:%s/metrics", METRICS_HOST, port)
+        except OSError as e:
+            _server = None
+            logger.warning("⚠️  Metrik-Endpoint auf Port %s nicht gestartet: %s", port, e)
+
+    if textfile and _textfile_thread is None:
+        _textfile_path = textfile
+        _textfile_thread = threading.Thread(target=_textfile_loop, args=(textfile, interval),
+                                            name="MetricsTextfile", daemon=True)
+        _textfile_thread.start()
+        logger.info("📈 Metriken: %s (alle %ss)", textfile, interval)
+
+
+def stop():
+    """Beendet den HTTP-Endpoint und schreibt die Textdatei ein letztes Mal"""
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+    if _textfile_path:
+        write_textfile(_textfile_path)
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Motor-Ansteuerung für die Gewächshaus-Tore.
+
+Jeder Motor bekommt einen eigenen `MotorController` mit Worker-Thread. Eine
+Fahrt läuft nicht mehr als blockierendes `time.sleep(runtime)`, sondern als
+unterbrechbares Warten: ein neues Ziel oder ein STOP beendet die laufende
+Fahrt sofort, die Relais werden abgeschaltet und die Position wird aus der
+tatsächlich gefahrenen Zeit berechnet. Anschließend fährt der Motor ggf.
+direkt das neue Ziel an.
+
+Die Fahrzeit wird sekundengenau mit `time.monotonic()` geführt (keine
+Rundung auf ganze Sekunden). Die gemessene Relais-Verzögerung (Anzug/Abfall)
+wird herausgerechnet und der Controller merkt sich die exakte (gebrochene)
+Position: gespeichert wird zwar die gerundete Prozentzahl, der Rest wird aber
+in die nächste Fahrt übernommen, damit viele kleine Automatik-Schritte nicht
+driften.
+
+Darüber sitzt pro Tor ein `GateScheduler` mit eigener Warteschlange: manuelle
+Aufträge lösen laufende und wartende Aufträge sofort ab, Automatik-Aufträge
+werden zusammengefasst (nur das jüngste Ziel bleibt) und weichen manuellen
+Fahrten. Tore sind dadurch voneinander unabhängig – es gibt keine globale
+"beschäftigt"-Sperre mehr.
+
+Mehrere Tore gleichzeitig werden über den `ActuationExecutor` gefahren: er
+nimmt einen Fahrplan `{tor: ziel}` entgegen, verteilt ihn auf die (dauerhaft
+laufenden) Scheduler und liefert ein `concurrent.futures.Future` mit Ergebnis
+und Zeiten pro Tor – ohne pro Aufruf neue Threads zu starten.
+
+Das Modul kennt keine API und kein RPi.GPIO-Import – das GPIO-Modul wird von
+`greenhouse_web.py` übergeben. Laufzeiten, Relais-Schaltungen und Wartezeiten
+der Aufträge werden in `greenhouse_metrics` gezählt.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import greenhouse_log
+import greenhouse_metrics
+
+logger = greenhouse_log.get_logger("motion")
+
+# Mindest-Pause zwischen Relais-Umschaltungen (Schutz gegen gleichzeitiges AUF/ZU)
+RELAY_SETTLE_TIME = 0.5
+# Sekunden zwischen zwei Zwischenständen der Position während einer Fahrt
+POSITION_UPDATE_INTERVAL = 5.0
+
+# Ergebnis eines Fahrauftrags
+RESULT_REACHED = "reached"        # Ziel erreicht (oder war bereits erreicht)
+RESULT_SUPERSEDED = "superseded"  # durch neues Ziel oder STOP abgelöst
+RESULT_TIMEOUT = "timeout"        # Aufrufer hat nicht lange genug gewartet
+RESULT_QUEUED = "queued"          # Auftrag wartet bzw. läuft noch (Aufrufer wartet nicht weiter)
+RESULT_SKIPPED = "skipped"        # Automatik-Auftrag verworfen (manuelle Fahrt hat Vorrang)
+RESULT_ERROR = "error"            # Fehler bei der Fahrt (z.B. GPIO)
+
+# Herkunft eines Fahrauftrags
+SOURCE_MANUAL = "manual"
+SOURCE_AUTO = "auto"
+
+# Metriken
+MOTOR_RUNTIME_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_motor_runtime_seconds_total", "Angesteuerte Motorlaufzeit pro Tor und Richtung")
+MOTOR_MOVES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_motor_moves_total", "Fahrten pro Tor, Richtung und Ausgang (completed/interrupted)")
+RELAY_SWITCHES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_relay_switches_total", "Einschaltungen der Motor-Relais (Verschleiß)")
+RELAY_SETTLE_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_relay_settle_seconds_total", "Wartezeit für die Relais-Pause vor einer Fahrt")
+JOB_WAIT_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_gate_job_wait_seconds", "Wartezeit eines Fahrauftrags bis zum Start")
+JOBS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_gate_jobs_total", "Erledigte Fahraufträge pro Tor, Herkunft und Ergebnis")
+
+
+class MotorController:
+    """Steuert einen einzelnen Tor-Motor; nimmt jederzeit neue Ziele an.
+
+    Die Position wird nicht im Controller gehalten, sondern über die
+    Callbacks `get_position`/`set_position` gelesen und geschrieben (in der
+    Praxis `GreenhouseSystem.gate_positions`), damit Korrekturen von außen
+    (z.B. Wiederherstellung aus der DB) weiterhin wirken. Während einer Fahrt
+    wird alle `POSITION_UPDATE_INTERVAL` Sekunden der Zwischenstand gemeldet.
+    """
+
+    def __init__(self, name, pins, gpio, runtimes, get_position, set_position, latency=(0.0, 0.0)):
+        self.name = name
+        self.pin_auf = pins[0]
+        self.pin_zu = pins[1]
+        self._gpio = gpio
+        self._runtimes = runtimes          # callable → (runtime_open, runtime_close)
+        self._get_position = get_position  # callable → aktuelle Position (0-100)
+        self._set_position = set_position  # callable(position)
+        # Relais-Verzögerung in Sekunden: (Anzug bis Motor läuft, Abfall bis Motor steht)
+        self.pull_in, self.drop_out = latency
+
+        self._exact_position = None  # exakte Position der letzten Fahrt (float)
+        self._relays_off_at = None   # monotonic-Zeitpunkt der letzten Abschaltung
+
+        self._cond = threading.Condition()
+        self._target = None      # Zielposition oder None (Stillstand)
+        self._generation = 0     # zählt jeden neuen Auftrag (Ziel oder STOP)
+        self._finished = 0       # letzte abgeschlossene Generation
+        self._failed = 0         # letzte mit Fehler abgebrochene Generation
+        self.last_error = None
+        self._moving = False
+        self._direction = None
+
+        self._thread = threading.Thread(target=self._run, name=f"Motor-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_moving(self):
+        return self._moving
+
+    @property
+    def direction(self):
+        return self._direction
+
+    def move_to(self, target, wait=True, timeout=None):
+        """Setzt ein neues Ziel (0-100%); eine laufende Fahrt wird sofort umgelenkt.
+
+        Mit `wait=True` blockiert der Aufruf, bis dieses Ziel erreicht oder
+        durch einen neueren Auftrag abgelöst wurde. Mit `wait=False` wird die
+        Auftragsnummer (Generation) für ein späteres `wait()` zurückgegeben.
+        """
+        target = max(0, min(100, target))
+        with self._cond:
+            self._generation += 1
+            generation = self._generation
+            self._target = target
+            self._cond.notify_all()
+
+        if not wait:
+            return generation
+        return self.wait(generation, timeout)
+
+    def stop(self):
+        """Stoppt den Motor sofort (laufende Fahrt wird abgebrochen)"""
+        with self._cond:
+            self._generation += 1
+            self._target = None
+            self._cond.notify_all()
+
+    def wait(self, generation, timeout=None):
+        """Wartet auf das Ende des Auftrags `generation`"""
+        with self._cond:
+            done = self._cond.wait_for(
+                lambda: self._finished >= generation or self._generation > generation,
+                timeout=timeout
+            )
+            if not done:
+                return RESULT_TIMEOUT
+            if self._failed == generation:
+                return RESULT_ERROR
+            if self._generation > generation:
+                return RESULT_SUPERSEDED
+            return RESULT_REACHED
+
+    def _relays_off(self):
+        self._gpio.output(self.pin_auf, self._gpio.HIGH)
+        self._gpio.output(self.pin_zu, self._gpio.HIGH)
+        self._relays_off_at = time.monotonic()
+
+    def _settle(self):
+        """Wartet nur so lange, bis seit der letzten Abschaltung RELAY_SETTLE_TIME vergangen ist"""
+        if self._relays_off_at is None:
+            return
+        remaining = RELAY_SETTLE_TIME - (time.monotonic() - self._relays_off_at)
+        if remaining > 0:
+            time.sleep(remaining)
+            RELAY_SETTLE_TOTAL.inc(remaining, gate=self.name)
+
+    def _start_position(self):
+        """Aktuelle Position inkl. Nachkommastellen der letzten Fahrt.
+
+        Wurde die Position von außen geändert (z.B. aus der DB wiederhergestellt),
+        gilt der gespeicherte Wert und der Rest verfällt.
+        """
+        position = self._get_position()
+        if self._exact_position is not None and round(self._exact_position) == position:
+            return self._exact_position
+        return float(position)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Warten bis ein Ziel vorliegt, das nicht bereits erreicht ist
+                while True:
+                    target = self._target
+                    generation = self._generation
+                    if target is not None and target != self._get_position():
+                        break
+                    self._target = None
+                    self._finished = generation
+                    self._cond.notify_all()
+                    self._cond.wait()
+
+            try:
+                self._drive(target, generation)
+            except Exception as e:
+                self._relays_off()
+                self._moving = False
+                logger.warning("⚠️  Motor %s: Fehler bei Fahrt: %s", self.name, e)
+                with self._cond:
+                    self._failed = generation
+                    self.last_error = e
+                    if self._generation == generation:
+                        self._target = None
+
+    def _drive(self, target, generation):
+        """Eine (unterbrechbare) Fahrt von der aktuellen Position zu `target`"""
+        current_position = self._start_position()
+        runtime_open, runtime_close = self._runtimes()
+
+        if target > current_position:
+            direction = "OPEN"
+            base_runtime = runtime_open
+            pin = self.pin_auf
+        else:
+            direction = "CLOSE"
+            base_runtime = runtime_close
+            pin = self.pin_zu
+
+        movement_percentage = abs(target - current_position)
+        runtime = base_runtime * movement_percentage / 100
+        # Relais läuft um (Abfall - Anzug) länger nach, als es angesteuert wird
+        energize_time = max(0.0, runtime - (self.drop_out - self.pull_in))
+
+        logger.info("→ Motor %s: %s von %.1f%% → %s%% (%.1f%%, %.2fs)",
+                    self.name, direction, current_position, target, movement_percentage, runtime)
+
+        # Alles aus (Pause nur, falls gerade erst umgeschaltet wurde – der
+        # Zeitpunkt der letzten echten Abschaltung bleibt dafür erhalten)
+        self._gpio.output(self.pin_auf, self._gpio.HIGH)
+        self._gpio.output(self.pin_zu, self._gpio.HIGH)
+        self._settle()
+
+        # Schalten
+        self._moving = True
+        self._direction = direction
+        self._gpio.output(pin, self._gpio.LOW)
+        RELAY_SWITCHES_TOTAL.inc(gate=self.name, direction=direction)
+        start = time.monotonic()
+        deadline = start + energize_time
+
+        # Warten bis zur Deadline – bricht sofort ab, wenn ein neuer Auftrag eintrifft;
+        # zwischendurch den aktuellen Stand melden (Status, Absturz während der Fahrt)
+        reported = int(round(current_position))
+        interrupted = False
+        while not interrupted:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._cond:
+                interrupted = self._cond.wait_for(
+                    lambda: self._generation != generation,
+                    timeout=min(remaining, POSITION_UPDATE_INTERVAL)
+                )
+            elapsed = time.monotonic() - start
+            if not interrupted and elapsed < energize_time:
+                # Der Motor läuft erst nach der Anzugszeit
+                position = int(round(self._moved(direction, current_position, base_runtime,
+                                                 movement_percentage, elapsed - self.pull_in)))
+                if position != reported:
+                    reported = position
+                    self._set_position(position)
+
+        # Stoppen
+        self._relays_off()
+        energized = self._relays_off_at - start
+        self._moving = False
+        self._direction = None
+        MOTOR_RUNTIME_TOTAL.inc(energized, gate=self.name, direction=direction)
+        MOTOR_MOVES_TOTAL.inc(gate=self.name, direction=direction,
+                              result="interrupted" if interrupted else "completed")
+
+        # Position aus der tatsächlich gefahrenen Zeit (inkl. Relais-Verzögerung)
+        exact = self._moved(direction, current_position, base_runtime, movement_percentage,
+                            energized + self.drop_out - self.pull_in)
+
+        if interrupted:
+            logger.info("⏹ Motor %s: unterbrochen nach %.2fs bei ~%.1f%%", self.name, energized, exact)
+        elif target in (0, 100):
+            # Endlage: Tor steht am Anschlag, Rest verwerfen
+            exact = float(target)
+        # sonst: Zeitabweichung (ms-Bereich) bleibt als Rest in der exakten Position
+
+        self._exact_position = exact
+        self._set_position(int(round(exact)))
+
+    @staticmethod
+    def _moved(direction, start_position, base_runtime, movement_percentage, moved_time):
+        """Exakte Position nach `moved_time` Sekunden Motorlauf ab `start_position`"""
+        moved_time = max(0.0, moved_time)
+        moved = 100 * moved_time / base_runtime if base_runtime else movement_percentage
+        if direction == "OPEN":
+            return min(100.0, start_position + moved)
+        return max(0.0, start_position - moved)
+
+
+class MoveJob:
+    """Ein Fahrauftrag für ein Tor (Zielposition + Herkunft)"""
+
+    def __init__(self, target, source):
+        self.target = target
+        self.source = source
+        self.generation = None  # Auftragsnummer beim MotorController, sobald gestartet
+        self.result = None
+        self.error = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def queued_time(self):
+        """Sekunden in der Warteschlange bis zum Start"""
+        return (self.started or self.finished or self.submitted) - self.submitted
+
+    @property
+    def run_time(self):
+        """Sekunden vom Start bis zum Ende der Fahrt"""
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def resolve(self, result, error=None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.result = result
+            self.error = error
+            self.finished = time.monotonic()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """Ruft `callback(job)` auf, sobald der Auftrag erledigt ist (ggf. sofort)"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        """Wartet auf das Ergebnis (RESULT_*)"""
+        if not self._done.wait(timeout):
+            return RESULT_TIMEOUT
+        return self.result
+
+
+class GateScheduler:
+    """Auftrags-Warteschlange für genau ein Tor (eigener Worker-Thread + Lock).
+
+    Regeln beim Einreihen:
+    - MANUELL: verwirft alle wartenden Aufträge und lenkt eine laufende Fahrt
+      sofort auf das neue Ziel um.
+    - AUTO: wird verworfen, solange ein manueller Auftrag läuft oder wartet;
+      ersetzt einen bereits wartenden AUTO-Auftrag (nur das jüngste Ziel zählt)
+      und wird hinter einer laufenden AUTO-Fahrt eingereiht.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.name = controller.name
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._current = None
+
+        self._thread = threading.Thread(target=self._run, name=f"Gate-{self.name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        """Anzahl laufender + wartender Aufträge"""
+        with self._cond:
+            return len(self._queue) + (1 if self._current else 0)
+
+    @property
+    def has_manual_job(self):
+        with self._cond:
+            return self._has_manual_job()
+
+    def _has_manual_job(self):
+        if self._current and self._current.source == SOURCE_MANUAL:
+            return True
+        return any(job.source == SOURCE_MANUAL for job in self._queue)
+
+    def _drop_queued(self, predicate):
+        kept = deque()
+        for job in self._queue:
+            if predicate(job):
+                job.resolve(RESULT_SUPERSEDED)
+                JOBS_TOTAL.inc(gate=self.name, source=job.source, result=RESULT_SUPERSEDED)
+            else:
+                kept.append(job)
+        self._queue = kept
+
+    def submit(self, target, source=SOURCE_MANUAL):
+        """Reiht einen Fahrauftrag ein und liefert den `MoveJob`"""
+        job = MoveJob(target, source)
+
+        with self._cond:
+            # Redundant: gleiches Ziel wie der laufende Auftrag, nichts wartet
+            if self._current and not self._queue and self._current.target == target:
+                if source == SOURCE_AUTO or self._current.source == SOURCE_MANUAL:
+                    return self._current
+
+            if source == SOURCE_MANUAL:
+                self._drop_queued(lambda queued: True)
+                if self._current:
+                    # Laufende Fahrt direkt umlenken; der Worker übernimmt den Auftrag
+                    job.generation = self.controller.move_to(target, wait=False)
+                    job.started = time.monotonic()
+            else:
+                if self._has_manual_job():
+                    job.resolve(RESULT_SKIPPED)
+                    JOBS_TOTAL.inc(gate=self.name, source=source, result=RESULT_SKIPPED)
+                    return job
+                self._drop_queued(lambda queued: queued.source == SOURCE_AUTO)
+
+            self._queue.append(job)
+            self._cond.notify_all()
+
+        return job
+
+    def stop(self):
+        """Verwirft alle wartenden Aufträge und stoppt den Motor sofort"""
+        with self._cond:
+            self._drop_queued(lambda queued: True)
+            self.controller.stop()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                self._current = job
+                if job.generation is None:
+                    job.generation = self.controller.move_to(job.target, wait=False)
+                    job.started = time.monotonic()
+
+            error = None
+            try:
+                result = self.controller.wait(job.generation)
+                if result == RESULT_ERROR:
+                    error = self.controller.last_error
+            except Exception as e:
+                logger.warning("⚠️  Tor %s: Fehler im Auftrag: %s", self.name, e)
+                result, error = RESULT_ERROR, e
+
+            with self._cond:
+                self._current = None
+            job.resolve(result, error)
+            JOB_WAIT_SECONDS.observe(job.queued_time, source=job.source)
+            JOBS_TOTAL.inc(gate=self.name, source=job.source, result=result)
+
+
+class PlanFuture(Future):
+    """`Future` eines Fahrplans; `partial()` liefert die bereits fertigen Tore"""
+
+    def __init__(self, gates):
+        super().__init__()
+        self._results = {}
+        self._pending = set(gates)
+        self._lock = threading.Lock()
+
+    def finish(self, name, entry):
+        with self._lock:
+            self._results[name] = entry
+            self._pending.discard(name)
+            done = not self._pending
+        if done:
+            self.set_result(dict(self._results))
+
+    def partial(self):
+        """Ergebnisse der bereits fertigen Tore (Kopie)"""
+        with self._lock:
+            return dict(self._results)
+
+
+class ActuationExecutor:
+    """Fährt mehrere Tore gleichzeitig über die dauerhaft laufenden Scheduler.
+
+    `submit({tor: ziel}, source)` liefert ein `PlanFuture`, dessen Ergebnis ein
+    Dict pro Tor ist: `{'result': RESULT_*, 'error': str|None,
+    'queued': s, 'duration': s}`. Tore, die bereits am Ziel stehen und keinen
+    Auftrag haben, werden sofort als erreicht gemeldet.
+    """
+
+    def __init__(self, schedulers, get_position):
+        self.schedulers = schedulers
+        self._get_position = get_position  # callable(tor) → Position (0-100)
+
+    def submit(self, plan, source=SOURCE_MANUAL):
+        future = PlanFuture(plan)
+        finish = future.finish
+
+        if not plan:
+            future.set_result({})
+            return future
+
+        for name, target in plan.items():
+            scheduler = self.schedulers.get(name)
+            if scheduler is None:
+                finish(name, {'result': RESULT_ERROR, 'error': "Unbekanntes Tor",
+                              'queued': 0.0, 'duration': 0.0})
+                continue
+
+            if self._get_position(name) == target and not scheduler.queue_depth:
+                logger.info("→ Motor %s: Bereits bei %s%%, überspringe", name, target)
+                finish(name, {'result': RESULT_REACHED, 'error': None,
+                              'queued': 0.0, 'duration': 0.0})
+                continue
+
+            job = scheduler.submit(target, source)
+            job.add_done_callback(lambda job, name=name: finish(name, {
+                'result': job.result,
+                'error': str(job.error) if job.error else None,
+                'queued': job.queued_time,
+                'duration': job.run_time
+            }))
+
+        return future
+
+
+def plan_errors(results):
+    """Fehlermeldungen eines Fahrplan-Ergebnisses als Liste (`'<tor>: <fehler>'`)"""
+    errors = []
+    for name, entry in results.items():
+        if entry['result'] == RESULT_ERROR:
+            errors.append(f"{name}: {entry['error'] or 'Fehler'}")
+        elif entry['result'] == RESULT_TIMEOUT:
+            errors.append(f"{name}: Timeout")
+    return errors
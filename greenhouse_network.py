@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Netzwerkmodus des Pi: Haus-WLAN oder eigener Hotspot (Schalter 'Zusatz').
+
+Der Wechsel über `nmcli` dauert mehrere Sekunden und lief bisher direkt im
+GPIO-Abgleich der Regelschleife. Der `NetworkModeManager` führt ihn in einem
+eigenen Thread aus:
+
+- `request()` blockiert nie: Es merkt den gewünschten Modus vor und liefert
+  erst `True`, wenn er aktiv und geprüft ist. Der `SwitchManager` lässt den
+  Schalter bis dahin ausstehend; nach dem Wechsel ruft der Thread die
+  `listeners` auf (der Client wendet den Schalter dann sofort an).
+- Mehrere Anfragen während eines Wechsels werden zusammengefasst – umgeschaltet
+  wird nur auf den zuletzt gewünschten Modus.
+- Jeder `nmcli`-Aufruf hat ein Timeout (`NMCLI_TIMEOUT`). Danach wird über
+  `nmcli connection show --active` geprüft, ob die Zielverbindung wirklich
+  aktiv ist. Ist sie es schon vor dem Wechsel, wird nichts geschaltet.
+- Während des Wechsels ist die API-I/O pausiert (`greenhouse_http.pause()`),
+  damit Sync, Long-Poll und Log-Versand nicht in Timeouts laufen und keine
+  Circuit Breaker öffnen. Die Pause endet spätestens nach `PAUSE_LIMIT`.
+- Nach einem Fehler wird frühestens nach `RETRY_DELAY` erneut versucht.
+
+Verbindungen aus `.env`: `WIFI_SSID_HOME` (Name des Haus-WLANs),
+`WIFI_UUID` (UUID des Haus-WLANs für den Rückweg) und `WIFI_SSID_HOTSPOT`
+(Name der Hotspot-Verbindung).
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+import greenhouse_http
+import greenhouse_log
+import greenhouse_metrics
+
+MODE_HOME = "home"
+MODE_HOTSPOT = "hotspot"
+
+STATE_IDLE = "idle"
+STATE_SWITCHING = "switching"
+STATE_FAILED = "failed"
+
+NMCLI_TIMEOUT = 30      # Sekunden pro nmcli-Aufruf
+SETTLE_TIME = 1         # Sekunden zwischen Trennen und Verbinden
+# Sekunden, Sicherheitsgrenze der API-Pause: schlimmster Fall Hotspot =
+# Trennen + Warten + Verbinden + Prüfung, jeweils bis zum Timeout, plus Reserve
+PAUSE_LIMIT = 3 * NMCLI_TIMEOUT + SETTLE_TIME + 15
+RETRY_DELAY = 60        # Sekunden nach einem fehlgeschlagenen Wechsel
+
+NETWORK_SWITCHES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_network_switches_total", "Wechsel des Netzwerkmodus (ok/failed)")
+NETWORK_SWITCH_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_network_switch_duration_seconds", "Dauer eines Netzwerkwechsels inkl. Prüfung")
+NETWORK_MODE = greenhouse_metrics.gauge(
+    "greenhouse_network_hotspot", "1 wenn der Hotspot aktiv ist, 0 im Haus-WLAN")
+API_PAUSED = greenhouse_metrics.gauge(
+    "greenhouse_network_api_paused", "1 solange die API-I/O für einen Netzwerkwechsel pausiert ist")
+
+
+class NetworkSwitchError(Exception):
+    """Wechsel des Netzwerkmodus fehlgeschlagen"""
+
+
+_log = greenhouse_log.log_to("network")
+
+
+class NetworkModeManager:
+    """Wechselt asynchron zwischen Haus-WLAN und Hotspot, mit Prüfung und API-Pause"""
+
+    def __init__(self, log=_log):
+        self.log = log
+        self.mode = None            # zuletzt geprüfter Modus (None = unbekannt)
+        self.target = None          # zuletzt angeforderter Modus
+        self.state = STATE_IDLE
+        self.last_error = None
+        self.changed_at = None      # time.time() des letzten erfolgreichen Wechsels
+        self.listeners = []         # listener(mode) nach einem erfolgreichen Wechsel
+        self._retry_at = 0.0        # monotonic
+        self._running = True
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def request(self, mode):
+        """Fordert `mode` an; liefert True, sobald er aktiv und geprüft ist (blockiert nie)"""
+        with self._cond:
+            if self.mode == mode and self.state == STATE_IDLE:
+                return True
+            if self.state == STATE_FAILED and self.target == mode and time.monotonic() < self._retry_at:
+                return False
+            if self.state != STATE_SWITCHING or self.target != mode:
+                self.target = mode
+                self.state = STATE_SWITCHING
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="NetworkMode", daemon=True)
+                    self._thread.start()
+                self._cond.notify_all()
+            return False
+
+    def shutdown(self):
+        """Beendet den Thread (ein laufender nmcli-Aufruf endet spätestens mit seinem Timeout)"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def describe(self):
+        """Modus, Zustand und letzter Fehler für den Status-Report"""
+        with self._cond:
+            return {
+                'mode': self.mode,
+                'target': self.target,
+                'state': self.state,
+                'error': self.last_error,
+                'changed_at': self.changed_at
+            }
+
+    # --- Wechsel-Thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self.state != STATE_SWITCHING:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                target = self.target
+
+            start = time.monotonic()
+            try:
+                self._switch(target)
+                error = None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            elapsed = time.monotonic() - start
+
+            with self._cond:
+                if error is None:
+                    self.mode = target
+                    self.last_error = None
+                    self.changed_at = time.time()
+                    NETWORK_MODE.set(1 if target == MODE_HOTSPOT else 0)
+                else:
+                    # Haus-WLAN ist evtl. schon getrennt → beim nächsten Wunsch neu prüfen
+                    self.mode = None
+                    self.last_error = error
+                    self._retry_at = time.monotonic() + RETRY_DELAY
+                # Während des Wechsels anders entschieden → gleich weiter zum neuen Ziel
+                done = self.target == target
+                if done:
+                    self.state = STATE_IDLE if error is None else STATE_FAILED
+
+            NETWORK_SWITCHES_TOTAL.inc(mode=target, result="ok" if error is None else "failed")
+            NETWORK_SWITCH_SECONDS.observe(elapsed, mode=target)
+            if error is not None:
+                self.log('ERROR', "❌ Fehler beim Wechsel (%s): %s", target, error, ship=True)
+            elif done:
+                for listener in self.listeners:
+                    try:
+                        listener(target)
+                    except Exception as e:
+                        self.log('ERROR', "Netzwerk-Listener: %s", e)
+
+    def _switch(self, target):
+        """Führt den Wechsel aus und prüft ihn; wirft `NetworkSwitchError` bei Fehlern"""
+        if self._active() == target:
+            self.log('INFO', "🌐 Netzwerkmodus '%s' ist bereits aktiv", target)
+            return
+
+        greenhouse_http.pause(f"Netzwerkwechsel → {target}", PAUSE_LIMIT)
+        API_PAUSED.set(1)
+        try:
+            if target == MODE_HOTSPOT:
+                self.log('INFO', "📡 Starte HOTSPOT", ship=True)
+
+                # 1. Haus-WLAN sicherheitshalber trennen (falls noch an)
+                home_wlan = os.getenv("WIFI_SSID_HOME")
+                if home_wlan:
+                    self._nmcli('connection', 'down', home_wlan, check=False)
+                time.sleep(SETTLE_TIME)
+
+                # 2. Hotspot starten
+                hotspot_ssid = os.getenv("WIFI_SSID_HOTSPOT")
+                if not hotspot_ssid:
+                    raise NetworkSwitchError("WIFI_SSID_HOTSPOT nicht in .env gefunden!")
+                self._nmcli('connection', 'up', hotspot_ssid)
+            else:
+                self.log('INFO', "🏠 Verbinde mit HAUS-WLAN", ship=True)
+
+                # 3. Zurück zum Haus-WLAN über die UUID
+                wifi_uuid = os.getenv("WIFI_UUID")
+                if not wifi_uuid:
+                    raise NetworkSwitchError("WIFI_UUID nicht in .env gefunden!")
+                self._nmcli('connection', 'up', 'uuid', wifi_uuid)
+
+            # 4. Prüfen, ob die Zielverbindung wirklich aktiv ist
+            if self._active() != target:
+                raise NetworkSwitchError("Zielverbindung nach dem Wechsel nicht aktiv")
+        finally:
+            greenhouse_http.resume()
+            API_PAUSED.set(0)
+
+        self.log('INFO', "✅ Hotspot aktiv" if target == MODE_HOTSPOT else "✅ Erfolgreich mit FritzBox verbunden")
+
+    def _active(self):
+        """Aktiver Modus laut `nmcli connection show --active` (None = keiner erkennbar)"""
+        names, uuids = set(), set()
+        for line in self._nmcli('-t', '-f', 'NAME,UUID', 'connection', 'show', '--active').splitlines():
+            name, _, uuid = line.rpartition(':')
+            names.add(name.replace('\\:', ':'))
+            uuids.add(uuid)
+        hotspot_ssid = os.getenv("WIFI_SSID_HOTSPOT")
+        if hotspot_ssid and hotspot_ssid in names:
+            return MODE_HOTSPOT
+        if os.getenv("WIFI_UUID") in uuids:
+            return MODE_HOME
+        return None
+
+    def _nmcli(self, *args, check=True):
+        """`sudo nmcli …` mit Timeout; liefert stdout"""
+        try:
+            result = subprocess.run(['sudo', 'nmcli', *args], capture_output=True, text=True, timeout=NMCLI_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise NetworkSwitchError(f"nmcli {' '.join(args)}: keine Antwort nach {NMCLI_TIMEOUT}s")
+        if check and result.returncode != 0:
+            raise NetworkSwitchError(result.stderr.strip() or f"nmcli {' '.join(args)}: Exit-Code {result.returncode}")
+        return result.stdout
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Write-Behind-Speicherung der Tor-Positionen.
+
+Die Motor-Threads melden neue Positionen nur noch an den `PositionWriter`
+und kehren sofort zurück – sie warten weder auf das Netz noch auf die SD-Karte.
+Der Writer fasst Änderungen pro Tor zusammen (der letzte Wert gewinnt), schickt
+sie gebündelt per `POST /api/gate-status` an die API und wiederholt
+fehlgeschlagene Übertragungen mit wachsender Pause. Während eines gewollten
+Netzwerkwechsels (`greenhouse_http.pause()`) wird ohne Backoff bis zum Ende
+der Pause gewartet.
+
+Einzige lokale Quelle der Positionen ist der `StateStore` (SQLite, siehe
+`greenhouse_state.py`): Der Writer-Thread schreibt alle Positionen und die
+Namen der noch nicht übertragenen Tore in einer Transaktion
+(`gate_positions`, `gate_positions:unsent`). Nach einem Neustart gelten diese
+Werte und die offenen Tore werden nachgesendet; die Datenbank füllt nur Tore
+ohne lokalen Stand (`seed()`).
+"""
+
+import threading
+import time
+
+import greenhouse_http
+import greenhouse_log
+
+logger = greenhouse_log.get_logger("persist")
+
+# Wartezeit nach der ersten Änderung, damit parallel fahrende Tore in einem Request landen
+FLUSH_DELAY = 1.0
+# Pause nach fehlgeschlagener Übertragung (verdoppelt sich bis RETRY_MAX)
+RETRY_MIN = 5
+RETRY_MAX = 300
+# Prüfintervall, solange die API-I/O pausiert ist (Netzwerkwechsel)
+PAUSE_POLL = 1.0
+
+# Schlüssel im lokalen Zustand
+POSITIONS_KEY = 'gate_positions'
+UNSENT_KEY = 'gate_positions:unsent'
+
+
+class PositionWriter:
+    """Sammelt Positions-Änderungen, speichert sie lokal und überträgt sie im Hintergrund"""
+
+    def __init__(self, api_url, api_key, store):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.store = store
+
+        self._cond = threading.Condition()
+        self._persist_lock = threading.Lock()  # Schreibreihenfolge Writer-Thread / flush()
+        self._positions = {name: int(position) for name, position in store.get(POSITIONS_KEY, {}).items()}
+        self._pending = {name: self._positions[name]          # {tor: position}, noch nicht übertragen
+                         for name in store.get(UNSENT_KEY, []) if name in self._positions}
+        self._dirty = False                    # Änderungen, die noch nicht lokal gespeichert sind
+        self._batch_supported = True           # False bei älterer API ohne Sammel-Update
+        self._flush_requested = False
+        self.sent = 0
+        self.failures = 0
+
+        if self._pending:
+            logger.info("📒 %s ungesendete Tor-Position(en) aus lokalem Zustand: %s", len(self._pending), self._pending)
+
+        self._thread = threading.Thread(target=self._run, name="PositionWriter", daemon=True)
+        self._thread.start()
+
+    def positions(self):
+        """Kopie aller lokal bekannten Positionen"""
+        with self._cond:
+            return dict(self._positions)
+
+    def pending(self):
+        """Kopie der noch nicht übertragenen Positionen"""
+        with self._cond:
+            return dict(self._pending)
+
+    def update(self, motor_name, position):
+        """Merkt eine neue Position vor (kehrt sofort zurück, Speichern und Senden im Writer-Thread)"""
+        with self._cond:
+            self._positions[motor_name] = position
+            self._pending[motor_name] = position
+            self._dirty = True
+            self._cond.notify_all()
+
+    def seed(self, positions):
+        """Übernimmt Positionen aus der Datenbank für Tore ohne lokalen Stand; liefert die übernommenen"""
+        with self._cond:
+            loaded = {name: int(position) for name, position in positions.items() if name not in self._positions}
+            if loaded:
+                self._positions.update(loaded)
+                self._dirty = True
+                self._cond.notify_all()
+        return loaded
+
+    def flush(self, timeout=10):
+        """Wartet, bis alles übertragen ist (z.B. beim Beenden); True wenn leer.
+
+        Der lokale Stand ist danach in jedem Fall gespeichert.
+        """
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(lambda: not self._pending and not self._dirty, timeout=timeout)
+        self._persist()
+        return done and not self.pending()
+
+    # --- Lokaler Zustand ---
+
+    def _persist(self):
+        """Schreibt Positionen und offene Tore in einer Transaktion in den lokalen Zustand"""
+        with self._persist_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                positions = dict(self._positions)
+                unsent = sorted(self._pending)
+                self._dirty = False
+            self.store.set_many({POSITIONS_KEY: positions, UNSENT_KEY: unsent})
+            with self._cond:
+                self._cond.notify_all()
+
+    def _wait(self, done, timeout):
+        """Wartet bis `done()` (Lock gehalten) oder `timeout`; neue Positionen werden derweil gespeichert"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                remaining = deadline - time.monotonic()
+                if done() or remaining <= 0:
+                    return
+                self._cond.wait_for(lambda: done() or self._dirty, timeout=remaining)
+            self._persist()
+
+    # --- Übertragung ---
+
+    def _post(self, payload):
+        response = greenhouse_http.request(
+            'POST',
+            f"{self.api_url}/gate-status",
+            params={'api_key': self.api_key},
+            headers={'X-API-Key': self.api_key},
+            json=payload,
+            timeout=10
+        )
+        return response.status_code
+
+    def _send(self, batch):
+        """Überträgt einen Stapel; liefert True bei Erfolg"""
+        if self._batch_supported:
+            status = self._post({'positions': batch})
+            if status == 200:
+                return True
+            if status != 400:
+                return False
+            # Ältere API kennt nur Einzel-Updates
+            self._batch_supported = False
+            logger.info("ℹ️  API ohne Sammel-Update für Tor-Positionen → sende einzeln")
+
+        for name, position in batch.items():
+            # 404 = Tor unbekannt: nicht wiederholen
+            if self._post({'motor_name': name, 'position': position}) not in (200, 404):
+                return False
+        return True
+
+    def _run(self):
+        retry_delay = RETRY_MIN
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._dirty)
+            self._persist()
+            if not self.pending():
+                continue
+            self._wait(lambda: False, FLUSH_DELAY)
+
+            with self._cond:
+                batch = dict(self._pending)
+
+            try:
+                ok = self._send(batch)
+                error = "API-Fehler"
+            except Exception as e:
+                ok = False
+                error = e
+
+            if not ok and greenhouse_http.paused():
+                # Gewollter Netzwerkwechsel: kein Fehler, nach der Pause sofort erneut senden
+                while greenhouse_http.paused():
+                    self._wait(lambda: False, PAUSE_POLL)
+                continue
+
+            with self._cond:
+                if ok:
+                    # Nur entfernen, was sich während der Übertragung nicht erneut geändert hat
+                    for name, position in batch.items():
+                        if self._pending.get(name) == position:
+                            del self._pending[name]
+                    self._dirty = True
+                    self.sent += len(batch)
+                    if not self._pending:
+                        self._flush_requested = False
+                    self._cond.notify_all()
+                else:
+                    self.failures += 1
+
+            if ok:
+                retry_delay = RETRY_MIN
+                continue
+
+            logger.warning("⚠️  %s Tor-Position(en) nicht gespeichert (%s), neuer Versuch in %ss",
+                           len(batch), error, retry_delay)
+            # flush() beim Beenden verkürzt die Pause
+            self._wait(lambda: self._flush_requested, retry_delay)
+            with self._cond:
+                self._flush_requested = False
+            retry_delay = min(retry_delay * 2, RETRY_MAX)
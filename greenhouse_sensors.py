@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Mehrere DS18B20-Sensoren mit Zonen-Zuordnung und gleichzeitiger Messung.
+
+Die Zuordnung Sensor → Zone (z.B. ein Fühler pro Gewächshaus GH1–GH3 plus
+Außen) kommt aus `SENSOR_ZONES`, optional mit Auflösung pro Sensor:
+
+    SENSOR_ZONES="GH1=28-0316a2795aff@11,GH2=28-0316a27c1bff,GH3=28-0316a2791eff,outdoor=28-0416a1b3f6ff@10"
+
+Eine Messrunde startet – sofern der Kernel es unterstützt (`therm_bulk_read`
+des w1-Busmasters) – die Wandlung ALLER Sensoren gleichzeitig und liest danach
+nur noch die fertigen Werte. Eine komplette Runde dauert damit eine
+Wandlungszeit (bei 12 Bit 750ms) statt 750ms pro Sensor. Ohne Bulk-Unterstützung
+werden die Sensoren parallel über einen Thread-Pool gelesen.
+
+Die Auflösung bestimmt die Wandlungszeit (9 Bit ≈ 94ms/0,5°C … 12 Bit ≈ 750ms/0,0625°C).
+Für die Automatik reichen meist 10–11 Bit.
+
+Das Modul importiert `w1thermsensor` nicht selbst – die Sensor-Objekte
+werden von `greenhouse_web.py` übergeben.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import greenhouse_log
+
+logger = greenhouse_log.get_logger("sensors")
+
+W1_DEVICES = "/sys/bus/w1/devices"
+
+# Wandlungszeit (Sekunden) je Auflösung (Bit) laut Datenblatt
+CONVERSION_TIME = {9: 0.094, 10: 0.188, 11: 0.375, 12: 0.75}
+DEFAULT_RESOLUTION = 12
+
+# Zonen, deren Mittelwert die "Innentemperatur" ergibt
+GREENHOUSE_ZONES = ("GH1", "GH2", "GH3")
+
+
+def parse_zone_map(spec):
+    """`"GH1=28-abc@11,outdoor=28-def"` → `{'GH1': ('28-abc', 11), 'outdoor': ('28-def', None)}`"""
+    zones = {}
+    for entry in (spec or "").split(','):
+        entry = entry.strip()
+        if not entry or '=' not in entry:
+            continue
+        zone, sensor = (part.strip() for part in entry.split('=', 1))
+        resolution = None
+        if '@' in sensor:
+            sensor, bits = sensor.split('@', 1)
+            try:
+                resolution = int(bits)
+            except ValueError:
+                logger.warning("⚠️  Ungültige Auflösung für %s: %s", zone, bits)
+            if resolution not in CONVERSION_TIME:
+                resolution = None
+        zones[zone] = (sensor.strip(), resolution)
+    return zones
+
+
+def device_dir(sensor):
+    """sysfs-Verzeichnis eines W1ThermSensor (z.B. `/sys/bus/w1/devices/28-0316a2795aff`)"""
+    path = getattr(sensor, 'sensorpath', None)
+    if path:
+        return os.path.dirname(str(path))
+    prefix = getattr(sensor, 'slave_prefix', '28-')
+    return os.path.join(W1_DEVICES, f"{prefix}{sensor.id}")
+
+
+def find_bulk_read_path():
+    """Pfad zu `therm_bulk_read` (Kernel ≥ 5.10, w1_therm) oder None"""
+    for path in glob.glob(os.path.join(W1_DEVICES, "w1_bus_master*", "therm_bulk_read")):
+        if os.access(path, os.W_OK):
+            return path
+    return None
+
+
+class ZoneSensorReader:
+    """Liest alle zugeordneten Sensoren in einer Runde.
+
+    `sensors` ist `{zone: W1ThermSensor}`, `resolutions` optional
+    `{zone: bit}`. `read_all()` liefert `{zone: float | Exception}`; sind
+    Gewächshaus-Zonen vorhanden und keine eigene `indoor`-Zone, wird zusätzlich
+    `indoor` als Mittelwert der erfolgreich gemessenen Gewächshaus-Zonen geliefert.
+    """
+
+    def __init__(self, sensors, resolutions=None, bulk_read_path=None):
+        self.sensors = sensors
+        self.bulk_read_path = bulk_read_path if bulk_read_path is not None else find_bulk_read_path()
+        self.conversion_time = {}
+        self.last_sweep_time = None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(sensors)), thread_name_prefix="W1")
+
+        for zone, sensor in sensors.items():
+            bits = (resolutions or {}).get(zone)
+            if bits:
+                try:
+                    sensor.set_resolution(bits)
+                except Exception as e:
+                    # Schreiben der Auflösung braucht Root-Rechte
+                    logger.warning("⚠️  Auflösung %s Bit für %s nicht gesetzt: %s", bits, zone, e)
+            try:
+                bits = sensor.get_resolution()
+            except Exception:
+                bits = bits or DEFAULT_RESOLUTION
+            self.conversion_time[zone] = CONVERSION_TIME.get(bits, CONVERSION_TIME[DEFAULT_RESOLUTION])
+
+        mode = "Bulk-Wandlung" if self.bulk_read_path else "parallel (Thread-Pool)"
+        logger.info("✓ Sensor-Zonen: %s [%s]", ', '.join(f'{z}={s.id}' for z, s in sensors.items()) or 'keine', mode)
+
+    @property
+    def roles(self):
+        roles = list(self.sensors)
+        if self._derives_indoor():
+            roles.append('indoor')
+        return roles
+
+    def _derives_indoor(self):
+        return 'indoor' not in self.sensors and any(zone in self.sensors for zone in GREENHOUSE_ZONES)
+
+    def read_all(self):
+        start = time.monotonic()
+        results = None
+        if self.bulk_read_path:
+            try:
+                results = self._read_bulk()
+            except OSError as e:
+                logger.warning("⚠️  Bulk-Wandlung fehlgeschlagen (%s), lese parallel", e)
+                self.bulk_read_path = None
+        if results is None:
+            results = self._read_parallel()
+
+        if self._derives_indoor():
+            values = [results[zone] for zone in GREENHOUSE_ZONES
+                      if zone in results and not isinstance(results[zone], Exception)]
+            results['indoor'] = (round(sum(values) / len(values), 1) if values
+                                 else RuntimeError("Keine Gewächshaus-Zone gemessen"))
+
+        self.last_sweep_time = time.monotonic() - start
+        return results
+
+    def _read_bulk(self):
+        """Alle Sensoren gleichzeitig wandeln, dann nur noch die Ergebnisse lesen"""
+        with open(self.bulk_read_path, 'w') as f:
+            f.write("trigger\n")
+
+        # Warten bis alle Wandlungen fertig sind (max. längste Wandlungszeit + Reserve)
+        deadline = time.monotonic() + max(self.conversion_time.values(), default=0.75) + 0.25
+        while time.monotonic() < deadline:
+            with open(self.bulk_read_path) as f:
+                if f.read().strip() != "-1":  # -1 = Wandlung läuft noch
+                    break
+            time.sleep(0.02)
+
+        results = {}
+        for zone, sensor in self.sensors.items():
+            try:
+                with open(os.path.join(device_dir(sensor), "temperature")) as f:
+                    results[zone] = round(int(f.read().strip()) / 1000, 1)
+            except Exception as e:
+                results[zone] = e
+        return results
+
+    def _read_parallel(self):
+        futures = {zone: self._pool.submit(sensor.get_temperature) for zone, sensor in self.sensors.items()}
+        results = {}
+        for zone, future in futures.items():
+            try:
+                results[zone] = round(future.result(timeout=5), 1)
+            except Exception as e:
+                results[zone] = e
+        return results
@@ -0,0 +1,731 @@
+#!/usr/bin/env python3
+"""
+Offline-Simulation der Regelschleife (ohne Raspberry Pi, ohne API).
+
+Ersetzt die Hardware und die Außenwelt durch Attrappen und lässt den echten
+Code (`GreenhouseSystem` aus `greenhouse_web.py` und die serielle Hauptschleife
+`run_cycle()` aus `greenhouse_api_client.py`) gegen sie laufen:
+
+- `VirtualClock`: virtuelle Zeit für `time.time/monotonic/sleep` und
+  `datetime.now` – gewartet wird nicht, die Uhr springt einfach weiter.
+- `FakeGPIO` / `SimSensor`: Ersatz für `RPi.GPIO` und `w1thermsensor`.
+- `SimMotor`: Tor-Motor mit gleicher Schnittstelle wie `MotorController`;
+  ein Auftrag ist sofort erledigt, das Tor selbst fährt im Modell aber mit
+  der echten Laufzeit (die Schleife wartet wie auf dem Pi, bis es steht).
+- `GreenhouseModel`: einfaches Wärmemodell pro Gewächshaus (Sonne,
+  Wärmeverlust, Lüftung über die Toröffnung, Außentemperatur nach Jahres-
+  und Tagesgang).
+- `SimAPI`: Stand-in für `api/index.php` im selben Prozess (Sync, Befehle,
+  Status, Konfiguration inkl. ETag), zählt Requests und übertragene Bytes.
+
+Damit läuft eine ganze Saison in Sekunden bis wenigen Minuten, und Änderungen
+an Regler oder Polling lassen sich vor dem Deployment vergleichen
+(Motorlaufzeit, Schaltvorgänge, Überschwingen, API-Kosten).
+
+Verwendung:
+    python greenhouse_sim.py --days 30 --start 2026-05-01 --controller pi
+    python greenhouse_sim.py --days 7 --json sim_result.json
+
+Die Module werden beim Start der Simulation mit den Attrappen importiert;
+pro Prozess ist daher nur eine Simulation möglich.
+"""
+
+import argparse
+import contextlib
+import datetime as _datetime
+import functools
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+from urllib.parse import urlsplit
+
+# Außenbedingungen / Wärmemodell (pro m² Grundfläche)
+SIM_LATITUDE = 47.866
+SIM_LONGITUDE = 7.615
+HEAT_CAPACITY = 60000.0     # J/(m²·K) – Luft, Konstruktion, oberste Bodenschicht
+HEAT_LOSS = 6.0             # W/(m²·K) bei geschlossenen Toren
+VENT_LOSS = 40.0            # W/(m²·K) zusätzlich bei vollständig offenen Toren
+SOLAR_GAIN = 0.6            # Anteil der Einstrahlung, der als Wärme ankommt
+SOLAR_PEAK = 900.0          # W/m² bei senkrechter Sonne, klarem Himmel
+ZONE_GAIN = {"GH1": 1.0, "GH2": 1.1, "GH3": 0.9}  # Unterschiede zwischen den Häusern
+SENSOR_NOISE = 0.05         # °C Standardabweichung
+MODEL_STEP = 10.0           # Sekunden pro Integrationsschritt
+
+SIM_SENSOR_IDS = {"GH1": "00000000sim1", "GH2": "00000000sim2", "GH3": "00000000sim3", "outdoor": "00000000sim0"}
+
+
+def gate_names(count=6):
+    """Tor-Namen nach dem Muster der echten Anlage (GH1_VORNE, GH1_HINTEN, GH2_VORNE, …)"""
+    return [f"GH{i // 2 + 1}_{'VORNE' if i % 2 == 0 else 'HINTEN'}" for i in range(count)]
+
+
+def switch_names(count=3):
+    """Schalter-Namen (Bewässerung 1–3, danach durchnummeriert; nie "Zusatz"/Hotspot)"""
+    return [f"Bewässerung {i + 1}" if i < 3 else f"Schalter {i + 1}" for i in range(count)]
+
+
+class VirtualClock:
+    """Virtuelle Zeit; `sleep()` im Simulations-Thread springt vor statt zu warten"""
+
+    def __init__(self, start):
+        self._time = start
+        self._monotonic = 1000.0
+        self._owner = threading.get_ident()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._real_sleep = time.sleep
+
+    def time(self):
+        return self._time
+
+    def monotonic(self):
+        return self._monotonic
+
+    def on_advance(self, callback):
+        """`callback(start, seconds)` nach jedem Vorrücken (z.B. Wärmemodell)"""
+        self._listeners.append(callback)
+
+    def advance(self, seconds):
+        if seconds <= 0:
+            return
+        with self._lock:
+            start = self._time
+            self._time += seconds
+            self._monotonic += seconds
+        for callback in self._listeners:
+            callback(start, seconds)
+
+    def sleep(self, seconds):
+        if threading.get_ident() == self._owner:
+            self.advance(seconds)
+        else:
+            # Hintergrund-Threads (z.B. PositionWriter) dürfen die Uhr nicht verstellen
+            self._real_sleep(min(max(seconds, 0), 0.01))
+
+    def install(self):
+        time.time = self.time
+        time.monotonic = self.monotonic
+        time.sleep = self.sleep
+
+    def datetime_class(self):
+        """`datetime`-Ersatz, dessen `now()` die virtuelle Uhr liest"""
+        clock = self
+
+        class SimDatetime(_datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return cls.fromtimestamp(clock.time(), tz)
+
+        return SimDatetime
+
+
+class FakeGPIO(types.ModuleType):
+    """Ersatz für `RPi.GPIO`: merkt sich Pin-Zustände und zählt Schaltvorgänge"""
+
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    HIGH = 1
+    LOW = 0
+    PUD_UP = "PUD_UP"
+    PUD_DOWN = "PUD_DOWN"
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.pins = {}
+        self.switches = 0
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        self.pins[pin] = self.HIGH if initial is None else initial
+
+    def output(self, pin, value):
+        # Wie RPi.GPIO: mehrere Pins (Liste/Tupel) mit einem Pegel in einem Aufruf
+        for channel in pin if isinstance(pin, (list, tuple)) else (pin,):
+            if self.pins.get(channel) != value:
+                self.switches += 1
+            self.pins[channel] = value
+
+    def input(self, pin):
+        return self.pins.get(pin, self.HIGH)
+
+    def cleanup(self, *args):
+        self.pins.clear()
+
+
+class SimSensor:
+    """Ersatz für `W1ThermSensor`, liest die Temperatur einer Zone aus dem Modell"""
+
+    model = None  # wird von der Simulation gesetzt
+    slave_prefix = "28-"
+
+    def __init__(self, sensor_type=None, sensor_id=None):
+        zones = {sensor_id: zone for zone, sensor_id in SIM_SENSOR_IDS.items()}
+        if sensor_id is None:
+            sensor_id = SIM_SENSOR_IDS["GH1"]
+        if sensor_id not in zones:
+            raise RuntimeError(f"Sensor {sensor_id} nicht gefunden")
+        self.id = sensor_id
+        self.zone = zones[sensor_id]
+        self.resolution = 12
+
+    @classmethod
+    def get_available_sensors(cls, types=None):
+        return [cls(sensor_id=sensor_id) for sensor_id in SIM_SENSOR_IDS.values()]
+
+    def get_temperature(self):
+        value = self.model.measure(self.zone)
+        step = 0.5 / 2 ** (self.resolution - 9)
+        return round(value / step) * step
+
+    def set_resolution(self, resolution, persist=False):
+        self.resolution = resolution
+
+    def get_resolution(self):
+        return self.resolution
+
+    def __repr__(self):
+        return f"SimSensor({self.zone})"
+
+
+class SimMotor:
+    """Tor-Motor für die Simulation (Schnittstelle wie `MotorController`).
+
+    Ein Auftrag ist für den Aufrufer sofort erledigt; die physische Torstellung
+    folgt im Modell linear über die echte Laufzeit (`physical_position()`).
+    """
+
+    def __init__(self, name, pins, gpio, runtimes, get_position, set_position, latency=(0.0, 0.0), clock=None):
+        self.name = name
+        self.pin_auf, self.pin_zu = pins
+        self._runtimes = runtimes
+        self._get_position = get_position
+        self._set_position = set_position
+        self._clock = clock
+        self._generation = 0
+        self.last_error = None
+
+        position = float(get_position())
+        now = clock.monotonic()
+        self._ramp = (position, position, now, now)  # (von, nach, start, ende)
+        self._direction = None
+        self.moves = 0
+        self.reversals = 0
+        self.runtime = 0.0
+        self.last_start = None  # (perf_counter, virtuelle Zeit) der letzten begonnenen Fahrt
+
+    @property
+    def is_moving(self):
+        return self._clock.monotonic() < self._ramp[3]
+
+    @property
+    def direction(self):
+        return self._direction if self.is_moving else None
+
+    @property
+    def busy_until(self):
+        return self._ramp[3]
+
+    def physical_position(self, now=None):
+        start_pos, end_pos, start, end = self._ramp
+        now = self._clock.monotonic() if now is None else now
+        if now >= end or end <= start:
+            return end_pos
+        return start_pos + (end_pos - start_pos) * (now - start) / (end - start)
+
+    def move_to(self, target, wait=True, timeout=None):
+        target = max(0, min(100, target))
+        self._generation += 1
+        generation = self._generation
+        now = self._clock.monotonic()
+        current = self.physical_position(now)
+
+        if round(current) != target or self.is_moving:
+            runtime_open, runtime_close = self._runtimes()
+            direction = "OPEN" if target > current else "CLOSE"
+            runtime = (runtime_open if direction == "OPEN" else runtime_close) * abs(target - current) / 100
+            if self.is_moving and direction != self._direction:
+                self.reversals += 1
+            self._ramp = (current, float(target), now, now + runtime)
+            self._direction = direction
+            self.moves += 1
+            self.runtime += runtime
+            self.last_start = (time.perf_counter(), self._clock.time())
+
+        self._set_position(int(round(target)))
+        return generation if not wait else "reached"
+
+    def stop(self):
+        self._generation += 1
+        now = self._clock.monotonic()
+        current = self.physical_position(now)
+        self._ramp = (current, current, now, now)
+        self._set_position(int(round(current)))
+
+    def wait(self, generation, timeout=None):
+        return "superseded" if self._generation > generation else "reached"
+
+
+class GreenhouseModel:
+    """Wärmemodell: C·dT/dt = Sonne − (Verlust + Lüftung·Öffnung)·(T − T_außen)"""
+
+    def __init__(self, zones, start, seed=0, initial=None):
+        self.zones = list(zones)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.temps = {zone: initial if initial is not None else self.outdoor(start) + 5 for zone in self.zones}
+        self.openings = lambda: {zone: 0.0 for zone in self.zones}
+        self._clouds = {}
+
+    def outdoor(self, ts):
+        """Außentemperatur: Jahresgang (≈0°C Mitte Januar, ≈20°C Mitte Juli) plus Tagesgang"""
+        day = time.gmtime(ts).tm_yday
+        hour = (ts / 3600 + SIM_LONGITUDE / 15) % 24
+        mean = 10 - 10 * math.cos(2 * math.pi * (day - 20) / 365)
+        return mean + 6 * math.sin(2 * math.pi * (hour - 9) / 24)
+
+    def irradiance(self, ts):
+        """Einstrahlung in W/m² aus dem Sonnenstand, Bewölkung zufällig pro Tag"""
+        day = time.gmtime(ts).tm_yday
+        hour = (ts / 3600 + SIM_LONGITUDE / 15) % 24
+        declination = math.radians(23.44) * math.sin(2 * math.pi * (284 + day) / 365)
+        latitude = math.radians(SIM_LATITUDE)
+        hour_angle = math.radians(15 * (hour - 12))
+        elevation = (math.sin(latitude) * math.sin(declination)
+                     + math.cos(latitude) * math.cos(declination) * math.cos(hour_angle))
+        if day not in self._clouds:
+            self._clouds[day] = self.rng.uniform(0.3, 1.0)
+        return SOLAR_PEAK * max(0.0, elevation) * self._clouds[day]
+
+    def step(self, ts, seconds):
+        temp_out = self.outdoor(ts)
+        sun = self.irradiance(ts) * SOLAR_GAIN
+        openings = self.openings()
+        for zone in self.zones:
+            loss = HEAT_LOSS + VENT_LOSS * openings.get(zone, 0.0)
+            gain = sun * ZONE_GAIN.get(zone, 1.0)
+            self.temps[zone] += seconds * (gain - loss * (self.temps[zone] - temp_out)) / HEAT_CAPACITY
+
+    def measure(self, zone):
+        # Rauschen aus (Seed, Zone, Zeit) – reproduzierbar, egal welcher Thread misst
+        ts = time.time()
+        noise = random.Random(f"{self.seed}:{zone}:{ts}").gauss(0, SENSOR_NOISE)
+        if zone == "outdoor":
+            return self.outdoor(ts) + noise
+        return self.temps[zone] + noise
+
+
+class SimResponse:
+    """Minimale `requests.Response`-Attrappe"""
+
+    def __init__(self, url, status_code, data=None, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._data = data
+        self.content = b"" if data is None else json.dumps(data).encode()
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests  # pyright: ignore[reportMissingModuleSource]
+            raise requests.exceptions.HTTPError(f"{self.status_code} für {self.url}", response=self)
+
+
+class SimAPI:
+    """Stand-in für `api/index.php` (im selben Prozess, ohne Datenbank)"""
+
+    def __init__(self, clock, settings, outages=(), gates=None, switches=None):
+        self.clock = clock
+        self.settings = settings
+        self.outages = list(outages)  # [(start_ts, end_ts)] ohne Verbindung
+        gates = gates or gate_names()
+        self.config = {
+            'gate-auto-mode': {name: True for name in gates},
+            'gate-enabled': {name: True for name in gates},
+            'ventilation': {'enabled': False, 'midday_enabled': False, 'evening_enabled': False, 'custom_phases': []},
+            # Ohne "Zusatz" (Hotspot) – der würde nmcli aufrufen
+            'gpio-switches': [{'name': name, 'state': False} for name in (switches or switch_names())],
+        }
+        self.commands = []
+        self.positions = {}
+        self.status = {}
+        self.applied_switches = {}  # vom Client gemeldete Schalter-Zustände
+        self._switch_versions = {}  # Version → Schalterliste (für den inkrementellen Abgleich)
+        self.calls = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add_command(self, command, parameters=None):
+        with self._lock:
+            self.commands.append({'id': self._next_id, 'command': command, 'parameters': parameters or {}})
+            self._next_id += 1
+
+    def version(self, resource):
+        version = '"%08x"' % (hash(json.dumps(self.config[resource], sort_keys=True)) & 0xffffffff)
+        if resource == 'gpio-switches':
+            self._switch_versions[version] = [dict(sw) for sw in self.config[resource]]
+        return version
+
+    def _switch_changes(self, known):
+        """Seit `known` geänderte Schalter; None bei unbekannter Version oder geänderten Namen (wie die API)"""
+        previous = self._switch_versions.get(known)
+        current = self.config['gpio-switches']
+        if previous is None or [sw['name'] for sw in previous] != [sw['name'] for sw in current]:
+            return None
+        return [sw for sw, old in zip(current, previous) if sw != old]
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None, **kwargs):
+        import requests  # pyright: ignore[reportMissingModuleSource]
+
+        now = self.clock.time()
+        if any(start <= now < end for start, end in self.outages):
+            raise requests.exceptions.ConnectionError("Simulierter Verbindungsausfall")
+
+        endpoint = urlsplit(url).path.split('/api/', 1)[-1].strip('/')
+        with self._lock:
+            key = f"{method} {endpoint.split('/', 1)[0]}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.bytes_sent += len(url) + len(_json_dumps(json or {}))
+            response = self._handle(method, endpoint, json or {}, headers or {}, params or {})
+            response.url = url
+            self.bytes_received += len(response.content)
+        return response
+
+    def _store_switches(self, entries):
+        for entry in entries or []:
+            self.applied_switches[entry['name']] = bool(entry['state'])
+
+    def _claim_commands(self):
+        commands, self.commands = self.commands, []
+        return commands
+
+    def _handle(self, method, endpoint, body, headers, params):
+        if endpoint == 'sync' and method == 'POST':
+            self.status = body.get('status') or self.status
+            self._store_switches(body.get('switches'))
+            response = {'commands': self._claim_commands() if body.get('commands', True) else []}
+            known = body.get('versions') or {}
+            versions = {}
+            for resource, key in (('gate-auto-mode', 'gate_auto_mode'), ('gate-enabled', 'gate_enabled'),
+                                  ('ventilation', 'ventilation'), ('gpio-switches', 'gpio_switches')):
+                versions[resource] = self.version(resource)
+                if known.get(resource) == versions[resource]:
+                    continue
+                changes = self._switch_changes(known[resource]) if resource == 'gpio-switches' and resource in known else None
+                if changes is not None:
+                    response['gpio_switches_changed'] = changes
+                else:
+                    response[key] = self.config[resource]
+            response['versions'] = versions
+            return SimResponse(endpoint, 200, response)
+
+        if endpoint == 'gpio-switches' and method == 'POST' and 'applied' in body:
+            self._store_switches(body['applied'])
+            return SimResponse(endpoint, 200, {'success': True})
+        if endpoint in self.config and method == 'GET':
+            version = self.version(endpoint)
+            if headers.get('If-None-Match') == version:
+                return SimResponse(endpoint, 304)
+            return SimResponse(endpoint, 200, self.config[endpoint], {'ETag': version})
+
+        if endpoint == 'settings' and method == 'GET':
+            return SimResponse(endpoint, 200, self.settings)
+        if endpoint == 'status':
+            if method == 'POST':
+                self.status = body
+            return SimResponse(endpoint, 200, self.status if method == 'GET' else {'success': True})
+        if endpoint == 'gate-status':
+            if method == 'GET':
+                return SimResponse(endpoint, 200, [{'motor_name': name, 'position': position}
+                                                   for name, position in self.positions.items()])
+            self.positions.update(body.get('positions') or {body.get('motor_name'): body.get('position')})
+            return SimResponse(endpoint, 200, {'success': True})
+        if endpoint == 'command':
+            if method == 'GET':
+                return SimResponse(endpoint, 200, self._claim_commands())
+            self.commands.append({'id': self._next_id, 'command': body.get('command'),
+                                  'parameters': body.get('parameters') or {}})
+            self._next_id += 1
+            return SimResponse(endpoint, 200, {'success': True})
+        if endpoint.startswith('command/') or endpoint == 'ventilation/mark-run':
+            return SimResponse(endpoint, 200, {'success': True})
+        return SimResponse(endpoint, 404, {'error': 'Not found'})
+
+
+def _json_dumps(data):
+    return json.dumps(data, default=str)
+
+
+def default_settings(controller=None, target_temp=24.0, hysteresis=2.0):
+    """Settings im Format von `GET /api/settings`"""
+    settings = {
+        'temperature': {
+            'DEFAULT_TARGET_TEMP': {'value': target_temp},
+            'TEMP_HYSTERESIS': {'value': hysteresis},
+            'TEMP_THRESHOLD': {'value': 10.0},
+        },
+        'motor': {
+            'MOTOR_RUNTIME_OPEN': {'value': 135},
+            'MOTOR_RUNTIME_CLOSE': {'value': 128},
+        },
+        'polling': {
+            'INTERVAL_FAST': {'value': 3},
+            'INTERVAL_NORMAL': {'value': 10},
+            'INTERVAL_SLOW': {'value': 30},
+        },
+        'network': {
+            'MAX_RETRIES': {'value': 3},
+            'RETRY_DELAY': {'value': 30},
+        },
+    }
+    if controller:
+        settings['control'] = {'AUTO_CONTROLLER': {'value': controller}}
+    return settings
+
+
+class Simulation:
+    """Baut die Attrappen auf, importiert Client und System und lässt sie laufen"""
+
+    def __init__(self, start, controller=None, seed=0, settings=None, outages=(), verbose=False,
+                 gates=6, switches=3, mode="AUTO", env=None):
+        if 'greenhouse_web' in sys.modules:
+            raise RuntimeError("greenhouse_web ist bereits importiert – Simulation nur in eigenem Prozess")
+
+        self.verbose = verbose
+        self.clock = VirtualClock(start)
+        self.model = GreenhouseModel(ZONE_GAIN, start, seed=seed)
+        random.seed(seed)
+
+        # Umgebung: lokaler Zustand in einem Temp-Verzeichnis, Sensoren nach Zonen
+        self.workdir = tempfile.mkdtemp(prefix="greenhouse_sim_")
+        os.environ.update({
+            'API_URL': "http://sim.invalid/api",
+            'API_KEY': "sim",
+            'LATITUDE': str(SIM_LATITUDE),
+            'LONGITUDE': str(SIM_LONGITUDE),
+            'STATE_DB': os.path.join(self.workdir, "state.db"),
+            'SENSOR_ZONES': ",".join(f"{zone}=28-{sensor_id}" for zone, sensor_id in SIM_SENSOR_IDS.items()),
+            'LONG_POLL': "0",
+            'CLIENT_RUNTIME': "sync",
+            'LOG_FLUSH_INTERVAL': "0",  # Log-Zeilen sofort (sonst an der stdout-Umleitung vorbei)
+        })
+        os.environ.update(env or {})
+
+        # Hardware-Attrappen
+        self.gpio = FakeGPIO()
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = self.gpio
+        w1 = types.ModuleType("w1thermsensor")
+        w1.W1ThermSensor = SimSensor
+        SimSensor.model = self.model
+        sys.modules.update({"RPi": rpi, "RPi.GPIO": self.gpio, "w1thermsensor": w1})
+
+        self.clock.install()
+        self.api = SimAPI(self.clock, settings or default_settings(controller), outages,
+                          gate_names(gates), switch_names(switches))
+
+        with self._output():
+            started = time.perf_counter()
+            greenhouse_http = importlib.import_module("greenhouse_http")
+            greenhouse_http.request = self.api.request
+            self.web = importlib.import_module("greenhouse_web")
+            self.client = importlib.import_module("greenhouse_api_client")
+            self.import_time = time.perf_counter() - started
+
+            # Anzahl Tore/Schalter (für Skalierungs-Messungen; Pins sind fiktiv)
+            if gates != len(self.web.MOTORS) or switches != len(self.web.GPIO_SWITCHES):
+                self.web.MOTORS.clear()
+                self.web.MOTORS.update({name: (100 + 2 * i, 101 + 2 * i) for i, name in enumerate(gate_names(gates))})
+                self.web.GPIO_SWITCHES.clear()
+                self.web.GPIO_SWITCHES.update({name: 200 + i for i, name in enumerate(switch_names(switches))})
+                for pin in [p for pins in self.web.MOTORS.values() for p in pins] + list(self.web.GPIO_SWITCHES.values()):
+                    self.gpio.setup(pin, self.gpio.OUT, initial=self.gpio.HIGH)
+
+            sim_datetime = self.clock.datetime_class()
+            self.web.datetime = sim_datetime
+            self.client.datetime = sim_datetime
+            self.web.MotorController = functools.partial(SimMotor, clock=self.clock)
+
+            # Wie main(), aber ohne Hintergrund-Threads für den Start-Abgleich
+            started = time.perf_counter()
+            self.gh = self.client.gh_system = self.client.init_global_system()
+            self.startup_time = time.perf_counter() - started
+            self.client.apply_settings(self.api.settings)
+            self.client.reconcile_with_server()
+            self.gh.set_mode(mode)
+
+        self.model.openings = self._openings
+        self.clock.on_advance(self._integrate)
+        self.stats = {zone: {'abs_error': 0.0, 'in_band': 0.0, 'above': 0.0, 'overshoot': 0.0,
+                             'min': None, 'max': None} for zone in ZONE_GAIN}
+        self.simulated = 0.0
+        self.cycles = 0
+        self.wall_time = 0.0
+
+    @contextlib.contextmanager
+    def _output(self):
+        if self.verbose:
+            yield
+            return
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            yield
+
+    def _openings(self):
+        """Mittlere physische Toröffnung (0–1) pro Gewächshaus"""
+        openings = {}
+        for name, motor in self.gh.motors.items():
+            openings.setdefault(self.web.gate_zone(name), []).append(motor.physical_position() / 100)
+        return {zone: sum(values) / len(values) for zone, values in openings.items()}
+
+    def _integrate(self, start, seconds):
+        """Wärmemodell und Regelgüte über den übersprungenen Zeitraum"""
+        target, band = self.gh.target_temp, self.gh.temp_hysteresis
+        elapsed = 0.0
+        while elapsed < seconds:
+            dt = min(MODEL_STEP, seconds - elapsed)
+            self.model.step(start + elapsed, dt)
+            elapsed += dt
+            for zone, temp in self.model.temps.items():
+                entry = self.stats[zone]
+                entry['abs_error'] += abs(temp - target) * dt
+                if abs(temp - target) <= band:
+                    entry['in_band'] += dt
+                elif temp > target + band:
+                    entry['above'] += dt
+                    entry['overshoot'] = max(entry['overshoot'], temp - target - band)
+                entry['min'] = temp if entry['min'] is None else min(entry['min'], temp)
+                entry['max'] = temp if entry['max'] is None else max(entry['max'], temp)
+        self.simulated += seconds
+
+    def cycle(self):
+        """Ein Durchlauf der Hauptschleife (Messrunde + `run_cycle()`); liefert die Dauer in Sekunden"""
+        with self._output():
+            self.gh.sensors._sample_once()
+            started = time.perf_counter()
+            self.client.run_cycle()
+            elapsed = time.perf_counter() - started
+        self.cycles += 1
+        return elapsed
+
+    def wait(self, limit=None):
+        """Springt wie auf dem Pi zum nächsten Zyklus: nach dem Intervall, frühestens wenn alle Tore stehen"""
+        interval = self.client.calculate_poll_interval()
+        busy_until = max(motor.busy_until for motor in self.gh.motors.values())
+        seconds = max(interval, busy_until - self.clock.monotonic())
+        self.clock.advance(seconds if limit is None else min(seconds, limit))
+
+    def run(self, days):
+        """Simuliert `days` Tage und liefert die Ergebnisse (siehe `results()`)"""
+        end = self.clock.time() + days * 86400
+        wall_start = time.perf_counter()
+        while self.clock.time() < end:
+            self.cycle()
+            self.wait(end - self.clock.time())
+        self.wall_time += time.perf_counter() - wall_start
+        return self.results()
+
+    def results(self):
+        motors = self.gh.motors.values()
+        days = self.simulated / 86400 or 1
+        zones = {}
+        for zone, entry in self.stats.items():
+            zones[zone] = {
+                'mean_abs_error': round(entry['abs_error'] / self.simulated, 2) if self.simulated else None,
+                'time_in_band': round(entry['in_band'] / self.simulated, 3) if self.simulated else None,
+                'time_above_band': round(entry['above'] / self.simulated, 3) if self.simulated else None,
+                'max_overshoot': round(entry['overshoot'], 2),
+                'min_temp': round(entry['min'], 1) if entry['min'] is not None else None,
+                'max_temp': round(entry['max'], 1) if entry['max'] is not None else None,
+            }
+        api_calls = sum(self.api.calls.values())
+        return {
+            'controller': self.gh.controller.name,
+            'days': round(self.simulated / 86400, 2),
+            'cycles': self.cycles,
+            'wall_time': round(self.wall_time, 2),
+            'motor': {
+                'moves': sum(m.moves for m in motors),
+                'moves_per_day': round(sum(m.moves for m in motors) / days, 1),
+                'runtime_s': round(sum(m.runtime for m in motors), 1),
+                'runtime_per_day_s': round(sum(m.runtime for m in motors) / days, 1),
+                'reversals': sum(m.reversals for m in motors),
+            },
+            'zones': zones,
+            'api': {
+                'calls': api_calls,
+                'calls_per_day': round(api_calls / days, 1),
+                'bytes_sent': self.api.bytes_sent,
+                'bytes_received': self.api.bytes_received,
+                'by_endpoint': dict(sorted(self.api.calls.items())),
+            },
+        }
+
+
+def format_results(results):
+    lines = [
+        f"🌱 Simulation: {results['days']} Tage, Regler '{results['controller']}', "
+        f"{results['cycles']} Zyklen in {results['wall_time']}s",
+        f"⚙️  Motoren: {results['motor']['moves']} Fahrten ({results['motor']['moves_per_day']}/Tag), "
+        f"{results['motor']['runtime_s']:.0f}s Laufzeit ({results['motor']['runtime_per_day_s']:.0f}s/Tag), "
+        f"{results['motor']['reversals']} Umkehrungen",
+    ]
+    for zone, entry in results['zones'].items():
+        lines.append(
+            f"🌡 {zone}: Ø Abweichung {entry['mean_abs_error']}°C, im Band {entry['time_in_band']:.0%}, "
+            f"darüber {entry['time_above_band']:.0%}, max. Überschwingen {entry['max_overshoot']}°C "
+            f"({entry['min_temp']}–{entry['max_temp']}°C)"
+        )
+    lines.append(
+        f"📡 API: {results['api']['calls']} Requests ({results['api']['calls_per_day']}/Tag), "
+        f"{results['api']['bytes_sent'] / 1024:.0f} KiB gesendet, {results['api']['bytes_received'] / 1024:.0f} KiB empfangen"
+    )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline-Simulation der Gewächshaus-Regelung")
+    parser.add_argument("--days", type=float, default=7, help="simulierte Tage (Standard: 7)")
+    parser.add_argument("--start", default="2026-05-01", help="Startdatum JJJJ-MM-TT (Standard: 2026-05-01)")
+    parser.add_argument("--controller", help="Regler (step, pi, predictive; Standard: AUTO_CONTROLLER)")
+    parser.add_argument("--target", type=float, default=24.0, help="Zieltemperatur in °C")
+    parser.add_argument("--hysteresis", type=float, default=2.0, help="Toleranzbereich in °C")
+    parser.add_argument("--seed", type=int, default=0, help="Zufalls-Seed (Bewölkung, Messrauschen)")
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON-Datei schreiben")
+    parser.add_argument("--verbose", action="store_true", help="Ausgaben von Client und System anzeigen")
+    args = parser.parse_args(argv)
+
+    start = _datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp()
+    sim = Simulation(
+        start,
+        seed=args.seed,
+        settings=default_settings(args.controller, args.target, args.hysteresis),
+        verbose=args.verbose
+    )
+    results = sim.run(args.days)
+
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Lokaler, dauerhafter Zustandsspeicher (SQLite) für den Raspberry Pi.
+
+Hält alles, was für den Betrieb ohne API nötig ist: System-Settings,
+Tor-Positionen, Betriebsmodus und die Konfigurations-Endpoints
+(Tor-Automatik, Wintermodus, Lüftung, GPIO-Schalter) inkl. ETag-Version.
+Beim Start wird nur lokal gelesen (wenige Millisekunden); der Abgleich mit
+dem Server läuft danach im Hintergrund und schreibt hierher zurück.
+
+Ein Eintrag ist ein JSON-Wert unter einem Schlüssel, z.B. `settings`,
+`gate_positions`, `mode` oder `config:<endpoint>`. Fehler beim Zugriff auf
+die Datei werden geloggt und führen nur zum Rückfall auf Standardwerte.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import greenhouse_log
+
+logger = greenhouse_log.get_logger("state")
+
+# Pfad der SQLite-Datei (neben den Skripten, falls nicht gesetzt)
+STATE_DB = os.getenv(
+    "STATE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "greenhouse_state.db")
+)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class StateStore:
+    """Thread-sicherer Schlüssel/Wert-Speicher auf SQLite-Basis"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # FULL: Tor-Positionen überstehen auch einen Stromausfall (Schreiben ist selten, nie im Motor-Thread)
+            self._db.execute("PRAGMA synchronous=FULL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Lokaler Zustandsspeicher nicht verfügbar (%s): %s", path, e)
+            self._db = None
+
+    def get(self, key, default=None):
+        if self._db is None:
+            return default
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else default
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("⚠️  Zustand '%s' nicht lesbar: %s", key, e)
+            return default
+
+    def set(self, key, value):
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO state (key, value, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time())
+                )
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning("⚠️  Zustand '%s' nicht gespeichert: %s", key, e)
+
+    def set_many(self, values):
+        """Mehrere Einträge in einer Transaktion (nach einem Absturz alle oder keiner)"""
+        if self._db is None:
+            return
+        try:
+            now = time.time()
+            rows = [(key, json.dumps(value), now) for key, value in values.items()]
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO state (key, value, updated_at) VALUES (?, ?, ?)", rows)
+                    self._db.execute("COMMIT")
+                except sqlite3.Error:
+                    self._db.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning("⚠️  Zustand %s nicht gespeichert: %s", ', '.join(values), e)
+
+    def age(self, key):
+        """Sekunden seit der letzten Änderung von `key` (None wenn unbekannt)"""
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT updated_at FROM state WHERE key = ?", (key,)).fetchone()
+            return time.time() - row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def items(self, prefix=""):
+        """Alle Einträge, deren Schlüssel mit `prefix` beginnt, als Dict"""
+        if self._db is None:
+            return {}
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT key, value FROM state WHERE key LIKE ? ESCAPE '\\'",
+                    (prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',)
+                ).fetchall()
+            return {key: json.loads(value) for key, value in rows}
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("⚠️  Zustand '%s*' nicht lesbar: %s", prefix, e)
+            return {}
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+def get_store():
+    """Liefert den gemeinsamen Speicher (wird beim ersten Aufruf geöffnet)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore(STATE_DB)
+        return _store
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Inkrementeller Abgleich der GPIO-Schalter (Bewässerung, Zusatz/Hotspot).
+
+`SwitchManager` führt im Speicher eine Tabelle aus Soll-Zustand (von der
+API) und Ist-Zustand (zuletzt geschrieben) pro Schalter:
+
+- `update()` vergleicht nur, wenn sich die Schalterliste geändert hat (der
+  `config_cache` liefert bei unveränderter Version dasselbe Objekt) und merkt
+  abweichende Schalter als ausstehend vor. Der Ist-Zustand eines Pins wird
+  einmalig beim ersten Auftauchen gelesen, danach nie wieder per
+  `GPIO.input()`.
+- `apply()` bearbeitet nur die ausstehenden Schalter und schreibt alle Pins
+  mit demselben Pegel in einem `GPIO.output()`-Aufruf. Schalter mit eigenem
+  Handler (Hotspot) bleiben ausstehend, bis der Handler Erfolg meldet.
+- `hold()` übersteuert den Soll-Zustand der API lokal (Bewässerungsläufe,
+  Abschalten nach maximaler Laufzeit); `release()` gibt den Schalter wieder
+  an die API zurück. Eine Vorgabe mit `until_change=True` endet von selbst,
+  sobald die API einen neuen Soll-Zustand für den Schalter liefert.
+- Jede Änderung wird mit Zeitpunkt für die Rückmeldung vorgemerkt:
+  `report()` liefert die noch nicht gemeldeten Einträge, `reported()`
+  entfernt sie nach erfolgreicher Übertragung (wie die Befehls-Acks).
+
+Ohne Änderungen kostet ein Abgleich damit unabhängig von der Anzahl der
+Schalter einen Vergleich und einen leeren Durchlauf.
+
+Der Server liefert im Sync nur die seit der bekannten Version geänderten
+Schalter (`gpio_switches_changed`); `merge()` ergänzt sie zur vollständigen
+Liste für den lokalen Cache.
+"""
+
+import threading
+import time
+
+import greenhouse_log
+import greenhouse_metrics
+
+SWITCH_CHANGES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_switch_changes_total", "Umschaltungen der GPIO-Schalter")
+SWITCH_WRITES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_switch_gpio_writes_total", "GPIO.output()-Aufrufe für Schalter (gebündelt pro Pegel)")
+SWITCH_PENDING = greenhouse_metrics.gauge(
+    "greenhouse_switch_pending", "Schalter, deren Soll-Zustand noch nicht angewendet ist")
+
+
+_log = greenhouse_log.log_to("switches")
+
+
+def merge(switches, changes):
+    """Ergänzt eine Schalterliste um geänderte Einträge (neue Liste, Reihenfolge bleibt)"""
+    changed = {sw.get('name'): sw for sw in changes}
+    merged = [changed.pop(sw.get('name'), sw) for sw in switches or []]
+    merged.extend(changed.values())
+    return merged
+
+
+class SwitchManager:
+    """Soll-/Ist-Tabelle der GPIO-Schalter mit gebündeltem Schreiben und Rückmeldung"""
+
+    def __init__(self, gpio, pins, handlers=None, log=_log):
+        self.gpio = gpio
+        self.pins = pins                    # Name → BCM-Pin (live, z.B. GPIO_SWITCHES)
+        self.handlers = dict(handlers or {})  # Name → handler(state) → True bei Erfolg
+        self.log = log
+        self.desired = {}
+        self.actual = {}
+        self.applied_at = {}
+        self.switched_at = {}               # Name → time.monotonic() des letzten Schaltens (Laufzeiten)
+        self._holds = {}                    # Name → (Zustand, until_change)
+        self.listeners = []                 # listener(namen) nach jedem Schalten (z.B. Bewässerung)
+        self._pending = set()
+        self._unreported = {}
+        self._source = None
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()  # Schalter-Task und Bewässerung schreiben nicht gleichzeitig
+
+        SWITCH_PENDING.set(0)
+
+    def _known(self, name):
+        return name in self.pins or name in self.handlers
+
+    def _seed(self, name):
+        """Einmalig den Pin lesen, damit der Start nicht unnötig schaltet"""
+        if name not in self.actual and name in self.pins and name not in self.handlers:
+            self.actual[name] = self.gpio.input(self.pins[name]) == self.gpio.HIGH
+            self.applied_at[name] = time.time()
+            self.switched_at[name] = time.monotonic()
+
+    def _target(self, name):
+        hold = self._holds.get(name)
+        return hold[0] if hold is not None else self.desired.get(name)
+
+    def _refresh(self, name):
+        """Merkt den Schalter vor, wenn Ziel und Ist-Zustand abweichen (Lock gehalten)"""
+        target = self._target(name)
+        if target is not None and self.actual.get(name) != target:
+            self._pending.add(name)
+            return True
+        self._pending.discard(name)
+        return False
+
+    def update(self, switches):
+        """Übernimmt die Schalterliste der API; liefert die Namen der neu abweichenden Schalter"""
+        with self._lock:
+            if switches is None or switches is self._source:
+                return []
+            self._source = switches
+            changed = []
+            for sw in switches:
+                name = sw.get('name')
+                state = bool(sw.get('state'))
+                if not self._known(name) or self.desired.get(name) == state:
+                    continue
+                if name in self.desired and self._holds.get(name, (None, False))[1]:
+                    # Neuer Soll-Zustand der API hebt die lokale Vorgabe auf
+                    del self._holds[name]
+                self.desired[name] = state
+                self._seed(name)
+                if self._refresh(name):
+                    changed.append(name)
+            SWITCH_PENDING.set(len(self._pending))
+            return changed
+
+    def hold(self, name, state, until_change=False):
+        """Lokale Vorgabe für einen Schalter (übersteuert die API bis `release()`)"""
+        with self._lock:
+            self._holds[name] = (state, until_change)
+            self._seed(name)
+            self._refresh(name)
+            SWITCH_PENDING.set(len(self._pending))
+
+    def release(self, name):
+        """Gibt den Schalter wieder an den Soll-Zustand der API zurück"""
+        with self._lock:
+            self._holds.pop(name, None)
+            self._refresh(name)
+            SWITCH_PENDING.set(len(self._pending))
+
+    def target(self, name):
+        """Aktuell gültiger Soll-Zustand (lokale Vorgabe oder API, None = unbekannt)"""
+        with self._lock:
+            return self._target(name)
+
+    def apply(self):
+        """Schreibt alle ausstehenden Schalter; liefert die Namen der angewendeten"""
+        with self._apply_lock:
+            applied = self._apply()
+        if applied:
+            for listener in self.listeners:
+                listener(applied)
+        return applied
+
+    def _apply(self):
+        with self._lock:
+            if not self._pending:
+                return []
+            pending = {name: self._target(name) for name in sorted(self._pending)}
+
+        # Pins mit gleichem Pegel in einem Aufruf schreiben
+        levels = {}
+        for name, state in pending.items():
+            if name in self.pins:
+                levels.setdefault(self.gpio.HIGH if state else self.gpio.LOW, []).append(self.pins[name])
+        for level, pins in levels.items():
+            self.gpio.output(pins, level)
+            SWITCH_WRITES_TOTAL.inc()
+
+        applied = []
+        for name, state in pending.items():
+            handler = self.handlers.get(name)
+            if handler is not None:
+                try:
+                    if not handler(state):
+                        continue
+                except Exception as e:
+                    self.log('ERROR', "Schalter '%s': %s", name, e)
+                    continue
+            else:
+                self.log('INFO', "🔌 Schalter '%s' (Pin %s) -> %s", name, self.pins[name], 'AUS' if state else 'EIN')
+            applied.append(name)
+
+        now = time.time()
+        mono = time.monotonic()
+        with self._lock:
+            for name in applied:
+                state = pending[name]
+                self.actual[name] = state
+                self.applied_at[name] = now
+                self.switched_at[name] = mono
+                self._unreported[name] = {'name': name, 'state': state, 'applied_at': now}
+                # Inzwischen erneut geändert → bleibt ausstehend
+                if self._target(name) == state:
+                    self._pending.discard(name)
+                SWITCH_CHANGES_TOTAL.inc(switch=name)
+            SWITCH_PENDING.set(len(self._pending))
+        return applied
+
+    def sync(self, switches):
+        """`update()` + `apply()` in einem Schritt"""
+        self.update(switches)
+        return self.apply()
+
+    def report(self):
+        """Noch nicht gemeldete Änderungen (`[{name, state, applied_at}]`)"""
+        with self._lock:
+            return list(self._unreported.values())
+
+    def reported(self, entries):
+        """Entfernt erfolgreich übertragene Einträge (neuere bleiben erhalten)"""
+        with self._lock:
+            for entry in entries:
+                if self._unreported.get(entry['name']) is entry:
+                    del self._unreported[entry['name']]
+
+    def states(self):
+        """Ist-Zustand und Zeitpunkt pro Schalter (`applied_at` Wanduhr, `switched_at` monotonic)"""
+        with self._lock:
+            return {name: {'state': state, 'applied_at': self.applied_at.get(name),
+                           'switched_at': self.switched_at.get(name)}
+                    for name, state in self.actual.items()}
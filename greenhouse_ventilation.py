@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Vorberechneter Lüftungskalender für den Pi-Client.
+
+Die Lüftungsphasen (Morgens nach Sonnenaufgang, Mittags, Abends vor
+Sonnenuntergang, individuelle Phasen) hängen nur von der Konfiguration und
+vom Datum ab. `VentilationSchedule` baut sie deshalb nur bei einem neuen Tag
+bzw. nach einer Konfigurationsänderung neu auf, statt in jedem Zyklus
+`sun()` und `strptime` auszuführen:
+
+- `SolarTable` berechnet Sonnenauf-/untergang für den Standort einmal für
+  ein ganzes Jahr im Voraus (beim Start im Hintergrund) und rollt weiter,
+  bevor das Ende erreicht ist. Bis die Tabelle steht, werden einzelne Tage
+  bei Bedarf berechnet.
+- Der Kalender umfasst ein gleitendes Fenster über mehrere Tage (gestern bis
+  übermorgen). Eine individuelle Phase über Mitternacht (z.B. 22:00–01:00)
+  ist damit auch nach Mitternacht noch aktiv.
+- Uhrzeiten werden mit `tz.localize()` in lokale Zeit übersetzt (nicht
+  `replace(tzinfo=...)`, das bei pytz die historische Ortszeit +00:34
+  liefert) und pro Datum neu aufgelöst – Phasen liegen damit auch an Tagen
+  der Sommerzeitumstellung auf der richtigen Wanduhrzeit. Eine Uhrzeit, die
+  es wegen der Umstellung nicht gibt (02:30 im März), rückt um eine Stunde
+  vor; eine doppelte (02:30 im Oktober) gilt in Winterzeit.
+- Die Phasen werden in einen sortierten Index aus Grenzzeitpunkten
+  übersetzt (`boundaries`), jedem Abschnitt zwischen zwei Grenzen ist die
+  aktive Phase (oder keine) zugeordnet. `active()` und `next_transition()`
+  sind damit eine binäre Suche (O(log n)).
+- `next_transition()` liefert den nächsten Zeitpunkt, an dem eine Phase
+  beginnt oder endet – die Schleife kann genau bis dahin warten, statt eine
+  Phase bis zu einem Poll-Intervall zu spät zu starten oder zu beenden.
+
+Das Modul liest keine Uhr selbst: `now` (zeitzonenbehaftet) kommt vom Aufrufer.
+"""
+
+import copy
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+import pytz
+from astral.sun import sunrise, sunset
+
+import greenhouse_log
+
+logger = greenhouse_log.get_logger("ventilation")
+
+VENTILATION_TZ = "Europe/Zurich"
+PHASE_DURATION = timedelta(minutes=20)
+MIDDAY_TIME = time(12, 0)
+
+# Sonnentabelle: Tage im Voraus und Vorlauf für das Weiterrollen
+SOLAR_TABLE_DAYS = 366
+SOLAR_TABLE_REFRESH = 30  # Tage vor dem Ende der Tabelle neu aufbauen
+
+# Kalenderfenster um den aktuellen Tag (gestern für Phasen über Mitternacht)
+CALENDAR_DAYS_BEFORE = 1
+CALENDAR_DAYS_AHEAD = 2
+
+# Eine Lüftungsphase: Name, Beginn, Ende (zeitzonenbehaftete datetimes)
+Phase = namedtuple('Phase', ['name', 'start', 'end'])
+
+
+def localize(tz, day, clock_time):
+    """Wanduhrzeit `clock_time` am Datum `day` als zeitzonenbehaftete Zeit (DST-sicher)"""
+    return tz.normalize(tz.localize(datetime.combine(day, clock_time), is_dst=False))
+
+
+class SolarTable:
+    """Sonnenauf-/untergang pro Datum, für `days` Tage im Voraus vorberechnet"""
+
+    def __init__(self, location, tz, days=SOLAR_TABLE_DAYS):
+        self.location = location
+        self.tz = tz
+        self.days = days
+        self.start = None
+        self._table = {}
+        self._building = False
+        self._lock = threading.Lock()
+
+    def _compute(self, day, location=None):
+        observer = (location or self.location).observer
+        return (sunrise(observer, date=day, tzinfo=self.tz), sunset(observer, date=day, tzinfo=self.tz))
+
+    def build(self, start):
+        """Berechnet die Tabelle ab `start` (dauert auf dem Pi einige 100ms)"""
+        location = self.location
+        try:
+            table = {}
+            for offset in range(self.days):
+                day = start + timedelta(days=offset)
+                table[day] = self._compute(day, location)
+        finally:
+            with self._lock:
+                self._building = False
+        with self._lock:
+            # Standort inzwischen geändert: Ergebnis verwerfen
+            if location is self.location:
+                self._table = table
+                self.start = start
+
+    def build_async(self, start):
+        """Baut die Tabelle im Hintergrund (blockiert den Start nicht)"""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build, args=(start,), name="SolarTable", daemon=True).start()
+
+    def set_location(self, location):
+        with self._lock:
+            self.location = location
+            self._table = {}
+            self.start = None
+
+    def get(self, day):
+        """(Sonnenaufgang, Sonnenuntergang) für `day`"""
+        with self._lock:
+            table, start = self._table, self.start
+        times = table.get(day)
+        if times is None:
+            # Tabelle (noch) nicht da oder Datum außerhalb: einzeln berechnen
+            times = self._compute(day)
+            if start is None or day >= start:
+                self.build_async(day)
+        elif day >= start + timedelta(days=self.days - SOLAR_TABLE_REFRESH):
+            self.build_async(day)
+        return times
+
+
+class VentilationSchedule:
+    """Lüftungsphasen eines gleitenden Fensters über mehrere Tage als sortierter Intervall-Index"""
+
+    def __init__(self, location, tz=VENTILATION_TZ):
+        self.tz = pytz.timezone(tz)
+        self.solar = SolarTable(location, self.tz)
+        self.phases = []
+        self.boundaries = []   # sortierte Grenzzeitpunkte
+        self._segments = []    # aktive Phase (Name oder None) ab boundaries[i]
+        self._config = None
+        self._day = None
+        self.compilations = 0
+
+    @property
+    def location(self):
+        return self.solar.location
+
+    def preload(self, today):
+        """Sonnentabelle ab `today` im Hintergrund berechnen (beim Start)"""
+        self.solar.build_async(today)
+
+    def set_location(self, location):
+        """Neuer Standort (Settings): Sonnenzeiten und Kalender verwerfen"""
+        self.solar.set_location(location)
+        self._day = None
+
+    def sun_times(self, day):
+        """(Sonnenaufgang, Sonnenuntergang) für `day` aus der Sonnentabelle"""
+        return self.solar.get(day)
+
+    def update(self, config, now):
+        """Baut den Kalender neu auf, wenn sich Datum oder Konfiguration geändert haben.
+
+        Liefert True, wenn neu berechnet wurde.
+        """
+        day = now.astimezone(self.tz).date()
+        if day == self._day and config == self._config:
+            return False
+        self._config = copy.deepcopy(config)
+        self._day = day
+        phases = []
+        for offset in range(-CALENDAR_DAYS_BEFORE, CALENDAR_DAYS_AHEAD + 1):
+            phases.extend(self.build_phases(config, day + timedelta(days=offset)))
+        phases.sort(key=lambda phase: phase.start)
+        self.phases = phases
+        self._build_index()
+        self.compilations += 1
+        return True
+
+    def build_phases(self, config, day):
+        """Alle aktiven Lüftungsphasen, die am Datum `day` beginnen"""
+        phases = []
+        tz = self.tz
+
+        # Sonnenzeiten nur, wenn eine Phase sie braucht
+        if config.get('enabled') or config.get('evening_enabled'):
+            sunrise_time, sunset_time = self.sun_times(day)
+
+        # 1. Morgens: 1h nach Sonnenaufgang, 20 Min
+        if config.get('enabled'):
+            start = sunrise_time + timedelta(hours=1)
+            phases.append(Phase('Morgens', start, start + PHASE_DURATION))
+
+        # 2. Mittags: 12:00, 20 Min
+        if config.get('midday_enabled'):
+            start = localize(tz, day, MIDDAY_TIME)
+            phases.append(Phase('Mittags', start, start + PHASE_DURATION))
+
+        # 3. Abends: 1h vor Sonnenuntergang, 20 Min
+        if config.get('evening_enabled'):
+            start = sunset_time - timedelta(hours=1)
+            phases.append(Phase('Abends', start, start + PHASE_DURATION))
+
+        # 4. Individuelle Phasen (Ende vor Beginn = endet am Folgetag)
+        for custom in config.get('custom_phases', []):
+            if custom.get('enabled'):
+                try:
+                    start_time = datetime.strptime(custom['start_time'], "%H:%M:%S").time()
+                    end_time = datetime.strptime(custom['end_time'], "%H:%M:%S").time()
+
+                    start = localize(tz, day, start_time)
+                    end_day = day + timedelta(days=1) if end_time < start_time else day
+                    end = localize(tz, end_day, end_time)
+
+                    phases.append(Phase(custom.get('name', 'Custom'), start, end))
+                except Exception as e:
+                    logger.warning("⚠️  Fehler bei Custom Phase '%s': %s", custom.get('name', 'Custom'), e)
+
+        return phases
+
+    def _build_index(self):
+        """Grenzzeitpunkte + aktive Phase je Abschnitt (bei Überschneidung die früher begonnene)"""
+        boundaries = sorted({t for phase in self.phases for t in (phase.start, phase.end)})
+        segments = []
+        for t in boundaries:
+            active = next((phase.name for phase in self.phases if phase.start <= t < phase.end), None)
+            segments.append(active)
+        self.boundaries = boundaries
+        self._segments = segments
+
+    def phases_on(self, day):
+        """Phasen, die am Datum `day` (lokal) beginnen"""
+        return [phase for phase in self.phases if phase.start.astimezone(self.tz).date() == day]
+
+    def active(self, now):
+        """Name der Phase, die zu `now` läuft, oder None"""
+        i = bisect_right(self.boundaries, now) - 1
+        return self._segments[i] if i >= 0 else None
+
+    def next_transition(self, now):
+        """Nächster Phasenbeginn/-ende nach `now`; sonst Mitternacht (neues Fenster)"""
+        i = bisect_right(self.boundaries, now)
+        if i < len(self.boundaries):
+            return self.boundaries[i]
+        local = now.astimezone(self.tz)
+        return localize(self.tz, local.date() + timedelta(days=1), time(0, 0))
@@ -11,24 +11,38 @@ spricht nur über `API_URL` mit dieser PHP-API und führt keine eigenen HTTP-Rou
 """
 
 import asyncio
+import os
 import threading
 import time
-import requests  # pyright: ignore[reportMissingModuleSource]
-import os
+from collections import namedtuple
+from concurrent.futures import TimeoutError as FuturesTimeout
 from dotenv import load_dotenv  # pyright: ignore[reportMissingImports]
 from datetime import datetime
 import RPi.GPIO as GPIO  # pyright: ignore[reportMissingModuleSource]
+import greenhouse_control
+import greenhouse_http
+import greenhouse_log
+import greenhouse_metrics
+import greenhouse_state
+from greenhouse_persist import PositionWriter
+from greenhouse_sensors import ZoneSensorReader, parse_zone_map
+from greenhouse_motion import (
+    MotorController, GateScheduler, ActuationExecutor, plan_errors,
+    SOURCE_MANUAL, SOURCE_AUTO, RESULT_QUEUED, RELAY_SETTLE_TIME
+)
 
 # Lade Umgebungsvariablen
 load_dotenv()
 
+greenhouse_log.setup()
+logger = greenhouse_log.get_logger("web")
+
 # Sensor-Import optional (falls 1-Wire Module nicht geladen)
 try:
     from w1thermsensor import W1ThermSensor  # pyright: ignore[reportMissingImports]
     SENSORS_AVAILABLE = True
 except Exception as e:
-    print(f"⚠️  Warnung: Temperatursensoren nicht verfügbar: {e}")
-    print("   System läuft trotzdem, aber ohne Temperaturmessung.")
+    logger.warning("⚠️  Warnung: Temperatursensoren nicht verfügbar: %s – System läuft ohne Temperaturmessung", e)
     SENSORS_AVAILABLE = False
     W1ThermSensor = None
 
@@ -39,6 +53,9 @@ TEMP_HYSTERESIS = 2.0       # Toleranzbereich (+/- 2 Grad)
 # Motor-Laufzeiten (gemessen)
 MOTOR_RUNTIME_OPEN = 135     # 135 Sekunden für vollständiges Öffnen (0% → 100%)
 MOTOR_RUNTIME_CLOSE = 128    # 128 Sekunden für vollständiges Schließen (100% → 0%)
+# Relais-Verzögerung (gemessen): Anzug bis Motor läuft / Abfall bis Motor steht
+RELAY_PULL_IN = float(os.getenv("RELAY_PULL_IN", "0.0"))
+RELAY_DROP_OUT = float(os.getenv("RELAY_DROP_OUT", "0.0"))
 
 # API-URL für Datenbank-Sync
 API_URL = os.getenv("API_URL")
@@ -48,6 +65,14 @@ API_KEY = os.getenv("API_KEY")
 SENSOR_ID_INDOOR = ""
 SENSOR_ID_OUTDOOR = ""
 
+# Zonen-Zuordnung mehrerer Sensoren, z.B. "GH1=28-0316a2795aff@11,GH2=...,outdoor=..."
+# (siehe greenhouse_sensors.py); leer = Innen/Außen wie oben
+SENSOR_ZONES = os.getenv("SENSOR_ZONES", "")
+
+# Sensor-Abtastung im Hintergrund
+SENSOR_SAMPLE_INTERVAL = 10  # Sekunden zwischen zwei Messrunden
+SENSOR_STALE_AFTER = 60      # Sekunden – ältere Messwerte gelten als veraltet
+
 # --- GPIO SETUP ---
 GPIO.setmode(GPIO.BCM)
 GPIO.setwarnings(False)
@@ -79,21 +104,144 @@ for pins in MOTORS.values():
 for pin in GPIO_SWITCHES.values():
     GPIO.setup(pin, GPIO.OUT, initial=GPIO.HIGH)  # HIGH = Aus (Active Low)
 
+# --- METRIKEN ---
+SENSOR_SWEEP_SECONDS = greenhouse_metrics.histogram(
+    "greenhouse_sensor_sweep_seconds", "Dauer einer Messrunde über alle Sensoren",
+    buckets=greenhouse_metrics.SENSOR_BUCKETS)
+SENSOR_READS_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_sensor_reads_total", "Sensor-Messungen (ok/error)")
+SENSOR_TEMPERATURE = greenhouse_metrics.gauge(
+    "greenhouse_sensor_temperature_celsius", "Letzter Messwert pro Zone")
+SENSOR_AGE = greenhouse_metrics.gauge(
+    "greenhouse_sensor_age_seconds", "Alter des letzten erfolgreichen Messwerts pro Zone")
+GATE_POSITION = greenhouse_metrics.gauge(
+    "greenhouse_gate_position_percent", "Aktuelle Tor-Position (0-100)")
+GATE_QUEUE_DEPTH = greenhouse_metrics.gauge(
+    "greenhouse_gate_queue_depth", "Laufende + wartende Fahraufträge pro Tor")
+MOTOR_MOVING = greenhouse_metrics.gauge(
+    "greenhouse_motor_moving", "1 solange der Motor fährt")
+POSITION_WRITES_TOTAL = greenhouse_metrics.counter(
+    "greenhouse_position_writes_total", "Übertragene Tor-Positionen bzw. fehlgeschlagene Übertragungen")
+POSITION_PENDING = greenhouse_metrics.gauge(
+    "greenhouse_position_pending", "Noch nicht übertragene Tor-Positionen")
+AUTO_MODE = greenhouse_metrics.gauge(
+    "greenhouse_auto_mode", "1 im AUTO-Modus, 0 im MANUAL-Modus")
+
+
+def gate_zone(motor_name):
+    """Gewächshaus eines Tors (`GH1_VORNE` → `GH1`)"""
+    return motor_name.split('_', 1)[0]
+
+
+# --- SENSOR-ABTASTUNG ---
+# Ein Messwert: value in °C (None = nie gemessen), timestamp (Unix-Zeit der letzten
+# erfolgreichen Messung), monotonic (für die Altersberechnung), error (letzter Fehler oder None)
+SensorReading = namedtuple('SensorReading', ['value', 'timestamp', 'monotonic', 'error'])
+
+
+class SensorSampler:
+    """Liest alle 1-Wire-Sensoren zyklisch in einem eigenen Thread.
+
+    `reader` ist ein `ZoneSensorReader` (oder None ohne Sensoren); eine
+    Messrunde liest alle Zonen gleichzeitig.
+
+    Nach jeder Messrunde wird ein neues Snapshot-Dict `{rolle: SensorReading}`
+    als Ganzes veröffentlicht (eine Zuweisung, kein Lock) – Leser bekommen
+    immer einen konsistenten Stand in O(1) und blockieren nie auf den Bus.
+    Schlägt eine Messung fehl, bleibt der letzte Wert mit gesetztem `error`
+    erhalten; ob er noch brauchbar ist, sagt `is_stale()`.
+    """
+
+    def __init__(self, reader, interval=SENSOR_SAMPLE_INTERVAL, stale_after=SENSOR_STALE_AFTER):
+        self.reader = reader
+        self.interval = interval
+        self.stale_after = stale_after
+        self.samples = 0
+        self.errors = 0
+        self._snapshot = {}
+        self._wake = threading.Event()
+
+        if reader is not None and reader.sensors:
+            self._thread = threading.Thread(target=self._run, name="SensorSampler", daemon=True)
+            self._thread.start()
+
+    def snapshot(self):
+        return self._snapshot
+
+    def reading(self, role):
+        return self._snapshot.get(role)
+
+    def is_stale(self, reading):
+        """True wenn nie gemessen oder die letzte erfolgreiche Messung zu alt ist"""
+        if reading is None or reading.value is None:
+            return True
+        return time.monotonic() - reading.monotonic > self.stale_after
+
+    def describe(self):
+        """Zustand aller Sensoren für den Status-Report"""
+        now = time.monotonic()
+        result = {}
+        for role, reading in self._snapshot.items():
+            result[role] = {
+                'value': reading.value,
+                'age': round(now - reading.monotonic, 1) if reading.monotonic is not None else None,
+                'stale': self.is_stale(reading),
+                'error': reading.error
+            }
+        return result
+
+    def sample_now(self):
+        """Startet sofort eine neue Messrunde (z.B. nach einem Befehl)"""
+        self._wake.set()
+
+    def _sample_once(self):
+        snapshot = dict(self._snapshot)
+        started = time.monotonic()
+        try:
+            results = self.reader.read_all()
+        except Exception as e:
+            results = {role: e for role in self.reader.roles}
+        SENSOR_SWEEP_SECONDS.observe(time.monotonic() - started)
+        
+        now, now_monotonic = time.time(), time.monotonic()
+        for role, value in results.items():
+            if isinstance(value, Exception):
+                previous = snapshot.get(role) or SensorReading(None, None, None, None)
+                snapshot[role] = previous._replace(error=str(value) or type(value).__name__)
+                self.errors += 1
+            else:
+                snapshot[role] = SensorReading(value, now, now_monotonic, None)
+                self.samples += 1
+        self._snapshot = snapshot
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            self._sample_once()
+            self._wake.wait(max(0.0, self.interval - (time.monotonic() - started)))
+            self._wake.clear()
+
+
 # --- GEWÄCHSHAUS SYSTEM ---
 class GreenhouseSystem:
     def __init__(self):
-        self.mode = "MANUAL"  # AUTO, MANUAL
+        # Lokaler Zustand (SQLite) – beim Start sofort verfügbar, auch ohne API
+        self.state = greenhouse_state.get_store()
+        
+        self.mode = self.state.get('mode', "MANUAL")  # AUTO, MANUAL
         self.target_temp = DEFAULT_TARGET_TEMP
         self.status_text = "System bereit"
         self.last_action = "Keine"
         self.last_check = datetime.now()
-        self.is_busy = False
         
         # Settings (werden von API geladen, Fallback auf Konstanten)
         self.temp_hysteresis = TEMP_HYSTERESIS
         self.motor_runtime_open = MOTOR_RUNTIME_OPEN
         self.motor_runtime_close = MOTOR_RUNTIME_CLOSE
         
+        # Regler der Automatik (austauschbar, siehe greenhouse_control.py)
+        self.controller = greenhouse_control.create_controller()
+        
         # Gate Position Tracking (0-100%)
         self.gate_positions = {
             "GH1_VORNE": 0,
@@ -104,21 +252,130 @@ class GreenhouseSystem:
             "GH3_HINTEN": 0
         }
         
-        # Sensoren initialisieren
+        # Sensoren initialisieren; gemessen wird im Hintergrund (SensorSampler)
         self.sensor_in = None
         self.sensor_out = None
         self._init_sensors()
+        self.sensors = SensorSampler(self._build_sensor_reader())
+        
+        # Settings aus dem lokalen Zustand (API-Abgleich später im Hintergrund)
+        self._apply_settings(self.state.get('settings'))
+        
+        # Write-Behind für Positionen; sein lokaler Stand ist neuer als die DB
+        self.position_writer = PositionWriter(API_URL, API_KEY, self.state)
+        for name, position in self.position_writer.positions().items():
+            if name in self.gate_positions:
+                self.gate_positions[name] = position
+        
+        # Ein Controller (mit eigenem Thread) pro Motor – Fahrten sind jederzeit umlenk-/stoppbar
+        self.motors = {
+            name: MotorController(
+                name,
+                pins,
+                GPIO,
+                runtimes=self._motor_runtimes,
+                get_position=lambda name=name: self.gate_positions.get(name, 0),
+                set_position=lambda position, name=name: self._on_motor_position(name, position),
+                latency=(RELAY_PULL_IN, RELAY_DROP_OUT)
+            )
+            for name, pins in MOTORS.items()
+        }
         
-        # Settings von API laden
-        self._load_settings_from_api()
+        # Auftrags-Warteschlange pro Tor (unabhängig voneinander, kein globales is_busy)
+        self.schedulers = {name: GateScheduler(motor) for name, motor in self.motors.items()}
+        
+        # Gemeinsamer Executor für alle (Mehr-)Tor-Fahrten
+        self.executor = ActuationExecutor(self.schedulers, lambda name: self.gate_positions.get(name, 0))
         
-        # Gate Positionen aus DB laden
+        # Momentanwerte für die Metriken erst beim Abruf einsammeln
+        greenhouse_metrics.add_collector(self._collect_metrics)
+        
+        # Abgleich mit der API blockiert den Start nicht
+        threading.Thread(target=self._reconcile_with_api, name="Reconcile", daemon=True).start()
+    
+    @property
+    def is_busy(self):
+        """True solange irgendein Motor fährt (nur noch Anzeige, keine Sperre)"""
+        return any(motor.is_moving for motor in self.motors.values())
+    
+    def queue_depths(self):
+        """Laufende + wartende Fahraufträge pro Tor (für den Status-Report)"""
+        return {name: scheduler.queue_depth for name, scheduler in self.schedulers.items()}
+    
+    def _collect_metrics(self):
+        """Collector für `greenhouse_metrics`: Tore, Sensoren, Write-Behind"""
+        depths = self.queue_depths()
+        for name, motor in self.motors.items():
+            GATE_POSITION.set(self.gate_positions.get(name, 0), gate=name)
+            GATE_QUEUE_DEPTH.set(depths.get(name, 0), gate=name)
+            MOTOR_MOVING.set(int(motor.is_moving), gate=name)
+        
+        SENSOR_READS_TOTAL.set(self.sensors.samples, result="ok")
+        SENSOR_READS_TOTAL.set(self.sensors.errors, result="error")
+        for role, entry in self.sensors.describe().items():
+            if entry['value'] is not None:
+                SENSOR_TEMPERATURE.set(entry['value'], zone=role)
+            if entry['age'] is not None:
+                SENSOR_AGE.set(entry['age'], zone=role)
+        
+        POSITION_WRITES_TOTAL.set(self.position_writer.sent, result="sent")
+        POSITION_WRITES_TOTAL.set(self.position_writer.failures, result="failed")
+        POSITION_PENDING.set(len(self.position_writer.pending()))
+        AUTO_MODE.set(int(self.mode == "AUTO"))
+    
+    def _motor_runtimes(self):
+        return self.motor_runtime_open, self.motor_runtime_close
+    
+    def _on_motor_position(self, motor_name, position):
+        """Callback der MotorController während (Zwischenstand) und nach jeder (auch abgebrochenen) Fahrt"""
+        self.gate_positions[motor_name] = position
+        self.position_writer.update(motor_name, position)
+    
+    def set_mode(self, mode):
+        """Setzt den Betriebsmodus (AUTO/MANUAL) und merkt ihn lokal für den nächsten Start"""
+        self.mode = mode
+        self.state.set('mode', mode)
+    
+    def _reconcile_with_api(self):
+        """Hintergrund-Abgleich nach dem Start: Settings holen, Positionen nur ohne lokalen Stand"""
+        self._load_settings_from_api()
         self._load_gate_positions_from_db()
     
+    def _apply_settings(self, settings):
+        """Übernimmt Temperatur- und Motor-Settings (Format wie `GET /api/settings`)"""
+        if not settings:
+            return
+        
+        # Temperatur-Settings
+        if 'temperature' in settings:
+            self.target_temp = settings['temperature']['DEFAULT_TARGET_TEMP']['value']
+            self.temp_hysteresis = settings['temperature']['TEMP_HYSTERESIS']['value']
+            logger.info("✅ Settings geladen: Target=%s°C, Hysterese=±%s°C", self.target_temp, self.temp_hysteresis)
+        
+        # Motor-Settings
+        if 'motor' in settings:
+            self.motor_runtime_open = settings['motor']['MOTOR_RUNTIME_OPEN']['value']
+            self.motor_runtime_close = settings['motor']['MOTOR_RUNTIME_CLOSE']['value']
+            logger.info("✅ Motor-Zeiten: Öffnen=%ss, Schließen=%ss", self.motor_runtime_open, self.motor_runtime_close)
+        
+        # Regler-Settings (optional)
+        if 'control' in settings:
+            self.configure_controller(settings['control'])
+    
+    def configure_controller(self, control_settings):
+        """Wählt/parametriert den Automatik-Regler (Setting-Kategorie `control`)"""
+        name, params = greenhouse_control.params_from_settings(control_settings, self.controller.name)
+        if name and name != self.controller.name:
+            self.controller = greenhouse_control.create_controller(name, **params)
+        else:
+            self.controller.configure(**params)
+        logger.info("✅ Regler: %s %s", self.controller.name, params or '')
+    
     def _load_settings_from_api(self):
-        """Lädt Settings von der REST API"""
+        """Lädt Settings von der REST API und speichert sie lokal"""
         try:
-            response = requests.get(
+            response = greenhouse_http.request(
+                'GET',
                 f"{API_URL}/settings",
                 params={'api_key': API_KEY},
                 headers={'X-API-Key': API_KEY},
@@ -127,33 +384,29 @@ class GreenhouseSystem:
             
             if response.status_code == 200:
                 settings = response.json()
-                
-                # Temperatur-Settings
-                if 'temperature' in settings:
-                    self.target_temp = settings['temperature']['DEFAULT_TARGET_TEMP']['value']
-                    self.temp_hysteresis = settings['temperature']['TEMP_HYSTERESIS']['value']
-                    print(f"✅ Settings geladen: Target={self.target_temp}°C, Hysterese=±{self.temp_hysteresis}°C")
-                
-                # Motor-Settings
-                if 'motor' in settings:
-                    self.motor_runtime_open = settings['motor']['MOTOR_RUNTIME_OPEN']['value']
-                    self.motor_runtime_close = settings['motor']['MOTOR_RUNTIME_CLOSE']['value']
-                    print(f"✅ Motor-Zeiten: Öffnen={self.motor_runtime_open}s, Schließen={self.motor_runtime_close}s")
+                self.state.set('settings', settings)
+                self._apply_settings(settings)
             else:
-                print(f"⚠️  Konnte Settings nicht laden (HTTP {response.status_code}), verwende Defaults")
+                logger.warning("⚠️  Konnte Settings nicht laden (HTTP %s), verwende lokalen Stand",
+                               response.status_code)
                 
         except Exception as e:
-            print(f"⚠️  Fehler beim Laden der Settings: {e}")
-            print("   Verwende Default-Werte aus Konfiguration")
+            logger.warning("⚠️  Fehler beim Laden der Settings: %s – verwende lokal gespeicherte Settings bzw. Default-Werte",
+                           e)
 
 
     def _load_gate_positions_from_db(self):
-        """Lädt gespeicherte Tor-Positionen aus der Datenbank"""
+        """Lädt Tor-Positionen aus der Datenbank – nur für Tore ohne lokalen Stand (z.B. erster Start)"""
+        local = self.position_writer.positions()
+        if all(name in local for name in self.gate_positions):
+            return
+        
         try:
             status_params = {'api_key': API_KEY}
             headers = {'X-API-Key': API_KEY}
             
-            response = requests.get(
+            response = greenhouse_http.request(
+                'GET',
                 f"{API_URL}/status",
                 params=status_params,
                 headers=headers,
@@ -162,7 +415,8 @@ class GreenhouseSystem:
             
             if response.status_code == 200:
                 # Hole Gate-Status aus der gate_status Tabelle
-                gate_response = requests.get(
+                gate_response = greenhouse_http.request(
+                    'GET',
                     f"{API_URL}/gate-status",
                     params=status_params,
                     headers=headers,
@@ -171,37 +425,29 @@ class GreenhouseSystem:
                 
                 if gate_response.status_code == 200:
                     gates = gate_response.json()
-                    for gate in gates:
-                        motor_name = gate.get('motor_name')
-                        position = gate.get('position', 0)
-                        if motor_name in self.gate_positions:
-                            self.gate_positions[motor_name] = position
-                            print(f"✅ Gate {motor_name}: {position}% (aus DB geladen)")
+                    # Nur Tore ohne lokalen Stand (auch nicht inzwischen gefahren) übernehmen
+                    loaded = self.position_writer.seed({
+                        gate.get('motor_name'): gate.get('position', 0)
+                        for gate in gates if gate.get('motor_name') in self.gate_positions
+                    })
+                    for motor_name, position in loaded.items():
+                        self.gate_positions[motor_name] = position
+                        logger.info("✅ Gate %s: %s%% (aus DB geladen)", motor_name, position)
                 else:
-                    print("⚠️  Konnte Gate-Status nicht laden, verwende 0%")
+                    logger.warning("⚠️  Konnte Gate-Status nicht laden, verwende lokalen Stand")
             else:
-                print("⚠️  API nicht erreichbar, verwende 0% für alle Tore")
+                logger.warning("⚠️  API nicht erreichbar, verwende lokalen Stand der Tore")
                 
         except Exception as e:
-            print(f"⚠️  Fehler beim Laden der Gate-Positionen: {e}")
-            print("   Verwende 0% für alle Tore")
-    
-    def _save_gate_position_to_db(self, motor_name, position):
-        """Speichert Tor-Position in der Datenbank"""
-        try:
-            requests.post(
-                f"{API_URL}/gate-status",
-                params={'api_key': API_KEY},
-                headers={'X-API-Key': API_KEY},
-                json={'motor_name': motor_name, 'position': position},
-                timeout=5
-            )
-        except Exception as e:
-            print(f"⚠️  Fehler beim Speichern der Position für {motor_name}: {e}")
+            logger.warning("⚠️  Fehler beim Laden der Gate-Positionen: %s – verwende lokalen Stand der Tore", e)
     
     def _init_sensors(self):
         if not SENSORS_AVAILABLE:
-            print("⚠️  Sensoren übersprungen (1-Wire Module nicht geladen)")
+            logger.warning("⚠️  Sensoren übersprungen (1-Wire Module nicht geladen)")
+            return
+        
+        if SENSOR_ZONES:
+            # Zuordnung über Zonen (siehe _build_sensor_reader)
             return
             
         try:
@@ -218,97 +464,114 @@ class GreenhouseSystem:
                 else:
                     self.sensor_out = all_sensors[1]
                     
-            print(f"✓ Sensoren: Innen={self.sensor_in}, Außen={self.sensor_out}")
+            logger.info("✓ Sensoren: Innen=%s, Außen=%s", self.sensor_in, self.sensor_out)
         except Exception as e:
-            print(f"⚠ Sensor-Fehler: {e}")
+            logger.warning("⚠ Sensor-Fehler: %s", e)
 
-    def get_temp_in(self):
+    def _build_sensor_reader(self):
+        """Zone → Sensor: aus SENSOR_ZONES, sonst Innen/Außen plus weitere Sensoren unter ihrer ID"""
+        if not SENSORS_AVAILABLE:
+            return None
+        
+        sensors = {}
+        resolutions = {}
         try:
-            if self.sensor_in:
-                return round(self.sensor_in.get_temperature(), 1)
-        except:
-            pass
-        return None
+            zone_map = parse_zone_map(SENSOR_ZONES)
+            if zone_map:
+                for zone, (sensor_id, resolution) in zone_map.items():
+                    try:
+                        # W1ThermSensor erwartet die ID ohne Familien-Präfix ("28-")
+                        sensors[zone] = W1ThermSensor(sensor_id=sensor_id.split('-', 1)[-1])
+                        resolutions[zone] = resolution
+                    except Exception as e:
+                        logger.warning("⚠ Sensor %s für Zone %s nicht gefunden: %s", sensor_id, zone, e)
+                self.sensor_in = sensors.get('indoor')
+                self.sensor_out = sensors.get('outdoor')
+            else:
+                if self.sensor_in:
+                    sensors['indoor'] = self.sensor_in
+                if self.sensor_out:
+                    sensors['outdoor'] = self.sensor_out
+                assigned = {sensor.id for sensor in sensors.values()}
+                for sensor in W1ThermSensor.get_available_sensors():
+                    if sensor.id not in assigned:
+                        sensors[sensor.id] = sensor
+        except Exception as e:
+            logger.warning("⚠ Sensor-Suche fehlgeschlagen: %s", e)
+        
+        return ZoneSensorReader(sensors, resolutions)
+
+    def zone_temperatures(self):
+        """Aktuelle Temperatur pro Zone (GH1, GH2, …, outdoor); veraltete Werte → None"""
+        return {
+            role: (None if self.sensors.is_stale(reading) else reading.value)
+            for role, reading in self.sensors.snapshot().items()
+        }
+
+    def get_temp_in(self):
+        """Letzter Innenwert aus dem Snapshot (None nur, wenn noch nie gemessen)"""
+        reading = self.sensors.reading('indoor')
+        return reading.value if reading else None
 
     def get_temp_out(self):
-        try:
-            if self.sensor_out:
-                return round(self.sensor_out.get_temperature(), 1)
-        except:
-            pass
-        return None
-
-    def move_motor(self, motor_name, direction):
-        """Bewegt einen Motor (blockierend) - Position-aware"""
-        pins = MOTORS.get(motor_name)
-        if not pins:
-            return
+        """Letzter Außenwert aus dem Snapshot (None nur, wenn noch nie gemessen)"""
+        reading = self.sensors.reading('outdoor')
+        return reading.value if reading else None
 
-        pin_auf = pins[0]
-        pin_zu = pins[1]
-        
-        # Hole aktuelle Position
-        current_position = self.gate_positions.get(motor_name, 0)
+    def move_motor(self, motor_name, direction, source=SOURCE_MANUAL):
+        """Bewegt einen Motor ganz AUF/ZU (blockierend bis Ziel erreicht oder abgelöst)"""
+        if motor_name not in self.schedulers:
+            return None
         
-        # Berechne Zielposition und Basis-Laufzeit
         if direction == "OPEN":
             target_position = 100
-            base_runtime = self.motor_runtime_open
         elif direction == "CLOSE":
             target_position = 0
-            base_runtime = self.motor_runtime_close
         else:
-            return
-        
-        # Berechne benötigte Bewegung
-        movement_percentage = abs(target_position - current_position)
-        
-        # Wenn bereits an Zielposition, nichts tun
-        if movement_percentage <= 0:
-            print(f"→ Motor {motor_name}: Bereits bei {current_position}%, überspringe {direction}")
-            return
-        
-        # Berechne tatsächliche Laufzeit basierend auf benötigter Bewegung
-        runtime = int(base_runtime * (movement_percentage / 100))
-        
-        print(f"→ Motor {motor_name}: {direction} von {current_position}% → {target_position}% ({movement_percentage}%, {runtime}s)")
+            return None
         
-        # Alles aus
-        GPIO.output(pin_auf, GPIO.HIGH)
-        GPIO.output(pin_zu, GPIO.HIGH)
-        time.sleep(0.5)
-
-        # Schalten
-        if direction == "OPEN":
-            GPIO.output(pin_auf, GPIO.LOW)
-        elif direction == "CLOSE":
-            GPIO.output(pin_zu, GPIO.LOW)
-        
-        # Warten (nur so lange wie nötig!)
-        time.sleep(runtime)
+        results, _ = self.actuate({motor_name: target_position}, source)
+        return results.get(motor_name, {}).get('result')
+    
+    def actuate(self, plan, source=SOURCE_MANUAL):
+        """Fährt einen Fahrplan `{tor: zielposition}` parallel über den Executor.
 
-        # Stoppen
-        GPIO.output(pin_auf, GPIO.HIGH)
-        GPIO.output(pin_zu, GPIO.HIGH)
-        time.sleep(0.5)
-        
-        # Position aktualisieren
-        self.gate_positions[motor_name] = target_position
-        
-        # In DB speichern
-        self._save_gate_position_to_db(motor_name, target_position)
+        Blockiert bis alle Tore fertig sind und liefert
+        `(ergebnisse_pro_tor, fehlerliste)`. Die Wartezeit richtet sich nach
+        den Aufträgen, die vor diesem in den Warteschlangen stehen; Tore, die
+        danach noch fahren oder warten, melden `queued` (kein Fehler).
+        """
+        timeout = self._actuation_timeout(plan)
+        future = self.executor.submit(plan, source)
+        try:
+            results = future.result(timeout=timeout)
+        except FuturesTimeout:
+            results = future.partial()
+            queued = [name for name in plan if name not in results]
+            logger.warning("⏳ Tore nach %.0fs noch nicht fertig, laufen weiter: %s", timeout, ", ".join(queued))
+            for name in queued:
+                results[name] = {'result': RESULT_QUEUED, 'error': None, 'queued': 0.0, 'duration': 0.0}
+        
+        for name, entry in results.items():
+            if entry['duration']:
+                logger.info("⏱ Motor %s: %s nach %.1fs (Warteschlange %.1fs)",
+                            name, entry['result'], entry['duration'], entry['queued'])
+        return results, plan_errors(results)
+
+    def _actuation_timeout(self, plan):
+        """Wartezeit für einen Fahrplan: je eine volle Fahrt für die Aufträge davor und die eigene, plus Reserve"""
+        full_run = max(self.motor_runtime_open, self.motor_runtime_close) + RELAY_SETTLE_TIME
+        ahead = max((self.schedulers[name].queue_depth for name in plan if name in self.schedulers), default=0)
+        return (ahead + 1) * full_run + 15
 
     def run_sequence(self, command, gate_enabled_settings=None):
-        """Führt Befehl für alle (aktiven) Motoren PARALLEL aus"""
-        if self.is_busy:
-            return "System ist beschäftigt!"
-        
-        self.is_busy = True
+        """Führt Befehl für alle (aktiven) Motoren PARALLEL aus.
+
+        Laufende Fahrten (auch aus der Automatik) werden dabei sofort auf das
+        neue Ziel umgelenkt statt den Befehl abzulehnen.
+        """
         self.status_text = f"Führe aus: ALLES {command} (parallel)..."
         
-        threads = []
-        errors = []
-        
         # Deaktivierte Tore (Wintermodus) überspringen
         if gate_enabled_settings is None:
             gate_enabled_settings = {name: True for name in MOTORS.keys()}
@@ -318,33 +581,12 @@ class GreenhouseSystem:
         
         if not active_gates:
             self.status_text = "Keine aktiven Tore"
-            self.is_busy = False
             return "Keine aktiven Tore"
         
-        def motor_wrapper(motor_name):
-            """Wrapper to catch exceptions in threads"""
-            try:
-                self.move_motor(motor_name, command)
-            except Exception as e:
-                errors.append(f"{motor_name}: {e}")
+        plan = {name: 100 if command == "OPEN" else 0 for name in active_gates}
         
         try:
-            # Start all active motors in parallel
-            for name in active_gates:
-                thread = threading.Thread(
-                    target=motor_wrapper,
-                    args=(name,),
-                    name=f"Motor-{name}"
-                )
-                threads.append(thread)
-                thread.start()
-            
-            # Wait for all to complete (with timeout)
-            max_runtime = max(self.motor_runtime_open, self.motor_runtime_close)
-            for thread in threads:
-                thread.join(timeout=max_runtime + 15)
-                if thread.is_alive():
-                    errors.append(f"{thread.name}: Timeout")
+            errors = self.actuate(plan)[1]
             
             if errors:
                 error_msg = "; ".join(errors)
@@ -357,62 +599,35 @@ class GreenhouseSystem:
         except Exception as e:
             self.status_text = f"Fehler: {e}"
             return f"Fehler: {e}"
-        finally:
-            self.is_busy = False
     
     def run_sequence_auto(self, command, gate_auto_settings=None, gate_enabled_settings=None):
-        """Führt Befehl nur für Motoren mit Auto=ON und Enabled=AN PARALLEL aus"""
-        if self.is_busy:
-            return "System ist beschäftigt!"
-        
+        """Führt Befehl nur für Motoren mit Auto=ON und Enabled=AN PARALLEL aus.
+
+        Tore mit laufendem/wartendem manuellen Auftrag werden übersprungen.
+        """
         # Defaults
         if gate_auto_settings is None:
             gate_auto_settings = {name: True for name in MOTORS.keys()}
         if gate_enabled_settings is None:
             gate_enabled_settings = {name: True for name in MOTORS.keys()}
         
-        self.is_busy = True
-        
-        # Filtere: Tor muss Auto=ON und Enabled=AN sein
+        # Filtere: Tor muss Auto=ON und Enabled=AN sein (und nicht gerade manuell gefahren werden)
         auto_enabled_gates = [
             name for name in MOTORS.keys()
             if gate_auto_settings.get(name, True) and gate_enabled_settings.get(name, True)
+            and not self.schedulers[name].has_manual_job
         ]
         
         if not auto_enabled_gates:
             self.status_text = "Keine Tore im Auto-Modus"
-            self.is_busy = False
             return "Keine Tore im Auto-Modus"
         
         self.status_text = f"Führe aus: AUTO {command} ({len(auto_enabled_gates)} Tore, parallel)..."
         
-        threads = []
-        errors = []
-        
-        def motor_wrapper(motor_name):
-            """Wrapper to catch exceptions in threads"""
-            try:
-                self.move_motor(motor_name, command)
-            except Exception as e:
-                errors.append(f"{motor_name}: {e}")
+        plan = {name: 100 if command == "OPEN" else 0 for name in auto_enabled_gates}
         
         try:
-            # Start all auto-enabled motors in parallel
-            for name in auto_enabled_gates:
-                thread = threading.Thread(
-                    target=motor_wrapper,
-                    args=(name,),
-                    name=f"Motor-{name}"
-                )
-                threads.append(thread)
-                thread.start()
-            
-            # Wait for all to complete (with timeout)
-            max_runtime = max(self.motor_runtime_open, self.motor_runtime_close)
-            for thread in threads:
-                thread.join(timeout=max_runtime + 15)
-                if thread.is_alive():
-                    errors.append(f"{thread.name}: Timeout")
+            errors = self.actuate(plan, SOURCE_AUTO)[1]
             
             if errors:
                 error_msg = "; ".join(errors)
@@ -426,77 +641,36 @@ class GreenhouseSystem:
         except Exception as e:
             self.status_text = f"Fehler: {e}"
             return f"Fehler: {e}"
-        finally:
-            self.is_busy = False
-
-    def move_motor_partial(self, motor_name, direction, percentage):
-        """Bewegt einen Motor zu einer absoluten Zielposition (percentage = Zielposition 0-100%)"""
-        pins = MOTORS.get(motor_name)
-        if not pins:
-            return
 
-        pin_auf = pins[0]
-        pin_zu = pins[1]
-        
-        # Hole aktuelle Position
-        current_position = self.gate_positions.get(motor_name, 0)
-        
-        # Zielposition ist der percentage Parameter
-        target_position = percentage
-        
-        # Berechne benötigte Bewegung und Richtung
-        movement_needed = target_position - current_position
-        
-        # Wenn bereits an Zielposition, nichts tun
-        if movement_needed == 0:
-            print(f"→ Motor {motor_name}: Bereits bei {current_position}%, überspringe")
-            return
-        
-        # Bestimme Richtung basierend auf Bewegung
-        if movement_needed > 0:
-            actual_direction = "OPEN"
-            base_runtime = self.motor_runtime_open
-            movement_percentage = movement_needed
-        else:
-            actual_direction = "CLOSE"
-            base_runtime = self.motor_runtime_close
-            movement_percentage = abs(movement_needed)
-        
-        # Berechne Laufzeit basierend auf tatsächlicher Bewegung
-        runtime = int(base_runtime * (movement_percentage / 100))
+    def move_motor_partial(self, motor_name, direction, percentage, source=SOURCE_MANUAL):
+        """Bewegt einen Motor zu einer absoluten Zielposition (percentage = Zielposition 0-100%).
 
-        print(f"→ Motor {motor_name}: {actual_direction} von {current_position}% → {target_position}% ({movement_percentage}%, {runtime}s)")
+        Die Richtung ergibt sich aus aktueller und Zielposition; `direction`
+        bleibt nur aus Kompatibilitätsgründen als Argument erhalten.
+        """
+        if motor_name not in self.schedulers:
+            return None
         
-        # Alles aus
-        GPIO.output(pin_auf, GPIO.HIGH)
-        GPIO.output(pin_zu, GPIO.HIGH)
-        time.sleep(0.5)
+        results, _ = self.actuate({motor_name: percentage}, source)
+        return results.get(motor_name, {}).get('result')
 
-        # Schalten basierend auf tatsächlicher Richtung
-        if actual_direction == "OPEN":
-            GPIO.output(pin_auf, GPIO.LOW)
-        elif actual_direction == "CLOSE":
-            GPIO.output(pin_zu, GPIO.LOW)
-        
-        # Warten (nur so lange wie nötig)
-        time.sleep(runtime)
+    def stop_motor(self, motor_name):
+        """Stoppt einen Motor sofort und verwirft wartende Aufträge; die Position wird aus der gefahrenen Zeit berechnet"""
+        scheduler = self.schedulers.get(motor_name)
+        if not scheduler:
+            return
+        scheduler.stop()
+        logger.info("⏹ Motor %s: STOP", motor_name)
 
-        # Stoppen
-        GPIO.output(pin_auf, GPIO.HIGH)
-        GPIO.output(pin_zu, GPIO.HIGH)
-        time.sleep(0.5)
-        
-        # Position aktualisieren
-        self.gate_positions[motor_name] = target_position
-        
-        # In DB speichern
-        self._save_gate_position_to_db(motor_name, target_position)
+    def stop_all(self):
+        """Stoppt alle Motoren sofort"""
+        for name in self.motors:
+            self.stop_motor(name)
+        self.status_text = "Gestoppt"
+        self.last_action = f"STOP um {datetime.now().strftime('%H:%M:%S')}"
 
     def run_sequence_partial(self, command, percentage, gate_enabled_settings=None):
-        """Führt Befehl für alle (aktiven) Motoren teilweise PARALLEL aus"""
-        if self.is_busy:
-            return "System ist beschäftigt!"
-            
+        """Führt Befehl für alle (aktiven) Motoren teilweise PARALLEL aus (lenkt laufende Fahrten um)"""
         if gate_enabled_settings is None:
             gate_enabled_settings = {name: True for name in MOTORS.keys()}
             
@@ -506,36 +680,12 @@ class GreenhouseSystem:
         if not active_gates:
             return "Keine aktiven Tore"
         
-        self.is_busy = True
         self.status_text = f"Führe aus: ALLES {command} {percentage}% (parallel)..."
         
-        threads = []
-        errors = []
-        
-        def motor_wrapper(motor_name):
-            """Wrapper to catch exceptions in threads"""
-            try:
-                self.move_motor_partial(motor_name, command, percentage)
-            except Exception as e:
-                errors.append(f"{motor_name}: {e}")
+        plan = {name: percentage for name in active_gates}
         
         try:
-            # Start all active motors in parallel
-            for name in active_gates:
-                thread = threading.Thread(
-                    target=motor_wrapper,
-                    args=(name,),
-                    name=f"Motor-{name}"
-                )
-                threads.append(thread)
-                thread.start()
-            
-            # Wait for all to complete (with timeout)
-            max_runtime = max(self.motor_runtime_open, self.motor_runtime_close)
-            for thread in threads:
-                thread.join(timeout=max_runtime + 15)
-                if thread.is_alive():
-                    errors.append(f"{thread.name}: Timeout")
+            errors = self.actuate(plan)[1]
             
             if errors:
                 error_msg = "; ".join(errors)
@@ -548,11 +698,9 @@ class GreenhouseSystem:
         except Exception as e:
             self.status_text = f"Fehler: {e}"
             return f"Fehler: {e}"
-        finally:
-            self.is_busy = False
 
     def check_auto_logic(self, gate_auto_settings=None, gate_enabled_settings=None):
-        """Automatik-Regelung mit stufenweiser Anpassung (5%-Schritte).
+        """Automatik-Regelung pro Gewächshaus über den eingestellten Regler.
 
         Zusammenspiel von globalem Modus und tor-spezifischer Automatik:
         ─────────────────────────────────────────────────────────────────
@@ -568,6 +716,11 @@ class GreenhouseSystem:
         globalem AUTO aus der Automatik heraus und reagiert nur auf manuelle
         Befehle. Umgekehrt kann ein Tor bei globalem MANUAL trotzdem automatisch
         gesteuert werden, wenn sein individueller AUTO-Schalter aktiviert ist.
+
+        Geregelt wird pro Gewächshaus (GH1–GH3, aus den Tor-Namen): jede Zone
+        nutzt ihren eigenen Fühler (`SENSOR_ZONES`) und ihre eigene
+        Durchschnittsposition. Zonen im Toleranzbereich bleiben stehen, die
+        übrigen fahren gemeinsam in einem Fahrplan.
         """
         # Wenn keine Gate-Settings, Fallback auf Gesamt-Modus
         if gate_auto_settings is None:
@@ -592,114 +745,84 @@ class GreenhouseSystem:
                 and gate_enabled_settings.get(name, True)
             ]
         
+        # Tore, die gerade manuell gefahren werden, bleiben in diesem Zyklus außen vor
+        auto_enabled_gates = [name for name in auto_enabled_gates
+                              if not self.schedulers[name].has_manual_job]
+        
         if not auto_enabled_gates:
             # Kein Tor im Auto-Modus → nichts tun
             return
         
-        temp_in = self.get_temp_in()
-        temp_out = self.get_temp_out()
+        # Tore nach Gewächshaus gruppieren (GH1_VORNE → GH1); jede Zone wird eigenständig geregelt
+        zones = {}
+        for name in auto_enabled_gates:
+            zones.setdefault(gate_zone(name), []).append(name)
         
-        if temp_in is None:
-            return
+        reading_out = self.sensors.reading('outdoor')
+        temp_out = None if self.sensors.is_stale(reading_out) else reading_out.value
         
         self.last_check = datetime.now()
         
-        # Berechne Temperatur-Abweichung vom Ziel
-        temp_diff = temp_in - self.target_temp
-        
-        # Bestimme Basis-Schrittgröße (5% Standard)
-        if temp_diff > self.temp_hysteresis:
-            # Zu warm → ÖFFNEN
-            base_step = 5
-            direction = "OPEN"
-        elif temp_diff < -self.temp_hysteresis:
-            # Zu kalt → SCHLIESSEN
-            base_step = 5
-            direction = "CLOSE"
-        else:
-            # Im Toleranzbereich → Nichts tun
-            print(f"🌡 AUTO: {temp_in}°C im Toleranzbereich ({self.target_temp - self.temp_hysteresis}°C - {self.target_temp + self.temp_hysteresis}°C) [{len(auto_enabled_gates)} Tor/e im Auto-Modus]")
-            return
-        
-        # Berechne Multiplikator basierend auf Außentemperatur-Differenz
-        multiplier = 1  # Standard: 5% Schritte
-        
-        if temp_out is not None:
-            temp_delta = abs(temp_in - temp_out)
-            
-            if temp_delta >= 15:
-                multiplier = 3  # 15% Schritte bei großer Differenz
-            elif temp_delta >= 10:
-                multiplier = 2  # 10% Schritte bei mittlerer Differenz
-            # else: multiplier = 1 (5% Schritte bei kleiner Differenz)
-            
-            print(f"🌡 AUTO: Innen {temp_in}°C, Außen {temp_out}°C, Differenz {temp_delta:.1f}°C → Multiplikator {multiplier}x")
-        
-        # Finale Schrittgröße
-        step_size = base_step * multiplier
-        
-        # auto_enabled_gates wurde bereits oben berechnet und ist nicht leer
-        
-        # Berechne durchschnittliche Position
-        avg_position = sum(self.gate_positions.get(name, 0) for name in auto_enabled_gates) / len(auto_enabled_gates)
-        
-        # Berechne Zielposition
-        if direction == "OPEN":
-            target_position = min(100, avg_position + step_size)
-        else:  # CLOSE
-            target_position = max(0, avg_position - step_size)
-        
-        # Wenn bereits an Zielposition, nichts tun
-        if int(avg_position) == int(target_position):
-            print(f"🌡 AUTO: Tore bereits bei {avg_position:.0f}%, keine Änderung nötig")
+        plan = {}
+        moves = []
+        for zone, gates in zones.items():
+            step = self._zone_step(zone, gates, temp_out)
+            if step is None:
+                continue
+            target_position, direction, step_size = step
+            plan.update({name: target_position for name in gates})
+            moves.append(f"{zone} {direction} {step_size}% → {target_position}%")
+        
+        if not plan:
             return
         
-        # Führe Bewegung aus
-        print(f"🌡 AUTO: {temp_in}°C → {direction} von {avg_position:.0f}% → {target_position:.0f}% ({step_size}% Schritt)")
-        
-        # Bewege alle Auto-Tore zur Zielposition
-        self.is_busy = True
-        self.status_text = f"AUTO: {direction} {avg_position:.0f}% → {target_position:.0f}% ({step_size}%)"
-        
-        threads = []
-        errors = []
-        
-        def motor_wrapper(motor_name):
-            """Wrapper to catch exceptions in threads"""
-            try:
-                # Verwende move_motor_partial mit absoluter Zielposition
-                self.move_motor_partial(motor_name, direction, int(target_position))
-            except Exception as e:
-                errors.append(f"{motor_name}: {e}")
+        # Alle Zonen fahren gleichzeitig (ein gemeinsamer Fahrplan)
+        self.status_text = f"AUTO: {', '.join(moves)}"
         
         try:
-            # Start all auto-enabled motors in parallel
-            for name in auto_enabled_gates:
-                thread = threading.Thread(
-                    target=motor_wrapper,
-                    args=(name,),
-                    name=f"Motor-{name}"
-                )
-                threads.append(thread)
-                thread.start()
-            
-            # Wait for all to complete
-            for thread in threads:
-                thread.join(timeout=150)
-                if thread.is_alive():
-                    errors.append(f"{thread.name}: Timeout")
+            errors = self.actuate(plan, SOURCE_AUTO)[1]
             
             if errors:
                 error_msg = "; ".join(errors)
                 self.status_text = f"AUTO Fehler: {error_msg}"
             else:
-                self.status_text = f"AUTO: {target_position:.0f}% ({temp_in}°C)"
-                self.last_action = f"AUTO {direction} {step_size}% um {datetime.now().strftime('%H:%M:%S')}"
+                self.status_text = f"AUTO: {', '.join(moves)}"
+                self.last_action = f"AUTO {', '.join(moves)} um {datetime.now().strftime('%H:%M:%S')}"
                 
         except Exception as e:
             self.status_text = f"AUTO Fehler: {e}"
-        finally:
-            self.is_busy = False
+
+    def _zone_step(self, zone, gates, temp_out):
+        """Automatik-Schritt für ein Gewächshaus → (Zielposition, Richtung, Schritt%) oder None.
+
+        Nutzt den Fühler der Zone; ohne eigenen Fühler die (gemittelte) Innentemperatur.
+        Die Zielposition berechnet der eingestellte Regler (`self.controller`).
+        """
+        reading_in = self.sensors.reading(zone) or self.sensors.reading('indoor')
+        
+        # Ohne aktuellen Innenwert keine Regelung; veralteter Außenwert → nur Basis-Schritt
+        if self.sensors.is_stale(reading_in):
+            if reading_in is not None:
+                logger.warning("⚠️  AUTO %s: Innentemperatur veraltet/fehlerhaft (%s), überspringe",
+                               zone, reading_in.error or 'keine neue Messung')
+            return None
+        temp_in = reading_in.value
+        
+        # Durchschnittliche Position der Tore dieser Zone
+        avg_position = sum(self.gate_positions.get(name, 0) for name in gates) / len(gates)
+        
+        # Zielposition vom Regler (None = stehen bleiben)
+        target_position = self.controller.update(
+            zone, temp_in, temp_out, avg_position, self.target_temp, self.temp_hysteresis
+        )
+        if target_position is None:
+            return None
+        
+        direction = "OPEN" if target_position > avg_position else "CLOSE"
+        step_size = abs(target_position - round(avg_position))
+        logger.info("🌡 AUTO %s: %s°C → %s von %.0f%% → %s%% (%s%% Schritt) [%s Tor/e]",
+                    zone, temp_in, direction, avg_position, target_position, step_size, len(gates))
+        return target_position, direction, step_size
 
 # System erstellen (globales Singleton für die Motor-/Sensor-Logik)
 gh = None
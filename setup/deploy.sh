@@ -31,6 +31,7 @@ scp web/index.html ${USER}@${SERVER}:${WEB_PATH}/
 scp web/assets/auto-toggle-styles.css ${USER}@${SERVER}:${WEB_PATH}/assets/
 scp web/assets/gate-auto-toggle.js ${USER}@${SERVER}:${WEB_PATH}/assets/
 scp web/assets/app.js ${USER}@${SERVER}:${WEB_PATH}/assets/
+scp web/assets/styles.css ${USER}@${SERVER}:${WEB_PATH}/assets/
 
 echo "✅ Web files uploaded"
 
@@ -39,6 +40,18 @@ echo ""
 echo "📤 Uploading Pi client files..."
 scp greenhouse_web.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
 scp greenhouse_api_client.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_http.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_motion.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_persist.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_state.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_sensors.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_control.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_metrics.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_log.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_ventilation.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_switches.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_irrigation.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
+scp greenhouse_network.py ${PI_USER}@${PI_HOST}:${PI_PATH}/
 
 echo "✅ Pi client files uploaded"
 
@@ -13,6 +13,9 @@ function toggleSettings() {
     }
 }
 
+// Regler-Settings nur speichern, wenn die API sie kennt
+let controlSettingsLoaded = false;
+
 function loadSettings() {
     fetch(`${API_BASE}/settings`)
         .then(r => r.json())
@@ -43,6 +46,17 @@ function loadSettings() {
             document.getElementById('set-interval-normal').value = data.polling.INTERVAL_NORMAL.value;
             document.getElementById('set-interval-slow').value = data.polling.INTERVAL_SLOW.value;
             
+            // Regler (fehlt, solange insert_initial_settings.sql nicht eingespielt ist)
+            if (data.control) {
+                document.getElementById('set-auto-controller').value = data.control.AUTO_CONTROLLER.value;
+                document.getElementById('set-control-kp').value = data.control.CONTROL_KP.value;
+                document.getElementById('set-control-ti').value = data.control.CONTROL_TI.value;
+                document.getElementById('set-control-min-move').value = data.control.CONTROL_MIN_MOVE.value;
+                document.getElementById('set-control-min-interval').value = data.control.CONTROL_MIN_INTERVAL.value;
+                document.getElementById('set-control-horizon').value = data.control.CONTROL_HORIZON.value;
+            }
+            controlSettingsLoaded = !!data.control;
+            
             // Netzwerk
             document.getElementById('set-max-retries').value = data.network.MAX_RETRIES.value;
             document.getElementById('set-retry-delay').value = data.network.RETRY_DELAY.value;
@@ -73,6 +87,17 @@ function saveSettings() {
         RETRY_DELAY: parseInt(document.getElementById('set-retry-delay').value)
     };
     
+    if (controlSettingsLoaded) {
+        Object.assign(settings, {
+            AUTO_CONTROLLER: document.getElementById('set-auto-controller').value,
+            CONTROL_KP: parseFloat(document.getElementById('set-control-kp').value),
+            CONTROL_TI: parseInt(document.getElementById('set-control-ti').value),
+            CONTROL_MIN_MOVE: parseInt(document.getElementById('set-control-min-move').value),
+            CONTROL_MIN_INTERVAL: parseInt(document.getElementById('set-control-min-interval').value),
+            CONTROL_HORIZON: parseInt(document.getElementById('set-control-horizon').value)
+        });
+    }
+    
     fetch(`${API_BASE}/settings`, {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},